@@ -20,18 +20,20 @@ DEFAULT_ARGS = {
   'user_provided_socket': False,
   'config': os.path.expanduser("~/.arm/armrc"),
   'debug_path': None,
+  'export_path': None,
   'logged_events': 'N3',
   'print_version': False,
   'print_help': False,
 }
 
-OPT = 'i:s:c:d:bl:vh'
+OPT = 'i:s:c:d:e:bl:vh'
 
 OPT_EXPANDED = [
   'interface=',
   'socket=',
   'config=',
   'debug=',
+  'export=',
   'log=',
   'version',
   'help',
@@ -107,6 +109,8 @@ def parse(argv):
       args['config'] = arg
     elif opt in ('-d', '--debug'):
       args['debug_path'] = os.path.expanduser(arg)
+    elif opt in ('-e', '--export'):
+      args['export_path'] = os.path.expanduser(arg)
     elif opt in ('-l', '--log'):
       try:
         expand_events(arg)
@@ -48,6 +48,7 @@ class CircEntry(connEntry.ConnectionEntry):
 
     self.status = status
     self.lines = [self.lines[0]]
+    self.invalidate_sort_values()  # our exit may have changed
     conn = torTools.get_conn()
 
     if status == "BUILT" and not self.lines[0].is_built:
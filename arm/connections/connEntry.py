@@ -6,7 +6,7 @@ Connection panel entries related to actual connections to or from the system
 import time
 import curses
 
-from arm.util import torTools, uiTools
+from arm.util import hostnames, torTools, uiTools
 from arm.connections import entries
 
 from stem.util import conf, connection, enum, str_tools
@@ -46,6 +46,7 @@ SCRUBBED_IP_VAL = 255 ** 4
 
 CONFIG = conf.config_dict("arm", {
   "features.connection.markInitialConnections": True,
+  "features.connection.resolveHostnames": True,
   "features.connection.showIps": True,
   "features.connection.showExitPort": True,
   "features.connection.showColumn.fingerprint": True,
@@ -93,24 +94,17 @@ class Endpoint:
   def get_hostname(self, default = None):
     """
     Provides the hostname associated with the relay's address. This is a
-    non-blocking call and returns None if the address either can't be resolved
-    or hasn't been resolved yet.
+    non-blocking call and provides the default if the address either can't be
+    resolved or hasn't been resolved yet (in which case a lookup is queued).
 
     Arguments:
       default - return value if no hostname is available
     """
 
-    # TODO: skipping all hostname resolution to be safe for now
-    #try:
-    #  myHostname = hostnames.resolve(self.address)
-    #except:
-    #  # either a ValueError or IOError depending on the source of the lookup failure
-    #  myHostname = None
-    #
-    #if not myHostname: return default
-    #else: return myHostname
+    if not CONFIG["features.connection.resolveHostnames"]:
+      return default
 
-    return default
+    return hostnames.get_resolver().resolve(self.address, default)
 
   def get_locale(self, default=None):
     """
@@ -176,6 +170,22 @@ class ConnectionEntry(entries.ConnectionPanelEntry):
   def __init__(self, local_address, local_port, remote_address, remote_port):
     entries.ConnectionPanelEntry.__init__(self)
     self.lines = [ConnectionLine(local_address, local_port, remote_address, remote_port)]
+    self._sorted_state = None  # type and privacy our sort values were made for
+
+  def check_sort_values(self):
+    """
+    Many of our sort values depend on our type, and if we're private (since
+    private addresses are scrubbed). This drops our cached sort values if
+    either has changed since they were made. This is done once per refresh
+    by the panel so sorting doesn't need to look either up.
+    """
+
+    connection_line = self.lines[0]
+    state = (connection_line.get_type(), connection_line.is_private())
+
+    if state != self._sorted_state:
+      self.invalidate_sort_values()
+      self._sorted_state = state
 
   def get_sort_value(self, attr, listing_type):
     """
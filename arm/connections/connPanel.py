@@ -11,9 +11,9 @@ import arm.popups
 import arm.util.tracker
 
 from arm.connections import countPopup, descriptorPopup, entries, connEntry, circEntry
-from arm.util import panel, torTools, tracker, uiTools
+from arm.util import hostnames, panel, torTools, tracker, uiTools
 
-from stem.control import State
+from stem.control import EventType, State
 from stem.util import conf, connection, enum
 
 # height of the detail panel content, not counting top and bottom border
@@ -36,6 +36,7 @@ def conf_handler(key, value):
 
 CONFIG = conf.config_dict("arm", {
   "features.connection.resolveApps": True,
+  "features.connection.resolveHostnames": True,
   "features.connection.listing_type": Listing.IP_ADDRESS,
   "features.connection.order": [
     entries.SortAttr.CATEGORY,
@@ -69,9 +70,13 @@ class ConnectionPanel(panel.Panel, threading.Thread):
 
     self._scroller = uiTools.Scroller(True)
     self._title = "Connections:"  # title line of the panel
-    self._entries = []            # last fetched display entries
-    self._entry_lines = []        # individual lines rendered from the entries listing
+    self._entries = entries.SortedEntries(self._get_sort_values)  # last fetched display entries
+    self._connections = {}        # (local address, local port, remote address, remote port) => ConnectionEntry
+    self._circuits = {}           # circuit id => CircEntry
+    self._entry_lines = entries.EntryLines(self._entries)  # individual lines rendered from the entries listing
     self._show_details = False    # presents the details panel if true
+    self._is_relay_info_changed = False  # consensus or descriptors changed since our last update
+    self._last_hostname_count = 0  # hostname lookups that had finished as of our last update
 
     self._last_update = -1        # time the content was last revised
     self._is_tor_running = True   # indicates if tor is currently running or not
@@ -131,6 +136,18 @@ class ConnectionPanel(panel.Panel, threading.Thread):
 
     conn.add_status_listener(self.tor_state_listener)
 
+    # listens for new relay information, which can change our sort values
+
+    conn.add_event_listener(self.relay_info_event, EventType.NEWCONSENSUS, EventType.NEWDESC)
+
+  def relay_info_event(self, event):
+    """
+    Notes that relay information has changed, so cached sort values derived
+    from it are recalculated during our next update.
+    """
+
+    self._is_relay_info_changed = True
+
   def tor_state_listener(self, controller, event_type, _):
     """
     Freezes the connection contents when Tor stops.
@@ -173,12 +190,7 @@ class ConnectionPanel(panel.Panel, threading.Thread):
       ordering_keys = [entries.SortAttr.keys()[entries.SortAttr.index_of(v)] for v in ordering]
       arm_config.set("features.connection.order", ", ".join(ordering_keys))
 
-    self._entries.sort(key = lambda i: (i.get_sort_values(CONFIG["features.connection.order"], self.get_listing_type())))
-
-    self._entry_lines = []
-
-    for entry in self._entries:
-      self._entry_lines += entry.getLines()
+    self._entries.set_key_function(self._get_sort_values)
 
     self.vals_lock.release()
 
@@ -295,9 +307,10 @@ class ConnectionPanel(panel.Panel, threading.Thread):
       title = "List By:"
       options = list(entries.ListingType)
 
-      # dropping the HOSTNAME listing type until we support displaying that content
+      # hostnames are only available if we're resolving them
 
-      options.remove(arm.connections.entries.ListingType.HOSTNAME)
+      if not CONFIG["features.connection.resolveHostnames"]:
+        options.remove(arm.connections.entries.ListingType.HOSTNAME)
 
       old_selection = options.index(self.get_listing_type())
       selection = arm.popups.show_menu(title, options, old_selection)
@@ -439,9 +452,12 @@ class ConnectionPanel(panel.Panel, threading.Thread):
     else:
       current_time = time.time()
 
-    for line_number in range(scroll_location, len(self._entry_lines)):
-      entry_line = self._entry_lines[line_number]
+    # only the lines in view are fetched, so this doesn't scale with the
+    # number of connections
+
+    visible_lines = self._entry_lines.get_window(scroll_location, height - detail_panel_offset - 1)
 
+    for line_number, entry_line in enumerate(visible_lines, scroll_location):
       # if this is an unresolved SOCKS, HIDDEN, or CONTROL entry then queue up
       # resolution for the applicaitions they belong to
 
@@ -467,9 +483,6 @@ class ConnectionPanel(panel.Panel, threading.Thread):
         self.addstr(draw_line, x_offset, msg, attr)
         x_offset += len(msg)
 
-      if draw_line >= height:
-        break
-
     self.vals_lock.release()
 
   def stop(self):
@@ -499,13 +512,11 @@ class ConnectionPanel(panel.Panel, threading.Thread):
 
     self.vals_lock.acquire()
 
-    new_entries = []  # the new results we'll display
-
     # Fetches new connections and client circuits...
-    # new_connections  [(local ip, local port, foreign ip, foreign port)...]
+    # new_connections  {(local ip, local port, foreign ip, foreign port)...}
     # new_circuits     {circuit_id => (status, purpose, path)...}
 
-    new_connections = [(conn.local_address, conn.local_port, conn.remote_address, conn.remote_port) for conn in conn_resolver.get_connections()]
+    new_connections = set([(conn.local_address, conn.local_port, conn.remote_address, conn.remote_port) for conn in conn_resolver.get_connections()])
     new_circuits = {}
 
     for circuit_id, status, purpose, path in torTools.get_conn().get_circuits():
@@ -515,41 +526,63 @@ class ConnectionPanel(panel.Panel, threading.Thread):
       if not (status == "BUILT" and len(path) == 1):
         new_circuits[circuit_id] = (status, purpose, path)
 
-    # Populates new_entries with any of our old entries that still exist.
-    # This is both for performance and to keep from resetting the uptime
-    # attributes. Note that CircEntries are a ConnectionEntry subclass so
-    # we need to check for them first.
+    # Drops entries that no longer exist and updates the circuits that do, in
+    # place. Keeping our old entries is both for performance and to keep from
+    # resetting the uptime attributes.
+
+    for conn_attr, old_entry in self._connections.items():
+      if conn_attr in new_connections:
+        new_connections.remove(conn_attr)
+      else:
+        del self._connections[conn_attr]
+        self._entries.remove(old_entry)
+
+    for circuit_id, old_entry in self._circuits.items():
+      new_entry = new_circuits.pop(circuit_id, None)
 
-    for old_entry in self._entries:
-      if isinstance(old_entry, circEntry.CircEntry):
-        new_entry = new_circuits.get(old_entry.circuit_id)
+      if new_entry:
+        old_entry.update(new_entry[0], new_entry[2])
+      else:
+        del self._circuits[circuit_id]
+        self._entries.remove(old_entry)
+
+    # Reset any display attributes for the entries we're keeping and drops
+    # sort values that are stale, then moves those whose sort values have
+    # changed. This is the only time types and privacy are checked for
+    # sorting, so the sorting itself is purely in memory.
 
-        if new_entry:
-          old_entry.update(new_entry[0], new_entry[2])
-          new_entries.append(old_entry)
-          del new_circuits[old_entry.circuit_id]
-      elif isinstance(old_entry, connEntry.ConnectionEntry):
-        connection_line = old_entry.getLines()[0]
-        conn_attr = (connection_line.local.get_address(), connection_line.local.get_port(),
-                     connection_line.foreign.get_address(), connection_line.foreign.get_port())
+    is_relay_info_changed = self._is_relay_info_changed
+    self._is_relay_info_changed = False
 
-        if conn_attr in new_connections:
-          new_entries.append(old_entry)
-          new_connections.remove(conn_attr)
+    is_hostnames_changed = False
 
-    # Reset any display attributes for the entries we're keeping
+    if CONFIG["features.connection.resolveHostnames"]:
+      hostname_count = hostnames.get_resolver().resolved_count()
+      is_hostnames_changed = hostname_count != self._last_hostname_count
+      self._last_hostname_count = hostname_count
 
-    for entry in new_entries:
+    for entry in self._entries:
       entry.reset_display()
+      entry.check_sort_values()
+
+      if is_relay_info_changed:
+        entry.invalidate_sort_values(entries.RELAY_SORT_ATTR)
+
+      if is_hostnames_changed:
+        entry.invalidate_sort_values(entries.HOSTNAME_SORT_KEYS)
+
+    self._entries.update()
 
     # Adds any new connection and circuit entries.
 
-    for local_address, local_port, remote_address, remote_port in new_connections:
-      new_conn_entry = connEntry.ConnectionEntry(local_address, local_port, remote_address, remote_port)
+    for conn_attr in new_connections:
+      new_conn_entry = connEntry.ConnectionEntry(*conn_attr)
       new_conn_line = new_conn_entry.getLines()[0]
 
       if new_conn_line.get_type() != connEntry.Category.CIRCUIT:
-        new_entries.append(new_conn_entry)
+        new_conn_entry.check_sort_values()
+        self._connections[conn_attr] = new_conn_entry
+        self._entries.add(new_conn_entry)
 
         # updates exit port and client locale usage information
         if new_conn_line.is_private():
@@ -566,7 +599,9 @@ class ConnectionPanel(panel.Panel, threading.Thread):
 
     for circuit_id in new_circuits:
       status, purpose, path = new_circuits[circuit_id]
-      new_entries.append(circEntry.CircEntry(circuit_id, status, purpose, path))
+      self._circuits[circuit_id] = circEntry.CircEntry(circuit_id, status, purpose, path)
+      self._circuits[circuit_id].check_sort_values()
+      self._entries.add(self._circuits[circuit_id])
 
     # Counts the relays in each of the categories. This also flushes the
     # type cache for all of the connections (in case its changed since last
@@ -575,7 +610,7 @@ class ConnectionPanel(panel.Panel, threading.Thread):
     category_types = list(connEntry.Category)
     type_counts = dict((type, 0) for type in category_types)
 
-    for entry in new_entries:
+    for entry in self._entries:
       if isinstance(entry, connEntry.ConnectionEntry):
         type_counts[entry.getLines()[0].get_type()] += 1
       elif isinstance(entry, circEntry.CircEntry):
@@ -595,16 +630,18 @@ class ConnectionPanel(panel.Panel, threading.Thread):
     else:
       self._title = "Connections:"
 
-    self._entries = new_entries
+    self._last_resource_fetch = current_resolution_count
+    self.vals_lock.release()
 
-    self._entry_lines = []
+  def _get_sort_values(self, entry):
+    """
+    Provides the values we order an entry by.
 
-    for entry in self._entries:
-      self._entry_lines += entry.getLines()
+    Arguments:
+      entry - connection panel entry to provide the sort values of
+    """
 
-    self.set_sort_order()
-    self._last_resource_fetch = current_resolution_count
-    self.vals_lock.release()
+    return entry.get_sort_values(CONFIG["features.connection.order"], self.get_listing_type())
 
   def _resolve_apps(self, flag_query = True):
     """
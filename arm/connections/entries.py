@@ -4,6 +4,10 @@ entry itself (ie, Tor connection, client circuit, etc) and the lines it
 consists of in the listing.
 """
 
+import bisect
+
+from arm.util import uiTools
+
 from stem.util import enum
 
 # attributes we can list entries by
@@ -28,17 +32,37 @@ SORT_COLORS = {
 
 PORT_COUNT = 65536
 
+# if more than this portion of our entries change position then we resort
+# rather than moving them individually
+
+RESORT_THRESHOLD = 0.25
+
+# sort values that depend on relay information from the consensus and
+# descriptors
+
+RELAY_SORT_ATTR = (SortAttr.FINGERPRINT, SortAttr.NICKNAME, SortAttr.LISTING)
+
+# sort values that depend on reverse dns lookups, as (SortAttr, ListingType)
+# cache keys since listings only depend on them when listing by hostname
+
+HOSTNAME_SORT_KEYS = ((SortAttr.HOSTNAME, None), (SortAttr.LISTING, ListingType.HOSTNAME))
+
 
 class ConnectionPanelEntry:
   """
   Common parent for connection panel entries. This consists of a list of lines
   in the panel listing. This caches results until the display indicates that
   they should be flushed.
+
+  Sort values are also cached, so resorting doesn't repeat their lookups.
+  These are kept until the data they're derived from changes, at which point
+  they should be invalidated.
   """
 
   def __init__(self):
     self.lines = []
     self.flush_cache = True
+    self._sort_values = {}  # (SortAttr, ListingType) => sort value
 
   def getLines(self):
     """
@@ -70,7 +94,34 @@ class ConnectionPanelEntry:
                     entries by
     """
 
-    return [self.get_sort_value(attr, listing_type) for attr in sort_attrs]
+    results = []
+
+    for attr in sort_attrs:
+      cache_key = (attr, listing_type if attr == SortAttr.LISTING else None)
+
+      if cache_key not in self._sort_values:
+        self._sort_values[cache_key] = self.get_sort_value(attr, listing_type)
+
+      results.append(self._sort_values[cache_key])
+
+    return results
+
+  def invalidate_sort_values(self, attrs = None):
+    """
+    Drops cached sort values so they're recalculated when next requested.
+
+    Arguments:
+      attrs - SortAttr values to be dropped, all of them if None, these can
+              also be (SortAttr, ListingType) tuples to only drop the values
+              of a listing type (None for attributes besides SortAttr.LISTING)
+    """
+
+    if attrs is None:
+      self._sort_values = {}
+    else:
+      for cache_key in self._sort_values.keys():
+        if cache_key[0] in attrs or cache_key in attrs:
+          del self._sort_values[cache_key]
 
   def get_sort_value(self, attr, listing_type):
     """
@@ -105,6 +156,243 @@ class ConnectionPanelEntry:
     self.flush_cache = True
 
 
+class SortedEntries:
+  """
+  Connection panel entries, kept in order as they're added, removed, or
+  change rather than resorting everything. Entries are positioned by
+  bisecting on their sort keys, which also include the order they were added
+  so entries with equal sort values keep their relative order.
+  """
+
+  def __init__(self, key_function):
+    """
+    Initializes an empty listing.
+
+    Arguments:
+      key_function - provides the sort values for an entry
+    """
+
+    self._key_function = key_function
+    self._entries = []   # entries in sorted order
+    self._keys = []      # sort keys, in the same order as the entries
+    self._entry_keys = {}  # mapping of entries to their current sort key
+    self._added_count = 0
+
+    # incremented when our entries or their lines might have changed
+
+    self.generation = 0
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __iter__(self):
+    return iter(self._entries)
+
+  def __getitem__(self, index):
+    return self._entries[index]
+
+  def __contains__(self, entry):
+    return entry in self._entry_keys
+
+  def add(self, entry):
+    """
+    Inserts an entry at its sorted position.
+
+    Arguments:
+      entry - entry to be added
+    """
+
+    key = tuple(self._key_function(entry)) + (self._added_count,)
+    self._added_count += 1
+    self._insert(entry, key)
+    self.generation += 1
+
+  def remove(self, entry):
+    """
+    Removes an entry from the listing.
+
+    Arguments:
+      entry - entry to be removed
+    """
+
+    index = bisect.bisect_left(self._keys, self._entry_keys.pop(entry))
+    del self._keys[index]
+    del self._entries[index]
+    self.generation += 1
+
+  def index(self, entry):
+    """
+    Provides the position of an entry in the listing.
+
+    Arguments:
+      entry - entry to be located
+    """
+
+    if entry not in self._entry_keys:
+      raise ValueError("entry isn't in the listing")
+
+    return bisect.bisect_left(self._keys, self._entry_keys[entry])
+
+  def update(self, entries = None):
+    """
+    Moves entries whose sort values have changed. This provides the number of
+    entries that were moved. Our generation is incremented regardless, since
+    this is called when the entries themselves have been revised.
+
+    Arguments:
+      entries - entries whose sort values may have changed, all of them if
+                None
+    """
+
+    moved = []
+
+    for entry in (self._entries if entries is None else entries):
+      old_key = self._entry_keys[entry]
+      new_key = tuple(self._key_function(entry)) + old_key[-1:]
+
+      if new_key != old_key:
+        moved.append((entry, new_key))
+
+    if len(moved) > len(self._entries) * RESORT_THRESHOLD:
+      self._entry_keys.update(moved)
+      self._resort()
+    else:
+      for entry, new_key in moved:
+        self.remove(entry)
+        self._insert(entry, new_key)
+
+    self.generation += 1
+    return len(moved)
+
+  def set_key_function(self, key_function):
+    """
+    Changes how we're sorted, reordering all of our entries.
+
+    Arguments:
+      key_function - provides the sort values for an entry
+    """
+
+    self._key_function = key_function
+
+    for entry in self._entries:
+      self._entry_keys[entry] = tuple(key_function(entry)) + self._entry_keys[entry][-1:]
+
+    self._resort()
+    self.generation += 1
+
+  def _insert(self, entry, key):
+    index = bisect.bisect_left(self._keys, key)
+    self._keys.insert(index, key)
+    self._entries.insert(index, entry)
+    self._entry_keys[entry] = key
+
+  def _resort(self):
+    ordering = sorted(self._entry_keys.items(), key = lambda item: item[1])
+    self._entries = [entry for (entry, _) in ordering]
+    self._keys = [key for (_, key) in ordering]
+
+
+class EntryLines:
+  """
+  The lines of a SortedEntries listing, provided as a sequence without
+  flattening them into a list. Lines are located with a HeightIndex of each
+  entry's line count, so the total and the lines in view are found in
+  logarithmic time. This index is rebuilt lazily, the first time we're used
+  after the listing's generation changes.
+  """
+
+  def __init__(self, listing):
+    """
+    Initializes a view of the given listing's lines.
+
+    Arguments:
+      listing - SortedEntries to provide the lines of
+    """
+
+    self._listing = listing
+    self._generation = None
+    self._heights = None    # HeightIndex for the number of lines in each entry
+    self._line_owners = {}  # mapping of lines to the entry they belong to
+
+  def __len__(self):
+    return self._get_heights().get_total()
+
+  def __iter__(self):
+    for entry in self._listing:
+      for line in entry.getLines():
+        yield line
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      start, stop, step = index.indices(len(self))
+
+      if step != 1:
+        return [self[i] for i in range(start, stop, step)]
+
+      return self.get_window(start, stop - start)
+
+    total = len(self)
+
+    if index < 0:
+      index += total
+
+    if not 0 <= index < total:
+      raise IndexError("line index out of range")
+
+    entry_index, line_offset = self._get_heights().find(index)
+    return self._listing[entry_index].getLines()[line_offset]
+
+  def __contains__(self, line):
+    self._get_heights()
+    return line in self._line_owners
+
+  def index(self, line):
+    """
+    Provides the position of a line.
+
+    Arguments:
+      line - line to be located
+    """
+
+    heights = self._get_heights()
+
+    if line not in self._line_owners:
+      raise ValueError("line isn't in the listing")
+
+    entry = self._line_owners[line]
+    return heights.get_offset(self._listing.index(entry)) + entry.getLines().index(line)
+
+  def get_window(self, start, count):
+    """
+    Provides the lines within a range, only walking the entries that cover
+    it.
+
+    Arguments:
+      start - position of the first line
+      count - maximum number of lines to provide
+    """
+
+    heights = self._get_heights()
+    entry_index, line_offset = heights.find(max(0, start))
+    window = []
+
+    while len(window) < count and entry_index < len(self._listing):
+      window += self._listing[entry_index].getLines()[line_offset:line_offset + count - len(window)]
+      entry_index, line_offset = entry_index + 1, 0
+
+    return window
+
+  def _get_heights(self):
+    if self._generation != self._listing.generation:
+      entry_lines = [(entry, entry.getLines()) for entry in self._listing]
+
+      self._heights = uiTools.HeightIndex([len(lines) for (_, lines) in entry_lines])
+      self._line_owners = dict([(line, entry) for (entry, lines) in entry_lines for line in lines])
+      self._generation = self._listing.generation
+
+    return self._heights
+
+
 class ConnectionPanelLine:
   """
   Individual line in the connection panel listing.
@@ -17,6 +17,7 @@ import arm.configPanel
 import arm.torrcPanel
 import arm.graphing.graphPanel
 import arm.graphing.bandwidthStats
+import arm.graphing.circStats
 import arm.graphing.connStats
 import arm.graphing.resourceStats
 import arm.connections.connPanel
@@ -24,6 +25,7 @@ import arm.util.tracker
 
 from stem.control import State
 
+from arm.graphing.history import HistoryStore
 from arm.util import panel, torConfig, torTools
 
 from stem.util import conf, enum, log, system
@@ -51,14 +53,15 @@ CONFIG = conf.config_dict("arm", {
   "features.confirmQuit": True,
   "features.graph.type": 1,
   "features.graph.bw.prepopulate": True,
+  "features.graph.persist": True,
   "start_time": 0,
 }, conf_handler)
 
-GraphStat = enum.Enum("BANDWIDTH", "CONNECTIONS", "SYSTEM_RESOURCES")
+GraphStat = enum.Enum("BANDWIDTH", "CONNECTIONS", "SYSTEM_RESOURCES", "CIRCUITS")
 
 # maps 'features.graph.type' config values to the initial types
 
-GRAPH_INIT_STATS = {1: GraphStat.BANDWIDTH, 2: GraphStat.CONNECTIONS, 3: GraphStat.SYSTEM_RESOURCES}
+GRAPH_INIT_STATS = {1: GraphStat.BANDWIDTH, 2: GraphStat.CONNECTIONS, 3: GraphStat.SYSTEM_RESOURCES, 4: GraphStat.CIRCUITS}
 
 
 def get_controller():
@@ -84,6 +87,12 @@ def stop_controller():
       for panel_impl in control.get_daemon_panels():
         panel_impl.join()
 
+      graph_panel = control.get_panel("graph")
+
+      if graph_panel:
+        for stats in graph_panel.stats.values():
+          stats.set_history_store(None)
+
   halt_thread = threading.Thread(target = halt_controller)
   halt_thread.start()
   return halt_thread
@@ -170,6 +179,13 @@ def init_controller(stdscr, start_time):
 
   ARM_CONTROLLER = Controller(stdscr, sticky_panels, page_panels)
 
+  # archives logged events in our data directory
+
+  log_panel = ARM_CONTROLLER.get_panel("log")
+
+  if log_panel:
+    log_panel.start_archive(os.path.join(ARM_CONTROLLER.get_data_directory(), "event_archive"))
+
   # additional configuration for the graph panel
 
   graph_panel = ARM_CONTROLLER.get_panel("graph")
@@ -180,6 +196,7 @@ def init_controller(stdscr, start_time):
     bw_stats = arm.graphing.bandwidthStats.BandwidthStats()
     graph_panel.add_stats(GraphStat.BANDWIDTH, bw_stats)
     graph_panel.add_stats(GraphStat.SYSTEM_RESOURCES, arm.graphing.resourceStats.ResourceStats())
+    graph_panel.add_stats(GraphStat.CIRCUITS, arm.graphing.circStats.CircStats())
 
     if CONFIG["features.panels.show.connection"]:
       graph_panel.add_stats(GraphStat.CONNECTIONS, arm.graphing.connStats.ConnStats())
@@ -192,6 +209,21 @@ def init_controller(stdscr, start_time):
     except ValueError:
       pass  # invalid stats, maybe connections when lookups are disabled
 
+    # restores the graph history saved when we last ran, and saves it from here
+    # on out
+
+    if CONFIG["features.graph.persist"]:
+      history_dir = os.path.join(ARM_CONTROLLER.get_data_directory(), "graph_history")
+      intervals = [timescale for (_, timescale) in arm.graphing.graphPanel.UPDATE_INTERVALS]
+
+      for label, stats in graph_panel.stats.items():
+        history_path = os.path.join(history_dir, label.lower().replace(" ", "_"))
+
+        try:
+          stats.set_history_store(HistoryStore(history_path, intervals, stats.history_size))
+        except (IOError, OSError) as exc:
+          log.warn("Unable to save the %s graph's history: %s" % (label.lower(), exc))
+
     # prepopulates bandwidth values from state file
 
     if CONFIG["features.graph.bw.prepopulate"] and torTools.get_conn().is_alive():
@@ -200,6 +232,11 @@ def init_controller(stdscr, start_time):
       if is_successful:
         graph_panel.update_interval = 4
 
+        # directory and IPv6 traffic that's only available from the state file
+
+        for label, stats in bw_stats.state_stats.items():
+          graph_panel.add_stats(label, stats)
+
 
 class LabelPanel(panel.Panel):
   """
@@ -2,4 +2,4 @@
 Graphing panel resources.
 """
 
-__all__ = ["graph_panel", "bandwidthStats", "connStats", "resourceStats"]
+__all__ = ["graph_panel", "bandwidthStats", "circStats", "connStats", "export", "history", "resourceStats"]
@@ -3,16 +3,20 @@ Tracks bandwidth usage of the tor process, expanding to include accounting
 stats if they're set.
 """
 
+import calendar
+import copy
 import time
 import curses
 
 import arm.controller
+import arm.util.tracker
 
 from arm.graphing import graphPanel
+from arm.graphing.percentiles import Window
 from arm.util import torTools, uiTools
 
 from stem.control import State
-from stem.util import conf, log, str_tools, system
+from stem.util import conf, log, str_tools
 
 
 def conf_handler(key, value):
@@ -39,16 +43,261 @@ COLLAPSE_WIDTH = 135
 
 ACCOUNTING_ARGS = ("status", "reset_time", "read", "written", "read_limit", "writtenLimit")
 
+# seconds for the weight of a rate sample to halve when forecasting accounting
+# usage
+
+FORECAST_HALF_LIFE = 1800
+
 PREPOPULATE_SUCCESS_MSG = "Read the last day of bandwidth history from the state file"
 PREPOPULATE_FAILURE_MSG = "Unable to prepopulate bandwidth information (%s)"
 
+# optional histories from tor's state file, as (graph label, prefix) tuples
+
+STATE_HISTORIES = (
+  ("Directory Bandwidth", "BWHistoryDir"),
+  ("IPv6 Bandwidth", "BWHistoryIPv6"),
+)
+
+
+def read_state_history(state_lines):
+  """
+  Provides the history related entries from tor's state file.
+
+  Arguments:
+    state_lines - contents of the state file
+  """
+
+  state = {}
+
+  for line in state_lines:
+    if line.startswith("BWHistory") and " " in line:
+      key, value = line.strip().split(" ", 1)
+      state[key] = value
+
+  return state
+
+
+def get_state_history(state, prefix, now):
+  """
+  Provides a tuple of the form (interval, last_time, values) for a history in
+  tor's state file, values being KB/s (oldest to newest). This is None if the
+  history is missing or malformed.
+
+  Arguments:
+    state  - state file entries from read_state_history()
+    prefix - history to be read, such as "BWHistoryRead"
+    now    - unix timestamp used to determine the intervals since it was saved
+  """
+
+  if not prefix + "Values" in state or not prefix + "Ends" in state:
+    return None
+
+  try:
+    interval = int(state.get(prefix + "Interval", 900))
+    values = [int(entry) / 1024.0 / interval for entry in state[prefix + "Values"].split(",")]
+    ends = calendar.timegm(time.strptime(state[prefix + "Ends"], "%Y-%m-%d %H:%M:%S"))
+  except ValueError:
+    return None
+
+  # According to the rep_hist_update_state() function the BWHistory*Ends
+  # correspond to the start of the following sampling period. Also, the
+  # most recent values of BWHistory*Values appear to be an incremental
+  # counter for the current sampling period. Hence, offsets are added to
+  # account for both.
+
+  values.pop()
+  last_time = ends - interval
+
+  if not values or interval <= 0:
+    return None
+
+  # fills missing entries with the last value
+
+  values += [values[-1]] * max(0, int((now - last_time) / interval))
+
+  return (interval, last_time, values)
+
+
+def get_state_entries(state, prefix, now, start_time):
+  """
+  Provides a tuple of the form (interval, last_time, read_values,
+  write_values) for the read and write histories with the given prefix,
+  cropped to the same size and to when this tor instance was running (so
+  the values are empty if it hasn't been up for an interval). This is None if
+  either history is unavailable or their intervals differ.
+
+  Arguments:
+    state      - state file entries from read_state_history()
+    prefix     - histories to be read, such as "BWHistory" for the
+                 BWHistoryRead and BWHistoryWrite entries
+    now        - unix timestamp used to determine the intervals since they
+                 were saved
+    start_time - unix timestamp when tor started
+  """
+
+  read_history = get_state_history(state, prefix + "Read", now)
+  write_history = get_state_history(state, prefix + "Write", now)
+
+  if not read_history or not write_history or read_history[0] != write_history[0]:
+    return None
+
+  interval, read_entries, write_entries = read_history[0], read_history[2], write_history[2]
+  last_time = min(read_history[1], write_history[1])
+
+  entry_count = min(len(read_entries), len(write_entries), int((now - start_time) / interval))
+
+  if entry_count <= 0:
+    return (interval, last_time, [], [])
+
+  return (interval, last_time, read_entries[-entry_count:], write_entries[-entry_count:])
+
+
+def fill_history(stats, interval, read_entries, write_entries):
+  """
+  Replaces the history of the 15 minute and longer intervals with values from
+  tor's state file, consolidating them for the longer intervals.
+
+  Arguments:
+    stats         - GraphStats to be filled
+    interval      - number of seconds each of the entries covers
+    read_entries  - read values, oldest to newest
+    write_entries - write values, oldest to newest
+  """
+
+  for interval_index, (_, timescale) in enumerate(graphPanel.UPDATE_INTERVALS):
+    if timescale < interval or timescale % interval != 0:
+      continue
+
+    read_values = consolidate(read_entries, timescale / interval)[-stats.history_size:]
+    write_values = consolidate(write_entries, timescale / interval)[-stats.history_size:]
+
+    stats._clear_history(interval_index)
+
+    for read_value, write_value in zip(read_values, write_values):
+      stats._append(interval_index, read_value, write_value)
+
+
+def consolidate(values, factor):
+  """
+  Averages each group of the given number of values, working back from the
+  newest so a partial group of the oldest values is dropped.
+
+  Arguments:
+    values - values to be consolidated, oldest to newest
+    factor - number of values for each of the results
+  """
+
+  if factor <= 1:
+    return list(values)
+
+  results = []
+
+  for end in range(len(values), factor - 1, -factor):
+    results.insert(0, sum(values[end - factor:end]) / float(factor))
+
+  return results
+
+
+def get_accounting_time_label(sec):
+  """
+  Provides a label for the given number of seconds, verbose if
+  features.graph.bw.accounting.isTimeLong is set and 'days:hours:min:sec'
+  otherwise.
+
+  Arguments:
+    sec - number of seconds to be labeled
+  """
+
+  if CONFIG["features.graph.bw.accounting.isTimeLong"]:
+    return ", ".join(str_tools.get_time_labels(sec, True))
+  else:
+    days = sec / 86400
+    sec %= 86400
+    hours = sec / 3600
+    sec %= 3600
+    minutes = sec / 60
+    sec %= 60
+    return "%i:%02i:%02i:%02i" % (days, hours, minutes, sec)
+
+
+class AccountingForecast:
+  """
+  Projects when an accounting limit will be reached, using an exponentially
+  weighted moving average of our recent rate. Usage is what tor last reported
+  plus what we've seen since, so this stays current between queries.
+  """
+
+  def __init__(self, half_life = FORECAST_HALF_LIFE):
+    """
+    Initializes a forecast with no usage or rate.
+
+    Arguments:
+      half_life - seconds for the weight of a rate sample to halve
+    """
+
+    self._decay = 0.5 ** (1.0 / half_life)
+    self._rate = 0.0
+    self._weight = 0.0  # total weight of our samples, to correct the average's startup bias
+    self._used = None
+    self._limit = None
+
+  def add(self, value):
+    """
+    Includes the bytes used over the last second.
+
+    Arguments:
+      value - number of bytes
+    """
+
+    self._rate = self._rate * self._decay + value * (1 - self._decay)
+    self._weight = self._weight * self._decay + (1 - self._decay)
+
+    if self._used is not None:
+      self._used += value
+
+  def set_usage(self, used, limit):
+    """
+    Sets the bytes used and available in the accounting period, as reported
+    by tor.
+
+    Arguments:
+      used  - number of bytes used so far
+      limit - number of bytes we can use in total
+    """
+
+    self._used, self._limit = used, limit
+
+  def get_rate(self):
+    """
+    Provides our recent rate in bytes per second, None if we don't have one.
+    """
+
+    return self._rate / self._weight if self._weight else None
+
+  def get_time_left(self):
+    """
+    Provides the number of seconds until we reach the limit at our recent
+    rate. This is None if our usage is unknown or we aren't using anything.
+    """
+
+    rate = self.get_rate()
+
+    if self._used is None:
+      return None
+    elif self._used >= self._limit:
+      return 0
+    elif not rate:
+      return None
+    else:
+      return (self._limit - self._used) / rate
+
 
 class BandwidthStats(graphPanel.GraphStats):
   """
   Uses tor BW events to generate bandwidth usage graph.
   """
 
-  def __init__(self, is_pause_buffer = False):
+  def __init__(self):
     graphPanel.GraphStats.__init__(self)
 
     # stats prepopulated from tor's state file
@@ -57,20 +306,29 @@ class BandwidthStats(graphPanel.GraphStats):
     self.prepopulate_secondary_total = 0
     self.prepopulate_ticks = 0
 
+    # graphs of the optional STATE_HISTORIES tor provided, by their label
+
+    self.state_stats = {}
+
     # accounting data (set by _update_accounting_info method)
 
     self.accounting_last_updated = 0
     self.accounting_info = dict([(arg, "") for arg in ACCOUNTING_ARGS])
 
+    # projected usage of our read and written limits, and when the accounting
+    # period ends
+
+    self.read_forecast = AccountingForecast()
+    self.write_forecast = AccountingForecast()
+    self.accounting_end = None
+
     # listens for tor reload (sighup) events which can reset the bandwidth
     # rate/burst and if tor's using accounting
 
     conn = torTools.get_conn()
     self._title_stats, self.is_accounting = [], False
 
-    if not is_pause_buffer:
-      self.reset_listener(conn.get_controller(), State.INIT, None)  # initializes values
-
+    self.reset_listener(conn.get_controller(), State.INIT, None)  # initializes values
     conn.add_status_listener(self.reset_listener)
 
     # Initialized the bandwidth totals to the values reported by Tor. This
@@ -94,18 +352,13 @@ class BandwidthStats(graphPanel.GraphStats):
       self.initial_secondary_total = int(write_total) / 1024  # Bytes -> KB
 
   def clone(self, new_copy = None):
-    if not new_copy:
-      new_copy = BandwidthStats(True)
-
-    new_copy.accounting_last_updated = self.accounting_last_updated
-    new_copy.accounting_info = self.accounting_info
+    # our forecasts are updated in place, so they'd otherwise keep changing
+    # while paused
 
-    # attributes that would have been initialized from calling the reset_listener
-
-    new_copy.is_accounting = self.is_accounting
-    new_copy._title_stats = self._title_stats
-
-    return graphPanel.GraphStats.clone(self, new_copy)
+    new_copy = graphPanel.GraphStats.clone(self, new_copy)
+    new_copy.read_forecast = copy.copy(self.read_forecast)
+    new_copy.write_forecast = copy.copy(self.write_forecast)
+    return new_copy
 
   def reset_listener(self, controller, event_type, _):
     # updates title parameters and accounting status if they changed
@@ -132,8 +385,11 @@ class BandwidthStats(graphPanel.GraphStats):
   def prepopulate_from_state(self):
     """
     Attempts to use tor's state file to prepopulate values for the 15 minute
-    interval via the BWHistoryReadValues/BWHistoryWriteValues values. This
-    returns True if successful and False otherwise.
+    and longer intervals via the BWHistoryReadValues/BWHistoryWriteValues
+    values. This returns True if successful and False otherwise.
+
+    The optional STATE_HISTORIES (directory and IPv6 traffic) are also loaded
+    into state_stats if tor provides them.
     """
 
     # checks that this is a relay (if ORPort is unset, then skip)
@@ -144,31 +400,16 @@ class BandwidthStats(graphPanel.GraphStats):
     if or_port == "0":
       return
 
-    # gets the uptime (using the same parameters as the header panel to take
-    # advantage of caching)
-    # TODO: stem dropped system caching support so we'll need to think of
-    # something else
-
-    uptime = None
-    query_pid = conn.controller.get_pid(None)
+    # gets tor's start time from the resource tracker, which already polls
+    # proc (or ps) for it, so we only need to look it up if it hasn't run yet
 
-    if query_pid:
-      query_param = ["%cpu", "rss", "%mem", "etime"]
-      query_cmd = "ps -p %s -o %s" % (query_pid, ",".join(query_param))
-      ps_call = system.call(query_cmd, None)
+    start_time = arm.util.tracker.get_resource_tracker().get_resource_usage().start_time
 
-      if ps_call and len(ps_call) == 2:
-        stats = ps_call[1].strip().split()
+    if not start_time:
+      start_time = conn.get_start_time()
 
-        if len(stats) == 4:
-          uptime = stats[3]
-
-    # checks if tor has been running for at least a day, the reason being that
-    # the state tracks a day's worth of data and this should only prepopulate
-    # results associated with this tor instance
-
-    if not uptime or not "-" in uptime:
-      msg = PREPOPULATE_FAILURE_MSG % "insufficient uptime"
+    if not start_time:
+      msg = PREPOPULATE_FAILURE_MSG % "unable to determine tor's uptime"
       log.notice(msg)
       return False
 
@@ -181,99 +422,51 @@ class BandwidthStats(graphPanel.GraphStats):
       log.notice(msg)
       return False
 
-    # attempt to open the state file
+    # attempt to read the state file
 
     try:
-      state_file = open("%s%s/state" % (CONFIG['tor.chroot'], data_dir), "r")
+      with open("%s%s/state" % (CONFIG['tor.chroot'], data_dir), "r") as state_file:
+        state = read_state_history(state_file)
     except IOError:
       msg = PREPOPULATE_FAILURE_MSG % "unable to read the state file"
       log.notice(msg)
       return False
 
-    # get the BWHistory entries (ordered oldest to newest) and number of
-    # intervals since last recorded
-
-    bw_read_entries, bw_write_entries = None, None
-    missing_read_entries, missing_write_entries = None, None
-
-    # converts from gmt to local with respect to DST
-
-    tz_offset = time.altzone if time.localtime()[8] else time.timezone
-
-    for line in state_file:
-      line = line.strip()
-
-      # According to the rep_hist_update_state() function the BWHistory*Ends
-      # correspond to the start of the following sampling period. Also, the
-      # most recent values of BWHistory*Values appear to be an incremental
-      # counter for the current sampling period. Hence, offsets are added to
-      # account for both.
-
-      if line.startswith("BWHistoryReadValues"):
-        bw_read_entries = line[20:].split(",")
-        bw_read_entries = [int(entry) / 1024.0 / 900 for entry in bw_read_entries]
-        bw_read_entries.pop()
-      elif line.startswith("BWHistoryWriteValues"):
-        bw_write_entries = line[21:].split(",")
-        bw_write_entries = [int(entry) / 1024.0 / 900 for entry in bw_write_entries]
-        bw_write_entries.pop()
-      elif line.startswith("BWHistoryReadEnds"):
-        last_read_time = time.mktime(time.strptime(line[18:], "%Y-%m-%d %H:%M:%S")) - tz_offset
-        last_read_time -= 900
-        missing_read_entries = int((time.time() - last_read_time) / 900)
-      elif line.startswith("BWHistoryWriteEnds"):
-        last_write_time = time.mktime(time.strptime(line[19:], "%Y-%m-%d %H:%M:%S")) - tz_offset
-        last_write_time -= 900
-        missing_write_entries = int((time.time() - last_write_time) / 900)
-
-    if not bw_read_entries or not bw_write_entries or not last_read_time or not last_write_time:
+    now = time.time()
+    entries = get_state_entries(state, "BWHistory", now, start_time)
+
+    if not entries:
       msg = PREPOPULATE_FAILURE_MSG % "bandwidth stats missing from state file"
       log.notice(msg)
       return False
 
-    # fills missing entries with the last value
-
-    bw_read_entries += [bw_read_entries[-1]] * missing_read_entries
-    bw_write_entries += [bw_write_entries[-1]] * missing_write_entries
+    interval, last_time, bw_read_entries, bw_write_entries = entries
 
-    # crops starting entries so they're the same size
+    if not bw_read_entries:
+      msg = PREPOPULATE_FAILURE_MSG % "insufficient uptime"
+      log.notice(msg)
+      return False
 
-    entry_count = min(len(bw_read_entries), len(bw_write_entries), self.max_column)
-    bw_read_entries = bw_read_entries[len(bw_read_entries) - entry_count:]
-    bw_write_entries = bw_write_entries[len(bw_write_entries) - entry_count:]
+    # fills the graphing parameters with state information, replacing what we
+    # might've restored since tor was tracking it while we weren't running
 
-    # gets index for 15-minute interval
+    fill_history(self, interval, bw_read_entries, bw_write_entries)
 
-    interval_index = 0
+    for label, prefix in STATE_HISTORIES:
+      state_entries = get_state_entries(state, prefix, now, start_time)
 
-    for index_entry in graphPanel.UPDATE_INTERVALS:
-      if index_entry[1] == 900:
-        break
-      else:
-        interval_index += 1
-
-    # fills the graphing parameters with state information
-
-    for i in range(entry_count):
-      read_value, write_value = bw_read_entries[i], bw_write_entries[i]
+      if state_entries and state_entries[2]:
+        self.state_stats[label] = StateHistoryStats(label, *state_entries)
 
+    for read_value, write_value in zip(bw_read_entries, bw_write_entries)[-self.max_column:]:
       self.last_primary, self.last_secondary = read_value, write_value
 
-      self.prepopulate_primary_total += read_value * 900
-      self.prepopulate_secondary_total += write_value * 900
-      self.prepopulate_ticks += 900
-
-      self.primary_counts[interval_index].insert(0, read_value)
-      self.secondary_counts[interval_index].insert(0, write_value)
-
-    self.max_primary[interval_index] = max(self.primary_counts)
-    self.max_secondary[interval_index] = max(self.secondary_counts)
-
-    del self.primary_counts[interval_index][self.max_column + 1:]
-    del self.secondary_counts[interval_index][self.max_column + 1:]
+      self.prepopulate_primary_total += read_value * interval
+      self.prepopulate_secondary_total += write_value * interval
+      self.prepopulate_ticks += interval
 
     msg = PREPOPULATE_SUCCESS_MSG
-    missing_sec = time.time() - min(last_read_time, last_write_time)
+    missing_sec = now - last_time
 
     if missing_sec:
       msg += " (%s is missing)" % str_tools.get_time_label(missing_sec, 0, True)
@@ -283,8 +476,11 @@ class BandwidthStats(graphPanel.GraphStats):
     return True
 
   def bandwidth_event(self, event):
-    if self.is_accounting and self.is_next_tick_redraw():
-      if time.time() - self.accounting_last_updated >= CONFIG["features.graph.bw.accounting.rate"]:
+    if self.is_accounting:
+      self.read_forecast.add(event.read)
+      self.write_forecast.add(event.written)
+
+      if self.is_next_tick_redraw() and time.time() - self.accounting_last_updated >= CONFIG["features.graph.bw.accounting.rate"]:
         self._update_accounting_info()
 
     # scales units from B to KB for graphing
@@ -346,6 +542,18 @@ class BandwidthStats(graphPanel.GraphStats):
 
         if used and total:
           panel.addstr(labeling_line + 3, 37, "%s / %s" % (used, total), uiTools.get_color(self.get_color(False)))
+
+        # projects if we'll reach our limits before the period ends
+
+        now = time.time()
+        read_forecast = self._get_forecast_label(self.read_forecast, now)
+        write_forecast = self._get_forecast_label(self.write_forecast, now)
+
+        if read_forecast:
+          panel.addstr(labeling_line + 4, 2, read_forecast, uiTools.get_color(self.get_color(True)))
+
+        if write_forecast:
+          panel.addstr(labeling_line + 4, 37, write_forecast, uiTools.get_color(self.get_color(False)))
       else:
         panel.addstr(labeling_line + 2, 0, "Accounting:", curses.A_BOLD)
         panel.addstr(labeling_line + 2, 12, "Connection Closed...")
@@ -365,7 +573,7 @@ class BandwidthStats(graphPanel.GraphStats):
           return label
 
   def get_header_label(self, width, is_primary):
-    graph_type = "Download" if is_primary else "Upload"
+    graph_type = self.get_stat_name(is_primary)
     stats = [""]
 
     # if wide then avg and total are part of the header, otherwise they're on
@@ -376,7 +584,12 @@ class BandwidthStats(graphPanel.GraphStats):
       stats[1] = "- %s" % self._get_avg_label(is_primary)
       stats[2] = ", %s" % self._get_total_label(is_primary)
 
-    stats[0] = "%-14s" % ("%s/sec" % str_tools.get_size_label((self.last_primary if is_primary else self.last_secondary) * 1024, 1, False, CONFIG["features.graph.bw.transferInBytes"]))
+      p95 = self.get_percentiles(Window.HOUR, is_primary, (95,))[0]
+
+      if p95 is not None:
+        stats.append(", p95: %s" % self.get_value_label(p95, is_primary))
+
+    stats[0] = "%-14s" % self.get_value_label(self.last_primary if is_primary else self.last_secondary, is_primary)
 
     # drops label's components if there's not enough space
 
@@ -392,12 +605,18 @@ class BandwidthStats(graphPanel.GraphStats):
 
     return labeling
 
+  def get_stat_name(self, is_primary):
+    return "Download" if is_primary else "Upload"
+
+  def get_value_label(self, value, is_primary):
+    return "%s/sec" % str_tools.get_size_label(value * 1024, 1, False, CONFIG["features.graph.bw.transferInBytes"])
+
   def get_color(self, is_primary):
     return DL_COLOR if is_primary else UL_COLOR
 
   def get_content_height(self):
     base_height = graphPanel.GraphStats.get_content_height(self)
-    return base_height + 3 if self.is_accounting else base_height
+    return base_height + 4 if self.is_accounting else base_height
 
   def new_desc_event(self, event):
     # updates self._title_stats with updated values
@@ -452,6 +671,27 @@ class BandwidthStats(graphPanel.GraphStats):
     total += self.initial_primary_total if is_primary else self.initial_secondary_total
     return "total: %s" % str_tools.get_size_label(total * 1024, 1)
 
+  def _get_forecast_label(self, forecast, now):
+    """
+    Provides a label for when we'll reach an accounting limit at our recent
+    rate, or an empty string if we can't tell.
+
+    Arguments:
+      forecast - AccountingForecast for the read or written limit
+      now      - current unix timestamp
+    """
+
+    time_left = forecast.get_time_left()
+
+    if time_left is None or self.accounting_end is None:
+      return ""
+    elif time_left == 0:
+      return "limit reached"
+    elif now + time_left >= self.accounting_end:
+      return "lasts until reset"
+    else:
+      return "limit in %s" % get_accounting_time_label(time_left)
+
   def _update_accounting_info(self):
     """
     Updates mapping used for accounting info. This includes the following keys:
@@ -469,25 +709,12 @@ class BandwidthStats(graphPanel.GraphStats):
     end_interval = conn.get_info("accounting/interval-end", None)
 
     if end_interval:
-      # converts from gmt to local with respect to DST
+      # tor provides this in gmt
 
-      if time.localtime()[8]:
-        tz_offset = time.altzone
-      else:
-        tz_offset = time.timezone
-
-      sec = time.mktime(time.strptime(end_interval, "%Y-%m-%d %H:%M:%S")) - time.time() - tz_offset
-
-      if CONFIG["features.graph.bw.accounting.isTimeLong"]:
-        queried["reset_time"] = ", ".join(str_tools.get_time_labels(sec, True))
-      else:
-        days = sec / 86400
-        sec %= 86400
-        hours = sec / 3600
-        sec %= 3600
-        minutes = sec / 60
-        sec %= 60
-        queried["reset_time"] = "%i:%02i:%02i:%02i" % (days, hours, minutes, sec)
+      self.accounting_end = calendar.timegm(time.strptime(end_interval, "%Y-%m-%d %H:%M:%S"))
+      queried["reset_time"] = get_accounting_time_label(self.accounting_end - time.time())
+    else:
+      self.accounting_end = None
 
     # number of bytes used and in total for the accounting period
 
@@ -504,5 +731,57 @@ class BandwidthStats(graphPanel.GraphStats):
       queried["read_limit"] = str_tools.get_size_label(read + read_left)
       queried["writtenLimit"] = str_tools.get_size_label(written + written_left)
 
+      self.read_forecast.set_usage(read, read + read_left)
+      self.write_forecast.set_usage(written, written + written_left)
+
     self.accounting_info = queried
     self.accounting_last_updated = time.time()
+
+
+class StateHistoryStats(graphPanel.GraphStats):
+  """
+  Bandwidth history that's only available from tor's state file, such as the
+  traffic of directory requests. There aren't events for these, so the graph
+  is of what tor last saved (which its title notes) and isn't updated.
+  """
+
+  def __init__(self, label, interval, last_time, read_entries, write_entries):
+    """
+    Fills the graph with the given state file history.
+
+    Arguments:
+      label         - title of the graph, such as "Directory Bandwidth"
+      interval      - number of seconds each of the entries covers
+      last_time     - unix timestamp of the newest entry tor saved
+      read_entries  - read values, oldest to newest
+      write_entries - write values, oldest to newest
+    """
+
+    graphPanel.GraphStats.__init__(self)
+
+    self.label = label
+    self.last_time = last_time
+    self.last_primary, self.last_secondary = read_entries[-1], write_entries[-1]
+    self.primary_avg = sum(read_entries) / len(read_entries)
+    self.secondary_avg = sum(write_entries) / len(write_entries)
+
+    fill_history(self, interval, read_entries, write_entries)
+
+  def get_title(self, width):
+    saved_at = time.strftime("%H:%M", time.localtime(self.last_time))
+    label = "%s (from tor's state file, as of %s):" % (self.label, saved_at)
+
+    return label if len(label) <= width else "%s:" % self.label
+
+  def get_header_label(self, width, is_primary):
+    avg = self.primary_avg if is_primary else self.secondary_avg
+    return "%s (avg: %s):" % (self.get_stat_name(is_primary), self.get_value_label(avg, is_primary))
+
+  def get_stat_name(self, is_primary):
+    return "Download" if is_primary else "Upload"
+
+  def get_value_label(self, value, is_primary):
+    return "%s/sec" % str_tools.get_size_label(value * 1024, 1, False, CONFIG["features.graph.bw.transferInBytes"])
+
+  def get_color(self, is_primary):
+    return DL_COLOR if is_primary else UL_COLOR
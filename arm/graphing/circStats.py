@@ -0,0 +1,167 @@
+"""
+Tracks how long tor takes to build circuits.
+"""
+
+import collections
+import math
+
+from arm.graphing import graphPanel
+from arm.graphing.percentiles import TDigest
+from arm.util import torTools
+
+from stem import CircStatus
+from stem.control import EventType
+
+# maximum number of circuits we'll track the launch of, if circuits never
+# finish building then the oldest are dropped
+
+MAX_IN_FLIGHT = 1000
+
+
+def get_percentile(sorted_values, percentile):
+  """
+  Provides the nearest ranked value for a percentile.
+
+  :param list sorted_values: values to pick from, in ascending order
+  :param int percentile: percentile to provide, from zero to a hundred
+
+  :returns: value for the percentile, zero if there are no values
+  """
+
+  if not sorted_values:
+    return 0
+
+  rank = int(math.ceil(len(sorted_values) * percentile / 100.0))
+  return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class CircStats(graphPanel.GraphStats):
+  """
+  Graphs the median and 90th percentile of the circuit build times (in
+  milliseconds) within each interval, along with counts of failed and closed
+  circuits. Build times are the difference between the LAUNCHED and BUILT
+  events for a circuit, and intervals without any are graphed as zero.
+
+  Percentiles can't be averaged, so rather than consolidating our per-second
+  values like other stats we sketch the build times of each interval that's in
+  progress, and graph their percentiles when it ends.
+  """
+
+  def __init__(self):
+    graphPanel.GraphStats.__init__(self)
+
+    # circuit ids mapped to when they were launched, oldest first
+
+    self.in_flight = collections.OrderedDict()
+    self.build_times = []  # circuits built since our last tick
+    self.failed_count, self.closed_count = 0, 0
+    self.build_timeout = None  # timeout tor last set, in milliseconds
+
+    # build times of the intervals in progress, the percentiles of the last
+    # interval that had any, and the number of ticks with builds
+
+    self.interval_build_times = {}
+    self.last_build_percentiles = {}
+    self.active_ticks = 0
+
+    for i in range(len(graphPanel.UPDATE_INTERVALS)):
+      self.interval_build_times[i] = TDigest()
+      self.last_build_percentiles[i] = (0, 0)
+
+    torTools.get_conn().add_event_listener(self.circ_event, EventType.CIRC, EventType.BUILDTIMEOUT_SET)
+
+  def circ_event(self, event):
+    if self.is_pause_buffer:
+      return
+
+    if event.type == EventType.BUILDTIMEOUT_SET:
+      if event.timeout is not None:
+        self.build_timeout = event.timeout
+    elif event.status == CircStatus.LAUNCHED:
+      self.in_flight[event.id] = event.arrived_at
+
+      if len(self.in_flight) > MAX_IN_FLIGHT:
+        self.in_flight.popitem(last = False)
+    elif event.status == CircStatus.BUILT:
+      launched_at = self.in_flight.pop(event.id, None)
+
+      if launched_at is not None:
+        self.build_times.append(max(0, event.arrived_at - launched_at) * 1000)
+    elif event.status == CircStatus.FAILED:
+      self.in_flight.pop(event.id, None)
+      self.failed_count += 1
+    elif event.status == CircStatus.CLOSED:
+      self.in_flight.pop(event.id, None)
+      self.closed_count += 1
+
+  def event_tick(self):
+    """
+    Includes the circuits built since our last tick, graphing the median and
+    90th percentile of each interval that ends.
+    """
+
+    build_times, self.build_times = sorted(self.build_times), []
+
+    for digest in self.interval_build_times.values():
+      for build_time in build_times:
+        digest.add(build_time)
+
+    if build_times:
+      self.active_ticks += 1
+
+    self._process_event(get_percentile(build_times, 50), get_percentile(build_times, 90))
+
+  def _get_interval_values(self, interval_index):
+    digest = self.interval_build_times[interval_index]
+    self.interval_build_times[interval_index] = TDigest()
+
+    if not digest.get_count():
+      return (0, 0, None, None)
+
+    median, percentile_90 = digest.get_quantile(0.5), digest.get_quantile(0.9)
+    extrema = (digest.get_quantile(1.0), digest.get_quantile(0.0))
+    self.last_build_percentiles[interval_index] = (median, percentile_90)
+
+    return (median, percentile_90, extrema, extrema)
+
+  def get_title(self, width):
+    stats = ["%i building" % len(self.in_flight)]
+
+    if self.build_timeout is not None:
+      stats.insert(0, "timeout: %s" % self.get_value_label(self.build_timeout, True))
+
+    labeling = "Circuit Build Time (%s):" % ", ".join(stats)
+    return labeling if len(labeling) <= width else "Circuit Build Time:"
+
+  def get_header_label(self, width, is_primary):
+    # percentiles of the last interval with builds, and the average over the
+    # seconds that had them
+
+    interval = self._graph_panel.update_interval if self._graph_panel else 0
+    last_amount = self.last_build_percentiles[interval][0 if is_primary else 1]
+    avg = (self.primary_total if is_primary else self.secondary_total) / max(1, self.active_ticks)
+
+    stats = [self.get_value_label(last_amount, is_primary), "avg: %s" % self.get_value_label(avg, is_primary)]
+
+    if is_primary:
+      stats.append("failed: %i" % self.failed_count)
+    else:
+      stats.append("closed: %i" % self.closed_count)
+
+    # drops the circuit count if there's not enough space
+
+    labeling = "%s (%s):" % (self.get_stat_name(is_primary), ", ".join(stats))
+
+    if len(labeling) >= width:
+      labeling = "%s (%s):" % (self.get_stat_name(is_primary), ", ".join(stats[:2]))
+
+    return labeling
+
+  def get_stat_name(self, is_primary):
+    return "Median" if is_primary else "90th Percentile"
+
+  def get_value_label(self, value, is_primary):
+    if value >= 1000:
+      return "%0.1f s" % (value / 1000.0)
+    else:
+      return "%i ms" % value
@@ -2,59 +2,98 @@
 Tracks stats concerning tor's current connections.
 """
 
+import collections
+
 import arm.util.tracker
 
+from arm.connections.connEntry import Category, CATEGORY_COLOR
 from arm.graphing import graphPanel
-from arm.util import torTools
+from arm.util import torTools, uiTools
 
 from stem.control import State
 
+# categories with their own series, presented beneath the graph
+
+SERIES_CATEGORIES = (Category.EXIT, Category.CIRCUIT, Category.DIRECTORY, Category.SOCKS)
+
+# categories of outbound connections, which can change with our circuits
+
+OUTBOUND_CATEGORIES = (Category.EXIT, Category.CIRCUIT, Category.DIRECTORY, Category.OUTBOUND)
+
 
 class ConnStats(graphPanel.GraphStats):
   """
   Tracks number of connections, counting client and directory connections as
   outbound. Control connections are excluded from counts.
+
+  Connections are categorized by their ports when they first appear, and counts
+  are adjusted as they come and go. Outbound connections depend on our
+  circuits, so they're categorized anew each time. This is only done when the
+  connection tracker has new results, rather than every tick.
+
+  The series beneath the graph are averaged over the graph's update interval,
+  like its columns.
   """
 
   def __init__(self):
     graphPanel.GraphStats.__init__(self)
 
+    self.last_counter = None     # tracker run our counts are from
+    self._categories = {}        # connections mapped to their category
+    self.category_counts = dict([(category, 0) for category in Category])
+
+    # recent counts for our series categories, oldest first, with the sum of
+    # counts for the interval in progress
+
+    self.category_history = dict([(category, collections.deque(maxlen = self.max_column)) for category in SERIES_CATEGORIES])
+    self.category_pending = dict([(category, 0) for category in SERIES_CATEGORIES])
+    self.pending_ticks = 0
+    self.history_interval = 0  # UPDATE_INTERVALS index of our history
+
     # listens for tor reload (sighup) events which can reset the ports tor uses
 
     conn = torTools.get_conn()
-    self.or_port, self.dir_port, self.control_port = "0", "0", "0"
+    self.or_port, self.dir_port, self.control_port, self.socks_port = "0", "0", "0", "0"
+    self.hidden_service_ports = []
     self.reset_listener(conn.get_controller(), State.INIT, None)  # initialize port values
     conn.add_status_listener(self.reset_listener)
 
-  def clone(self, new_copy=None):
-    if not new_copy:
-      new_copy = ConnStats()
-
-    return graphPanel.GraphStats.clone(self, new_copy)
+  def clone(self, new_copy = None):
+    new_copy = graphPanel.GraphStats.clone(self, new_copy)
+    new_copy.category_counts = dict(self.category_counts)
+    new_copy.category_history = dict([(category, collections.deque(history, maxlen = history.maxlen)) for (category, history) in self.category_history.items()])
+    new_copy.category_pending = dict(self.category_pending)
+    return new_copy
 
   def reset_listener(self, controller, event_type, _):
     if event_type in (State.INIT, State.RESET):
       self.or_port = controller.get_conf("ORPort", "0")
       self.dir_port = controller.get_conf("DirPort", "0")
       self.control_port = controller.get_conf("ControlPort", "0")
+      self.socks_port = controller.get_conf("SocksPort", "9050")
+      self.hidden_service_ports = torTools.get_conn().get_hidden_service_ports()
+
+      # our ports may have changed, so categorizes connections anew
+
+      self._categories = {}
+      self.category_counts = dict([(category, 0) for category in Category])
+      self.last_counter = None
 
   def event_tick(self):
     """
     Fetches connection stats from cached information.
     """
 
-    inbound_count, outbound_count = 0, 0
+    conn_tracker = arm.util.tracker.get_connection_tracker()
 
-    for entry in arm.util.tracker.get_connection_tracker().get_connections():
-      local_port = entry.local_port
+    if conn_tracker.run_counter() != self.last_counter:
+      self.last_counter = conn_tracker.run_counter()
+      self._update_counts(conn_tracker.get_connections())
 
-      if local_port in (self.or_port, self.dir_port):
-        inbound_count += 1
-      elif local_port == self.control_port:
-        pass  # control connection
-      else:
-        outbound_count += 1
+    inbound_count = self.category_counts[Category.INBOUND]
+    outbound_count = sum(self.category_counts.values()) - inbound_count - self.category_counts[Category.CONTROL]
 
+    self._update_history()
     self._process_event(inbound_count, outbound_count)
 
   def get_title(self, width):
@@ -68,5 +107,138 @@ class ConnStats(graphPanel.GraphStats):
     else:
       return "Outbound (%s, avg: %s):" % (self.last_secondary, avg)
 
+  def get_stat_name(self, is_primary):
+    return "Inbound" if is_primary else "Outbound"
+
+  def get_value_label(self, value, is_primary):
+    return "%i" % round(value)
+
+  def get_content_height(self):
+    return graphPanel.GraphStats.get_content_height(self) + 2
+
+  def draw(self, panel, width, height):
+    # presents the counts and recent history of each category beneath the
+    # x-axis labeling, for instance...
+    #   Exit: 3 ..:: Circuit: 12 :::: Directory: 0 .... Socks: 2 ::..
+
+    line = graphPanel.GraphStats.get_content_height(self) + panel.graph_height
+    column_width = width / len(SERIES_CATEGORIES)
+    x = 0
+
+    for category in SERIES_CATEGORIES:
+      label = "%s: %i " % (category, self.category_counts[category])
+      sparkline = uiTools.get_sparkline(list(self.category_history[category]), column_width - len(label) - 1)
+
+      panel.addstr(line, x, label + sparkline, uiTools.get_color(CATEGORY_COLOR[category]))
+      x += column_width
+
   def get_refresh_rate(self):
     return 5
+
+  def _update_history(self):
+    """
+    Adds our counts to the interval in progress, appending their average to
+    our history when the graph's interval ends. Our history is cleared if the
+    graph's interval has changed.
+    """
+
+    interval = self._graph_panel.update_interval if self._graph_panel else 0
+
+    if interval != self.history_interval:
+      for category in SERIES_CATEGORIES:
+        self.category_history[category] = collections.deque(maxlen = self.max_column)
+        self.category_pending[category] = 0
+
+      self.pending_ticks = 0
+      self.history_interval = interval
+
+    for category in SERIES_CATEGORIES:
+      self.category_pending[category] += self.category_counts[category]
+
+    self.pending_ticks += 1
+
+    # the next tick is the one _process_event() is about to make
+
+    if (self.tick + 1) % graphPanel.UPDATE_INTERVALS[interval][1] == 0:
+      for category in SERIES_CATEGORIES:
+        self.category_history[category].append(float(self.category_pending[category]) / self.pending_ticks)
+        self.category_pending[category] = 0
+
+      self.pending_ticks = 0
+
+  def _update_counts(self, connections):
+    """
+    Adjusts our counts for the connections that have come and gone since we
+    last checked, and outbound connections whose circuits have changed.
+    """
+
+    current = set(connections)
+
+    for entry in set(self._categories) - current:
+      self.category_counts[self._categories.pop(entry)] -= 1
+
+    circuits = None  # fetched if we need them
+
+    for entry in current:
+      previous = self._categories.get(entry)
+
+      if previous is None:
+        category = self._get_base_category(entry)
+      elif previous in OUTBOUND_CATEGORIES:
+        category = Category.OUTBOUND
+      else:
+        continue  # categorized by our ports, which are unchanged
+
+      if category == Category.OUTBOUND:
+        if circuits is None:
+          circuits = torTools.get_conn().get_circuits()
+
+        category = self._get_outbound_category(entry, circuits)
+
+      if category != previous:
+        if previous is not None:
+          self.category_counts[previous] -= 1
+
+        self._categories[entry] = category
+        self.category_counts[category] += 1
+
+  def _get_base_category(self, entry):
+    """
+    Categorizes a connection by its ports.
+    """
+
+    local_port, remote_port = str(entry.local_port), str(entry.remote_port)
+
+    if local_port in (self.or_port, self.dir_port):
+      return Category.INBOUND
+    elif local_port == self.socks_port:
+      return Category.SOCKS
+    elif remote_port in self.hidden_service_ports:
+      return Category.HIDDEN
+    elif local_port == self.control_port:
+      return Category.CONTROL
+    else:
+      return Category.OUTBOUND
+
+  def _get_outbound_category(self, entry, circuits):
+    """
+    Determines if an outbound connection is an exit, the first hop of one of
+    our circuits, or a directory request (a single hop circuit). This is the
+    same criteria used by the connection panel.
+    """
+
+    conn = torTools.get_conn()
+    fingerprint = conn.get_relay_fingerprint(entry.remote_address, entry.remote_port)
+
+    if not fingerprint:
+      if conn.is_exiting_allowed(entry.remote_address, entry.remote_port):
+        return Category.EXIT
+    else:
+      first_hops = [(status, len(path)) for (_, status, _, path) in circuits if path and path[0] == fingerprint]
+
+      if [hop for hop in first_hops if hop != ("BUILT", 1)]:
+        return Category.CIRCUIT
+      elif first_hops:
+        return Category.DIRECTORY
+
+    return Category.OUTBOUND
@@ -0,0 +1,143 @@
+"""
+Exports the history of our graphs as CSV or JSON. Rows are generated and
+written one at a time, so long histories are never held in memory as a
+whole.
+
+::
+
+  get_format - format to export a path with
+  stats_history - rows for the history of GraphStats instances
+  store_history - rows for the history in HistoryStore files
+  write_history - writes rows to a file
+"""
+
+import csv
+import json
+import os
+import time
+
+from arm.graphing.history import HistoryStore
+
+from stem.util import enum
+
+Format = enum.Enum("CSV", "JSON")
+
+FIELDS = ("graph", "interval", "timestamp", "primary", "secondary")
+
+
+def get_format(path):
+  """
+  Provides the format we should export to a path with. This is JSON if the
+  path ends with '.json', and CSV otherwise.
+
+  :param str path: location being exported to
+
+  :returns: **Format** for the export
+  """
+
+  return Format.JSON if path.lower().endswith(".json") else Format.CSV
+
+
+def stats_history(stats, intervals, now = None):
+  """
+  Provides the history of the given graphs, oldest first for each interval.
+  Only values that have actually been collected are included, not the zeros
+  our histories start with.
+
+  Values are read by their age, so these should be snapshots (see
+  GraphStats.clone()) rather than graphs that are still being appended to.
+
+  :param dict stats: mapping of graph labels to their GraphStats
+  :param list intervals: (label, seconds) tuples for the graph's update
+    intervals
+  :param float now: unix timestamp of the newest values
+
+  :returns: **generator** of (graph, interval, timestamp, primary, secondary)
+    tuples
+  """
+
+  if now is None:
+    now = time.time()
+
+  for label in sorted(stats):
+    graph_stats = stats[label]
+
+    for i, (interval_label, timescale) in enumerate(intervals):
+      primary, secondary = graph_stats.primary_counts[i], graph_stats.secondary_counts[i]
+      count = min(len(primary), primary.get_count())
+      newest = now - graph_stats.tick % timescale  # when the newest value was made
+
+      for age in range(count - 1, -1, -1):
+        yield (label.lower(), interval_label, newest - age * timescale, primary[age], secondary[age])
+
+
+def store_history(history_dir, intervals, size, now = None):
+  """
+  Provides the history saved in a directory of HistoryStore files, oldest
+  first for each interval.
+
+  :param str history_dir: directory with our HistoryStore files
+  :param list intervals: (label, seconds) tuples for the graph's update
+    intervals
+  :param int size: number of values kept for each interval
+  :param float now: unix timestamp of the newest values
+
+  :returns: **generator** of (graph, interval, timestamp, primary, secondary)
+    tuples
+
+  :raises: **IOError** or **OSError** if a file in the directory can't be read
+  """
+
+  if now is None:
+    now = time.time()
+
+  for filename in sorted(os.listdir(history_dir)):
+    store = HistoryStore(os.path.join(history_dir, filename), [timescale for (_, timescale) in intervals], size, read_only = True)
+
+    try:
+      for (interval_label, timescale), values in zip(intervals, store.load(now)):
+        for i, (primary, secondary) in enumerate(values):
+          yield (filename.replace("_", " "), interval_label, now - (len(values) - 1 - i) * timescale, primary, secondary)
+    finally:
+      store.close()
+
+
+def write_history(path, rows, export_format = None):
+  """
+  Writes rows of graph history to a file. CSV exports start with a header,
+  and JSON exports are a list of objects keyed by the field names.
+
+  :param str path: location to write to
+  :param iterable rows: (graph, interval, timestamp, primary, secondary) tuples
+  :param Format export_format: format to write, guessed from the path if
+    **None**
+
+  :returns: **int** for the number of rows written
+
+  :raises: **IOError** or **OSError** if unable to write to the path
+  """
+
+  if export_format is None:
+    export_format = get_format(path)
+
+  row_count = 0
+
+  with open(path, "w") as export_file:
+    if export_format == Format.JSON:
+      export_file.write("[")
+
+      for row in rows:
+        export_file.write(",\n  " if row_count else "\n  ")
+        export_file.write(json.dumps(dict(zip(FIELDS, row)), sort_keys = True))
+        row_count += 1
+
+      export_file.write("\n]\n")
+    else:
+      writer = csv.writer(export_file)
+      writer.writerow(FIELDS)
+
+      for row in rows:
+        writer.writerow(row)
+        row_count += 1
+
+  return row_count
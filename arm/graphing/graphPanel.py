@@ -18,12 +18,16 @@ Downloaded (0.0 B/sec):           Uploaded (0.0 B/sec):
 
 import copy
 import curses
+import os
 
 import arm.popups
 import arm.controller
 
 import stem.control
 
+from arm.graphing import export
+from arm.graphing.history import HistoryBuffer, downsample
+from arm.graphing.percentiles import DEFAULT_PERCENTILES, PercentileTracker, Window
 from arm.util import panel, torTools, uiTools
 
 from stem.util import conf, enum, str_tools
@@ -54,11 +58,19 @@ Bounds = enum.Enum("GLOBAL_MAX", "LOCAL_MAX", "TIGHT")
 
 WIDE_LABELING_GRAPH_COL = 50  # minimum graph columns to use wide spacing for x-axis labels
 
+# GraphStats attributes with the history of each interval
+
+HISTORY_ATTR = (
+  "primary_counts", "secondary_counts",
+  "primary_maxima", "secondary_maxima",
+  "primary_minima", "secondary_minima",
+)
+
 
 def conf_handler(key, value):
   if key == "features.graph.height":
     return max(MIN_GRAPH_HEIGHT, value)
-  elif key == "features.graph.max_width":
+  elif key in ("features.graph.max_width", "features.graph.history"):
     return max(1, value)
   elif key == "features.graph.interval":
     return max(0, min(len(UPDATE_INTERVALS) - 1, value))
@@ -73,10 +85,34 @@ CONFIG = conf.config_dict("arm", {
   "features.graph.interval": 0,
   "features.graph.bound": 1,
   "features.graph.max_width": 150,
+  "features.graph.history": 600,
   "features.graph.showIntermediateBounds": True,
+  "features.graph.downsample": False,
+  "features.graph.showPeaks": True,
 }, conf_handler)
 
 
+def get_history_size():
+  """
+  Provides the number of values our graphs keep for each interval. This is at
+  least the maximum graph width, and more lets downsampled graphs cover a
+  longer span than the screen shows.
+  """
+
+  return max(CONFIG["features.graph.history"], CONFIG["features.graph.max_width"])
+
+
+def _include_value(extrema, value):
+  """
+  Provides the (max, min) bounds after including a value.
+  """
+
+  if extrema is None:
+    return (value, value)
+  else:
+    return (max(extrema[0], value), min(extrema[1], value))
+
+
 class GraphStats:
   """
   Module that's expected to update dynamically and provide attributes to be
@@ -101,11 +137,28 @@ class GraphStats:
     self.last_primary, self.last_secondary = 0, 0    # most recent registered stats
     self.primary_total, self.secondary_total = 0, 0  # sum of all stats seen
 
+    # percentiles of our per-second stats, shared with a clone until we next
+    # update them
+
+    self.primary_percentiles = PercentileTracker()
+    self.secondary_percentiles = PercentileTracker()
+    self.shared_percentiles = False
+
     # timescale dependent stats
 
     self.max_column = CONFIG["features.graph.max_width"]
+    self.history_size = get_history_size()  # values kept for each interval
     self.max_primary, self.max_secondary = {}, {}
-    self.primary_counts, self.secondary_counts = {}, {}
+    self.shared_counts = set()  # intervals with history shared by a clone
+    self.history_store = None   # HistoryStore our history is saved to
+    self.primary_pending, self.secondary_pending = {}, {}
+    self.primary_extrema, self.secondary_extrema = {}, {}
+
+    # historic stats for graph, newest first (averages, with the maximum and
+    # minimum of each interval)
+
+    for attr in HISTORY_ATTR:
+      setattr(self, attr, {})
 
     for i in range(len(UPDATE_INTERVALS)):
       # recent rates for graph
@@ -113,11 +166,14 @@ class GraphStats:
       self.max_primary[i] = 0
       self.max_secondary[i] = 0
 
-      # historic stats for graph, first is accumulator
-      # iterative insert needed to avoid making shallow copies (nasty, nasty gotcha)
+      # sums and (max, min) bounds for the interval that's in progress
+
+      self.primary_pending[i] = 0
+      self.secondary_pending[i] = 0
+      self.primary_extrema[i] = None
+      self.secondary_extrema[i] = None
 
-      self.primary_counts[i] = (self.max_column + 1) * [0]
-      self.secondary_counts[i] = (self.max_column + 1) * [0]
+      self._clear_history(i)
 
     # tracks BW events
 
@@ -125,14 +181,17 @@ class GraphStats:
 
   def clone(self, new_copy=None):
     """
-    Provides a deep copy of this instance.
+    Provides a snapshot of this instance. This is a shallow copy that shares
+    our history until we next append to it (copy on write), so making one
+    doesn't scale with the graph's size.
 
     Arguments:
-      new_copy - base instance to build copy off of
+      new_copy - base instance to build copy off of, a shallow copy of
+                 ourselves if None
     """
 
     if not new_copy:
-      new_copy = GraphStats()
+      new_copy = copy.copy(self)
 
     new_copy.tick = self.tick
     new_copy.last_primary = self.last_primary
@@ -141,11 +200,82 @@ class GraphStats:
     new_copy.secondary_total = self.secondary_total
     new_copy.max_primary = dict(self.max_primary)
     new_copy.max_secondary = dict(self.max_secondary)
-    new_copy.primary_counts = copy.deepcopy(self.primary_counts)
-    new_copy.secondary_counts = copy.deepcopy(self.secondary_counts)
+    new_copy.primary_pending = dict(self.primary_pending)
+    new_copy.secondary_pending = dict(self.secondary_pending)
+    new_copy.primary_extrema = dict(self.primary_extrema)
+    new_copy.secondary_extrema = dict(self.secondary_extrema)
+
+    for attr in HISTORY_ATTR:
+      setattr(new_copy, attr, dict(getattr(self, attr)))
+
+    new_copy.shared_counts = set()
+    new_copy.shared_percentiles = False
+    new_copy.history_store = None
     new_copy.is_pause_buffer = True
+
+    self.shared_counts = set(self.primary_counts.keys())
+    self.shared_percentiles = True
     return new_copy
 
+  def set_history_store(self, store):
+    """
+    Saves our history to the given HistoryStore as it's made, first
+    populating our graphs with what it previously saved. This closes the
+    prior store, if we had one.
+
+    This provides True if any history was restored and False otherwise.
+
+    Arguments:
+      store - HistoryStore to use, or None to stop saving our history
+    """
+
+    prior_store, self.history_store = self.history_store, store
+    is_restored = False
+
+    if prior_store:
+      prior_store.close()
+
+    if store:
+      for i, values in enumerate(store.load()):
+        for primary, secondary in values:
+          self._append(i, primary, secondary)
+
+        if values:
+          is_restored = True
+
+    return is_restored
+
+  def get_columns(self, interval_index, width, is_primary):
+    """
+    Provides the values to be graphed for an interval. This is a tuple of the
+    form (factor, columns) where factor is the number of intervals each column
+    covers and the columns are (average, maximum, minimum) tuples, newest
+    first. If features.graph.downsample is set then all of our history is
+    consolidated into the width, otherwise each column is one interval.
+
+    Our history is the last history_size (features.graph.history) values of
+    each interval, which can be far more than the graph's width. Slots we
+    haven't yet filled are left out rather than averaged in as zeros.
+
+    Arguments:
+      interval_index - index of the UPDATE_INTERVALS to provide
+      width          - maximum number of columns
+      is_primary     - provides the primary graph if true, secondary otherwise
+    """
+
+    if is_primary:
+      counts, maxima, minima = self.primary_counts, self.primary_maxima, self.primary_minima
+    else:
+      counts, maxima, minima = self.secondary_counts, self.secondary_maxima, self.secondary_minima
+
+    counts, maxima, minima = counts[interval_index], maxima[interval_index], minima[interval_index]
+
+    if CONFIG["features.graph.downsample"]:
+      filled = min(len(counts), counts.get_count())
+      return downsample(counts.values(filled), maxima.values(filled), minima.values(filled), width)
+    else:
+      return 1, zip(counts.values(width), maxima.values(width), minima.values(width))
+
   def event_tick(self):
     """
     Called when it's time to process another event. All graphs use tor BW
@@ -181,6 +311,33 @@ class GraphStats:
 
     return ""
 
+  def get_stat_name(self, is_primary):
+    """
+    Provides the name of the primary or secondary stat.
+    """
+
+    return "Primary" if is_primary else "Secondary"
+
+  def get_value_label(self, value, is_primary):
+    """
+    Provides a label for one of our values, such as a percentile.
+    """
+
+    return "%0.1f" % value
+
+  def get_percentiles(self, window, is_primary, percentiles = DEFAULT_PERCENTILES):
+    """
+    Estimates percentiles of our per-second values.
+
+    Arguments:
+      window      - percentiles.Window to provide values for
+      is_primary  - provides the primary stat if true, secondary otherwise
+      percentiles - percentiles to be provided
+    """
+
+    tracker = self.primary_percentiles if is_primary else self.secondary_percentiles
+    return tracker.get_percentiles(window, percentiles)
+
   def get_color(self, is_primary):
     """
     Provides the color to be used for the graph and stats.
@@ -232,6 +389,14 @@ class GraphStats:
     self.primary_total += primary
     self.secondary_total += secondary
 
+    if self.shared_percentiles:
+      self.primary_percentiles = copy.copy(self.primary_percentiles)
+      self.secondary_percentiles = copy.copy(self.secondary_percentiles)
+      self.shared_percentiles = False
+
+    self.primary_percentiles.add(primary)
+    self.secondary_percentiles.add(secondary)
+
     # updates for all time intervals
 
     self.tick += 1
@@ -239,23 +404,90 @@ class GraphStats:
     for i in range(len(UPDATE_INTERVALS)):
       lable, timescale = UPDATE_INTERVALS[i]
 
-      self.primary_counts[i][0] += primary
-      self.secondary_counts[i][0] += secondary
+      self.primary_pending[i] += primary
+      self.secondary_pending[i] += secondary
+      self.primary_extrema[i] = _include_value(self.primary_extrema[i], primary)
+      self.secondary_extrema[i] = _include_value(self.secondary_extrema[i], secondary)
 
       if self.tick % timescale == 0:
-        self.max_primary[i] = max(self.max_primary[i], self.primary_counts[i][0] / timescale)
-        self.primary_counts[i][0] /= timescale
-        self.primary_counts[i].insert(0, 0)
-        del self.primary_counts[i][self.max_column + 1:]
+        primary_value, secondary_value, primary_extrema, secondary_extrema = self._get_interval_values(i)
+
+        self._append(i, primary_value, secondary_value, primary_extrema, secondary_extrema)
 
-        self.max_secondary[i] = max(self.max_secondary[i], self.secondary_counts[i][0] / timescale)
-        self.secondary_counts[i][0] /= timescale
-        self.secondary_counts[i].insert(0, 0)
-        del self.secondary_counts[i][self.max_column + 1:]
+        self.primary_pending[i], self.secondary_pending[i] = 0, 0
+        self.primary_extrema[i], self.secondary_extrema[i] = None, None
+
+        if self.history_store:
+          self.history_store.record(i, primary_value, secondary_value)
 
     if is_redraw and self._graph_panel:
       self._graph_panel.redraw(True)
 
+  def _get_interval_values(self, interval_index):
+    """
+    Provides the values graphed for an interval that has just ended, as a tuple
+    of the form (primary, secondary, primary_extrema, secondary_extrema). By
+    default these are the averages and (max, min) bounds of its ticks.
+
+    Arguments:
+      interval_index - index of the UPDATE_INTERVALS that has ended
+    """
+
+    timescale = UPDATE_INTERVALS[interval_index][1]
+    primary_avg = self.primary_pending[interval_index] / timescale
+    secondary_avg = self.secondary_pending[interval_index] / timescale
+
+    return (primary_avg, secondary_avg, self.primary_extrema[interval_index], self.secondary_extrema[interval_index])
+
+  def _append(self, interval_index, primary, secondary, primary_extrema = None, secondary_extrema = None):
+    """
+    Adds values to the history of an interval.
+
+    Arguments:
+      interval_index    - index of the UPDATE_INTERVALS being added to
+      primary           - average of the primary stat over the interval
+      secondary         - average of the secondary stat over the interval
+      primary_extrema   - (max, min) of the primary stat over the interval,
+                          just the average if None
+      secondary_extrema - (max, min) of the secondary stat over the interval,
+                          just the average if None
+    """
+
+    if interval_index in self.shared_counts:
+      # a snapshot has this history, so leaves it be
+
+      for attr in HISTORY_ATTR:
+        history = getattr(self, attr)
+        history[interval_index] = copy.copy(history[interval_index])
+
+      self.shared_counts.discard(interval_index)
+
+    primary_max, primary_min = primary_extrema if primary_extrema else (primary, primary)
+    secondary_max, secondary_min = secondary_extrema if secondary_extrema else (secondary, secondary)
+
+    self.primary_counts[interval_index].append(primary)
+    self.primary_maxima[interval_index].append(primary_max)
+    self.primary_minima[interval_index].append(primary_min)
+    self.max_primary[interval_index] = max(self.max_primary[interval_index], primary)
+
+    self.secondary_counts[interval_index].append(secondary)
+    self.secondary_maxima[interval_index].append(secondary_max)
+    self.secondary_minima[interval_index].append(secondary_min)
+    self.max_secondary[interval_index] = max(self.max_secondary[interval_index], secondary)
+
+  def _clear_history(self, interval_index):
+    """
+    Discards the history of an interval.
+
+    Arguments:
+      interval_index - index of the UPDATE_INTERVALS to be cleared
+    """
+
+    for attr in HISTORY_ATTR:
+      getattr(self, attr)[interval_index] = HistoryBuffer(self.history_size)
+
+    self.shared_counts.discard(interval_index)
+
 
 class GraphPanel(panel.Panel):
   """
@@ -402,6 +634,8 @@ class GraphPanel(panel.Panel):
         self.set_stats(None)
       elif selection != -1:
         self.set_stats(available_stats[selection - 1])
+    elif key == ord('t') or key == ord('T'):
+      self.show_percentiles_popup()
     elif key == ord('i') or key == ord('I'):
       # provides menu to pick graph panel update interval
 
@@ -426,8 +660,80 @@ class GraphPanel(panel.Panel):
     options.append(("s", "graphed stats", graphed_stats))
     options.append(("b", "graph bounds", self.bounds.lower()))
     options.append(("i", "graph update interval", UPDATE_INTERVALS[self.update_interval][0]))
+    options.append(("t", "percentiles", None))
     return options
 
+  def show_percentiles_popup(self):
+    """
+    Presents the percentiles of the displayed stats over the last hour, day,
+    and since we started.
+    """
+
+    if not self.current_display:
+      arm.popups.show_msg("No stats are being graphed", 2)
+      return
+
+    popup, _, _ = arm.popups.init(13, 80)
+
+    if not popup:
+      return
+
+    try:
+      control = arm.controller.get_controller()
+      stats = self.get_attr("stats")[self.current_display]
+
+      popup.win.box()
+      popup.addstr(0, 0, "Percentiles (%s):" % self.current_display.lower(), curses.A_STANDOUT)
+      popup.addstr(1, 2, "%-24s %14s %14s %14s" % tuple([""] + ["p%i" % percentile for percentile in DEFAULT_PERCENTILES]), curses.A_BOLD)
+
+      line = 2
+
+      for is_primary in (True, False):
+        color = uiTools.get_color(stats.get_color(is_primary))
+
+        for window, window_label in ((Window.HOUR, "last hour"), (Window.DAY, "last day"), (Window.TOTAL, "since start")):
+          labels = []
+
+          for value in stats.get_percentiles(window, is_primary):
+            labels.append("-" if value is None else stats.get_value_label(value, is_primary))
+
+          label = "%s, %s" % (stats.get_stat_name(is_primary), window_label)
+          popup.addstr(line, 2, "%-24s %14s %14s %14s" % tuple([label] + labels), color)
+          line += 1
+
+        line += 1
+
+      popup.addstr(line, 2, "Press any key...")
+      popup.win.refresh()
+
+      curses.cbreak()
+      control.get_screen().getch()
+    finally:
+      arm.popups.finalize()
+
+  def show_export_prompt(self):
+    """
+    Lets user enter a path to export the history of our graphs to, canceling
+    if left blank. This is JSON if the path ends with '.json' and CSV
+    otherwise.
+    """
+
+    path_input = arm.popups.input_prompt("Path to export graph history (.csv or .json): ")
+
+    if path_input:
+      path = os.path.abspath(os.path.expanduser(path_input))
+
+      # rows are read by their age, so exports a snapshot rather than graphs
+      # that are being appended to while we write
+
+      stats = self.get_attr("stats") if self.is_paused() else self.snapshot_attr("stats")
+
+      try:
+        row_count = export.write_history(path, export.stats_history(stats, UPDATE_INTERVALS))
+        arm.popups.show_msg("Exported %i values to %s" % (row_count, path_input), 2)
+      except (IOError, OSError) as exc:
+        arm.popups.show_msg("Unable to export graph history: %s" % exc.strerror, 2)
+
   def draw(self, width, height):
     """ Redraws graph panel """
 
@@ -451,7 +757,21 @@ class GraphPanel(panel.Panel):
       if right:
         self.addstr(1, graph_column + 5, right, curses.A_BOLD | secondary_color)
 
-      # determines max/min value on the graph
+      # values being graphed, and the number of intervals in each column
+
+      interval_factor, primary_columns = param.get_columns(self.update_interval, graph_column, True)
+      _, secondary_columns = param.get_columns(self.update_interval, graph_column, False)
+      graphed_intervals = graph_column * interval_factor
+
+      # determines max/min value on the graph, including the peaks if we're
+      # showing them
+
+      if CONFIG["features.graph.showPeaks"]:
+        primary_maxima, primary_minima = param.primary_maxima, param.primary_minima
+        secondary_maxima, secondary_minima = param.secondary_maxima, param.secondary_minima
+      else:
+        primary_maxima = primary_minima = param.primary_counts
+        secondary_maxima = secondary_minima = param.secondary_counts
 
       if self.bounds == Bounds.GLOBAL_MAX:
         primary_max_bound = int(param.max_primary[self.update_interval])
@@ -462,14 +782,14 @@ class GraphPanel(panel.Panel):
           # nothing being displayed
           primary_max_bound, secondary_max_bound = 0, 0
         else:
-          primary_max_bound = int(max(param.primary_counts[self.update_interval][1:graph_column + 1]))
-          secondary_max_bound = int(max(param.secondary_counts[self.update_interval][1:graph_column + 1]))
+          primary_max_bound = int(primary_maxima[self.update_interval].get_max(graphed_intervals))
+          secondary_max_bound = int(secondary_maxima[self.update_interval].get_max(graphed_intervals))
 
       primary_min_bound = secondary_min_bound = 0
 
       if self.bounds == Bounds.TIGHT:
-        primary_min_bound = int(min(param.primary_counts[self.update_interval][1:graph_column + 1]))
-        secondary_min_bound = int(min(param.secondary_counts[self.update_interval][1:graph_column + 1]))
+        primary_min_bound = int(primary_minima[self.update_interval].get_min(graphed_intervals))
+        secondary_min_bound = int(secondary_minima[self.update_interval].get_min(graphed_intervals))
 
         # if the max = min (ie, all values are the same) then use zero lower
         # bound so a graph is still displayed
@@ -513,26 +833,12 @@ class GraphPanel(panel.Panel):
 
       # creates bar graph (both primary and secondary)
 
-      for col in range(graph_column):
-        column_count = int(param.primary_counts[self.update_interval][col + 1]) - primary_min_bound
-        column_height = min(self.graph_height, self.graph_height * column_count / (max(1, primary_max_bound) - primary_min_bound))
-
-        for row in range(column_height):
-          self.addstr(self.graph_height + 1 - row, col + 5, " ", curses.A_STANDOUT | primary_color)
-
-        column_count = int(param.secondary_counts[self.update_interval][col + 1]) - secondary_min_bound
-        column_height = min(self.graph_height, self.graph_height * column_count / (max(1, secondary_max_bound) - secondary_min_bound))
-
-        for row in range(column_height):
-          self.addstr(self.graph_height + 1 - row, col + graph_column + 10, " ", curses.A_STANDOUT | secondary_color)
+      self._draw_bars(primary_columns, 5, primary_min_bound, primary_max_bound, primary_color)
+      self._draw_bars(secondary_columns, graph_column + 10, secondary_min_bound, secondary_max_bound, secondary_color)
 
       # bottom labeling of x-axis
 
-      interval_sec = 1  # seconds per labeling
-
-      for i in range(len(UPDATE_INTERVALS)):
-        if i == self.update_interval:
-          interval_sec = UPDATE_INTERVALS[i][1]
+      interval_sec = UPDATE_INTERVALS[self.update_interval][1] * interval_factor  # seconds per column
 
       interval_spacing = 10 if graph_column >= WIDE_LABELING_GRAPH_COL else 5
       units_label, decimal_precision = None, 0
@@ -556,6 +862,34 @@ class GraphPanel(panel.Panel):
 
       param.draw(self, width, height)  # allows current stats to modify the display
 
+  def _draw_bars(self, columns, left, min_bound, max_bound, color):
+    """
+    Draws a bar for each of the graphed (average, maximum, minimum) values,
+    marking the peaks above the bars if features.graph.showPeaks is set.
+
+    Arguments:
+      columns   - values to be drawn, the first being the leftmost bar
+      left      - x-coordinate of the leftmost bar
+      min_bound - value at the bottom of the graph
+      max_bound - value at the top of the graph
+      color     - color of the bars
+    """
+
+    show_peaks = CONFIG["features.graph.showPeaks"]
+    scale = max(1, max_bound) - min_bound
+
+    for col, (average, maximum, _) in enumerate(columns):
+      column_height = min(self.graph_height, self.graph_height * (int(average) - min_bound) / scale)
+
+      for row in range(column_height):
+        self.addstr(self.graph_height + 1 - row, col + left, " ", curses.A_STANDOUT | color)
+
+      if show_peaks:
+        peak_height = min(self.graph_height, self.graph_height * (int(maximum) - min_bound) / scale)
+
+        if peak_height > column_height:
+          self.addstr(self.graph_height + 2 - peak_height, col + left, "-", curses.A_BOLD | color)
+
   def add_stats(self, label, stats):
     """
     Makes GraphStats instance available in the panel.
@@ -588,9 +922,10 @@ class GraphPanel(panel.Panel):
       else:
         raise ValueError("Unrecognized stats label: %s" % label)
 
-  def copy_attr(self, attr):
+  def snapshot_attr(self, attr):
     if attr == "stats":
-      # uses custom clone method to copy GraphStats instances
+      # GraphStats are updated in place, so uses their clone method to get
+      # snapshots (these share history with the original until it changes)
       return dict([(key, self.stats[key].clone()) for key in self.stats])
     else:
-      return panel.Panel.copy_attr(self, attr)
+      return panel.Panel.snapshot_attr(self, attr)
@@ -0,0 +1,445 @@
+"""
+Fixed size storage for the values presented by our graphs.
+
+::
+
+  downsample - consolidates values into a min/max envelope
+
+  HistoryBuffer - ring buffer of graphed values
+    |- append - adds a new value, displacing the oldest
+    |- get_max - maximum of the most recent values
+    |- get_min - minimum of the most recent values
+    |- get_count - number of values that have been appended
+    +- values - list of the most recent values
+
+  HistoryStore - round-robin file persisting graph history between runs
+    |- load - provides the values we previously saved
+    |- record - saves a value for an interval
+    |- flush - writes the values we've recorded since our last flush
+    +- close - flushes and closes our file
+"""
+
+import array
+import collections
+import math
+import os
+import struct
+import threading
+import time
+
+STORE_MAGIC = 'ARMHIST1'
+STORE_HEADER = struct.Struct('!8sII')     # magic, interval count, values per interval
+INTERVAL_HEADER = struct.Struct('!IId')   # next slot, values stored, time of the last value
+STORE_VALUE = struct.Struct('!dd')        # primary and secondary value
+
+
+def downsample(averages, maxima, minima, width):
+  """
+  Consolidates values so they fit within the given number of columns. Rather
+  than simply averaging groups (which loses short spikes) each column is the
+  envelope of the values it covers, keeping their average along with the
+  highest maximum and lowest minimum.
+
+  :param list averages: values to be consolidated
+  :param list maxima: maximum associated with each of the averages
+  :param list minima: minimum associated with each of the averages
+  :param int width: maximum number of columns to provide
+
+  :returns: **tuple** of the form (factor, columns) where the factor is the
+    number of values in each column and columns are (average, maximum,
+    minimum) tuples, in the same order as the values
+  """
+
+  size = len(averages)
+  factor = max(1, int(math.ceil(float(size) / max(1, width))))
+
+  if factor == 1:
+    return factor, zip(averages, maxima, minima)
+
+  columns = []
+
+  for start in range(0, size, factor):
+    end = min(size, start + factor)
+    average = sum(averages[start:end]) / (end - start)
+    columns.append((average, max(maxima[start:end]), min(minima[start:end])))
+
+  return factor, columns
+
+
+class HistoryBuffer(object):
+  """
+  Array backed ring buffer of floats. Indexing is newest first, so **buffer[0]**
+  is the most recently appended value. Buffers start out filled with zeros.
+
+  Running maxima and minima are maintained with monotonic deques, so checking
+  the bounds of the last N values costs constant time (amortized) so long as N
+  doesn't change between calls.
+
+  Values are appended by the thread handling BW events while the draw thread
+  reads them (rebuilding the deques when the window changes), so access is
+  guarded by a lock.
+
+  :param int size: number of values retained
+  """
+
+  def __init__(self, size):
+    self._size = max(1, size)
+    self._values = array.array('d', [0.0] * self._size)
+    self._newest = self._size - 1  # position of the most recently added value
+    self._count = 0                # number of values that have been appended
+
+    # window and monotonic deques of (sequence, value) tuples for our bounds
+
+    self._window = None
+    self._max_deque = collections.deque()
+    self._min_deque = collections.deque()
+
+    self._lock = threading.RLock()
+
+  def __len__(self):
+    return self._size
+
+  def __getitem__(self, index):
+    with self._lock:
+      if isinstance(index, slice):
+        return [self[i] for i in range(*index.indices(self._size))]
+
+      if index < 0:
+        index += self._size
+
+      if not 0 <= index < self._size:
+        raise IndexError('history index out of range')
+
+      return self._values[(self._newest - index) % self._size]
+
+  def __iter__(self):
+    return iter(self[:])
+
+  def __copy__(self):
+    with self._lock:
+      new_copy = HistoryBuffer.__new__(HistoryBuffer)
+      new_copy._size = self._size
+      new_copy._values = array.array('d', self._values)
+      new_copy._newest = self._newest
+      new_copy._count = self._count
+      new_copy._window = self._window
+      new_copy._max_deque = collections.deque(self._max_deque)
+      new_copy._min_deque = collections.deque(self._min_deque)
+      new_copy._lock = threading.RLock()
+      return new_copy
+
+  def append(self, value):
+    """
+    Adds a value to the front of the buffer, dropping the oldest.
+
+    :param float value: value to be added
+    """
+
+    with self._lock:
+      self._newest = (self._newest + 1) % self._size
+      self._values[self._newest] = value
+      self._count += 1
+
+      if self._window is not None:
+        self._push(self._count - 1, self._values[self._newest])
+
+  def get_max(self, count = None):
+    """
+    Provides the largest of our most recent values.
+
+    :param int count: number of values to consider, all of them if **None**
+
+    :returns: **float** for the maximum of those values
+    """
+
+    with self._lock:
+      self._set_window(count)
+      return self._max_deque[0][1]
+
+  def get_min(self, count = None):
+    """
+    Provides the smallest of our most recent values.
+
+    :param int count: number of values to consider, all of them if **None**
+
+    :returns: **float** for the minimum of those values
+    """
+
+    with self._lock:
+      self._set_window(count)
+      return self._min_deque[0][1]
+
+  def get_count(self):
+    """
+    Provides the number of values that have been appended. Positions beyond
+    this are the zeros we started with.
+
+    :returns: **int** for the number of values we've been given
+    """
+
+    return self._count
+
+  def values(self, count = None):
+    """
+    Provides our most recent values, newest first.
+
+    :param int count: number of values to provide, all of them if **None**
+
+    :returns: **list** of floats
+    """
+
+    return self[:count]
+
+  def _set_window(self, count):
+    """
+    Rebuilds our deques if they don't track the given number of values.
+    """
+
+    count = self._size if count is None else max(1, min(self._size, count))
+
+    if count == self._window:
+      return
+
+    self._window = count
+    self._max_deque.clear()
+    self._min_deque.clear()
+
+    for i in range(count - 1, -1, -1):
+      self._push(self._count - 1 - i, self[i])
+
+  def _push(self, sequence, value):
+    """
+    Includes a value in our deques, evicting anything that's either outside
+    the window or can no longer be the maximum (or minimum).
+    """
+
+    while self._max_deque and self._max_deque[-1][1] <= value:
+      self._max_deque.pop()
+
+    while self._min_deque and self._min_deque[-1][1] >= value:
+      self._min_deque.pop()
+
+    self._max_deque.append((sequence, value))
+    self._min_deque.append((sequence, value))
+
+    oldest = sequence - self._window
+
+    while self._max_deque[0][0] <= oldest:
+      self._max_deque.popleft()
+
+    while self._min_deque[0][0] <= oldest:
+      self._min_deque.popleft()
+
+
+class HistoryStore(object):
+  """
+  Fixed size file with the history of a GraphStats instance, akin to a round
+  robin database. This has a ring of values for each of the graph's update
+  intervals. Each is consolidated from the finer ones by the GraphStats
+  accumulators, so we just need to save them as they're made.
+
+  Records are made by the thread handling BW events, so they're only kept in
+  memory and written by a background thread every flush_rate seconds. This
+  file never grows, and is at most that far behind. Files with a different
+  layout (for instance, because features.graph.history changed) are
+  replaced unless we're read-only.
+
+  :param str path: location of our file
+  :param list intervals: number of seconds covered by each interval's values
+  :param int size: number of values kept for each interval
+  :param bool read_only: only load values, ignoring records and raising an
+    **IOError** if the file doesn't have the layout we expect
+  :param float flush_rate: seconds between writing our records
+
+  :raises: **IOError** or **OSError** if the file can't be read or written
+  """
+
+  def __init__(self, path, intervals, size, read_only = False, flush_rate = 5.0):
+    self._path = path
+    self._intervals = list(intervals)
+    self._size = max(1, size)
+    self._interval_size = INTERVAL_HEADER.size + STORE_VALUE.size * self._size
+    self._file = None
+    self._read_only = read_only
+    self._flush_rate = flush_rate
+
+    # next slot, number of values, and time of the last value for each interval
+
+    self._positions = [(0, 0, 0.0)] * len(self._intervals)
+
+    # values recorded since our last flush, mapping interval indices to a dict
+    # of their slots and (primary, secondary) values
+
+    self._pending = {}
+    self._lock = threading.RLock()
+    self._halt_cond = threading.Condition()
+    self._halt = False
+
+    if read_only and not self._is_valid():
+      raise IOError("%s isn't a graph history file for %i intervals of %i values" % (path, len(self._intervals), self._size))
+
+    parent_dir = os.path.dirname(path)
+
+    if parent_dir and not os.path.exists(parent_dir):
+      os.makedirs(parent_dir)
+
+    if os.path.exists(path) and self._is_valid():
+      self._file = open(path, 'rb' if read_only else 'r+b', 0)
+
+      for i in range(len(self._intervals)):
+        self._file.seek(self._interval_offset(i))
+        self._positions[i] = INTERVAL_HEADER.unpack(self._file.read(INTERVAL_HEADER.size))
+    else:
+      self._file = open(path, 'w+b', 0)
+      self._file.write(STORE_HEADER.pack(STORE_MAGIC, len(self._intervals), self._size))
+
+      for i in range(len(self._intervals)):
+        self._file.write(INTERVAL_HEADER.pack(0, 0, 0.0))
+        self._file.write(STORE_VALUE.pack(0.0, 0.0) * self._size)
+
+    if not read_only:
+      flush_thread = threading.Thread(target = self._run)
+      flush_thread.setDaemon(True)
+      flush_thread.start()
+
+  def load(self, now = None):
+    """
+    Provides the values we have for each interval, oldest first. Time that
+    passed since these were saved (for instance, while arm wasn't running) is
+    filled with zeros.
+
+    :param float now: unix timestamp the values should be current as of
+
+    :returns: **list** with a list of (primary, secondary) tuples per interval
+    """
+
+    if now is None:
+      now = time.time()
+
+    results = []
+
+    with self._lock:
+      self.flush()
+      positions = list(self._positions)
+      raw_intervals = []
+
+      for i in range(len(self._intervals)):
+        self._file.seek(self._interval_offset(i) + INTERVAL_HEADER.size)
+        raw_intervals.append(self._file.read(STORE_VALUE.size * self._size))
+
+    for i, interval in enumerate(self._intervals):
+      position, count, last_update = positions[i]
+
+      if count == 0:
+        results.append([])
+        continue
+
+      raw_values = raw_intervals[i]
+      values = [STORE_VALUE.unpack_from(raw_values, slot * STORE_VALUE.size) for slot in range(self._size)]
+
+      # rotates the ring so it's oldest first, then pads the time we missed
+
+      values = values[position:] + values[:position]
+      values = values[self._size - count:]
+      missing = min(self._size, max(0, int((now - last_update) / interval)))
+      values = (values + [(0.0, 0.0)] * missing)[-self._size:]
+
+      results.append(values if any(primary or secondary for (primary, secondary) in values) else [])
+
+    return results
+
+  def record(self, interval_index, primary, secondary, now = None):
+    """
+    Saves the newest value for an interval, replacing its oldest. This is
+    written with our next flush.
+
+    :param int interval_index: index of the interval being updated
+    :param float primary: primary value
+    :param float secondary: secondary value
+    :param float now: unix timestamp of the value
+    """
+
+    if self._file is None or self._read_only:
+      return
+
+    if now is None:
+      now = time.time()
+
+    with self._lock:
+      position, count, _ = self._positions[interval_index]
+      self._pending.setdefault(interval_index, {})[position] = (primary, secondary)
+      self._positions[interval_index] = ((position + 1) % self._size, min(self._size, count + 1), now)
+
+  def flush(self):
+    """
+    Writes the values we've recorded since we last flushed, along with the
+    headers of their intervals.
+
+    :raises: **IOError** if unable to write to our file
+    """
+
+    with self._lock:
+      if self._file is None or not self._pending:
+        return
+
+      for interval_index, slots in self._pending.items():
+        offset = self._interval_offset(interval_index)
+
+        for slot, (primary, secondary) in sorted(slots.items()):
+          self._file.seek(offset + INTERVAL_HEADER.size + STORE_VALUE.size * slot)
+          self._file.write(STORE_VALUE.pack(primary, secondary))
+
+        self._file.seek(offset)
+        self._file.write(INTERVAL_HEADER.pack(*self._positions[interval_index]))
+
+      self._pending = {}
+
+  def close(self):
+    """
+    Writes our remaining records and closes our file, after which further
+    records are ignored.
+    """
+
+    with self._halt_cond:
+      self._halt = True
+      self._halt_cond.notifyAll()
+
+    with self._lock:
+      if self._file:
+        try:
+          self.flush()
+        finally:
+          self._file.close()
+          self._file = None
+
+  def _run(self):
+    while True:
+      with self._halt_cond:
+        if not self._halt:
+          self._halt_cond.wait(self._flush_rate)
+
+        if self._halt:
+          break
+
+      try:
+        self.flush()
+      except IOError:
+        pass  # tried again with our next flush
+
+  def _interval_offset(self, interval_index):
+    return STORE_HEADER.size + self._interval_size * interval_index
+
+  def _is_valid(self):
+    """
+    Checks that our file has the layout we expect.
+    """
+
+    expected_size = STORE_HEADER.size + self._interval_size * len(self._intervals)
+
+    if not os.path.isfile(self._path) or os.path.getsize(self._path) != expected_size:
+      return False
+
+    with open(self._path, 'rb') as store_file:
+      header = store_file.read(STORE_HEADER.size)
+
+    return header == STORE_HEADER.pack(STORE_MAGIC, len(self._intervals), self._size)
@@ -0,0 +1,285 @@
+"""
+Streaming estimates for the percentiles of graphed stats.
+
+::
+
+  TDigest - mergeable sketch of a distribution's quantiles
+    |- add - includes a value
+    |- merge - includes the values from other digests
+    |- get_count - number of values we've seen
+    +- get_quantile - estimates a quantile
+
+  PercentileTracker - thread safe percentiles for the last hour, day, and
+                      since we started
+    |- add - includes a per-second value
+    +- get_percentiles - estimates percentiles for one of our windows
+"""
+
+import collections
+import copy
+import math
+import threading
+
+from stem.util import enum
+
+# windows that percentiles can be provided for
+
+Window = enum.Enum("HOUR", "DAY", "TOTAL")
+
+DEFAULT_COMPRESSION = 100
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+class TDigest(object):
+  """
+  Sketch of a distribution that estimates its quantiles within bounded
+  memory, as described by Dunning and Ertl's "Computing Extremely Accurate
+  Quantiles Using t-Digests". Values are clustered into weighted centroids,
+  with small clusters near the tails where accuracy matters most. Digests
+  can be merged, so the sketch for a period can be made from the sketches of
+  the periods within it.
+
+  :param int compression: accuracy of the sketch, which keeps on the order of
+    this many centroids
+  """
+
+  def __init__(self, compression = DEFAULT_COMPRESSION):
+    self._compression = compression
+    self._centroids = []  # (mean, weight) tuples, sorted by their mean
+    self._unmerged = []   # (mean, weight) tuples we haven't yet clustered
+    self._count = 0
+    self._min = None
+    self._max = None
+
+  def __copy__(self):
+    new_copy = TDigest(self._compression)
+    new_copy._centroids = list(self._centroids)
+    new_copy._unmerged = list(self._unmerged)
+    new_copy._count = self._count
+    new_copy._min = self._min
+    new_copy._max = self._max
+    return new_copy
+
+  def add(self, value, weight = 1):
+    """
+    Includes a value in the sketch.
+
+    :param float value: value to be added
+    :param int weight: number of times the value was seen
+    """
+
+    self._unmerged.append((value, weight))
+    self._count += weight
+    self._min = value if self._min is None else min(self._min, value)
+    self._max = value if self._max is None else max(self._max, value)
+
+    if len(self._unmerged) >= self._compression * 2:
+      self._compress()
+
+  def merge(self, *digests):
+    """
+    Includes the values from other digests.
+
+    :param list digests: **TDigest** instances to be included
+    """
+
+    for digest in digests:
+      if not digest._count:
+        continue
+
+      self._unmerged += digest._centroids
+      self._unmerged += digest._unmerged
+      self._count += digest._count
+      self._min = digest._min if self._min is None else min(self._min, digest._min)
+      self._max = digest._max if self._max is None else max(self._max, digest._max)
+
+    self._compress()
+
+  def get_count(self):
+    """
+    Provides the number of values in the sketch.
+
+    :returns: **int** for the total weight of values we've seen
+    """
+
+    return self._count
+
+  def get_quantile(self, quantile):
+    """
+    Estimates the value at a given quantile.
+
+    :param float quantile: quantile to provide, from zero to one
+
+    :returns: **float** estimate of the value, **None** if we don't have any
+    """
+
+    self._compress()
+
+    if not self._centroids:
+      return None
+    elif len(self._centroids) == 1:
+      return self._centroids[0][0]
+
+    # Interpolates between the centroids, each of which is placed at the
+    # middle of its weight. Our minimum and maximum bookend them.
+
+    target = max(0.0, min(1.0, quantile)) * self._count
+    prior_position, prior_value = 0.0, self._min
+    cumulative = 0.0
+
+    for mean, weight in self._centroids:
+      position = cumulative + weight / 2.0
+
+      if target < position:
+        return _interpolate(target, prior_position, prior_value, position, mean)
+
+      prior_position, prior_value = position, mean
+      cumulative += weight
+
+    return _interpolate(target, prior_position, prior_value, self._count, self._max)
+
+  def _compress(self):
+    """
+    Clusters our unmerged values into the centroids. A centroid can grow
+    while it spans less than one unit of the arcsine scale function, which
+    makes clusters smallest near the tails and bounds their number by half
+    our compression.
+    """
+
+    if not self._unmerged:
+      return
+
+    points = sorted(self._centroids + self._unmerged)
+    self._unmerged = []
+
+    total = float(self._count)
+    centroids, cumulative = [], 0.0
+    current_mean, current_weight = points[0]
+    k_limit = self._scale(0.0) + 1
+
+    for mean, weight in points[1:]:
+      proposed_weight = current_weight + weight
+
+      if self._scale((cumulative + proposed_weight) / total) <= k_limit:
+        current_mean += (mean - current_mean) * weight / float(proposed_weight)
+        current_weight = proposed_weight
+      else:
+        centroids.append((current_mean, current_weight))
+        cumulative += current_weight
+        current_mean, current_weight = mean, weight
+        k_limit = self._scale(cumulative / total) + 1
+
+    centroids.append((current_mean, current_weight))
+    self._centroids = centroids
+
+  def _scale(self, quantile):
+    return self._compression * math.asin(2 * min(1.0, quantile) - 1) / (2 * math.pi)
+
+
+class PercentileTracker(object):
+  """
+  Percentiles of a stat that's sampled each second, over the last hour, day,
+  and since we started. Values are sketched by the minute and hour so these
+  windows are merged from a bounded number of digests. Samples are usually
+  added by an event thread while percentiles are drawn by another, so our
+  digests are only used while holding our lock.
+
+  :param int compression: accuracy of our digests
+  """
+
+  def __init__(self, compression = DEFAULT_COMPRESSION):
+    self._compression = compression
+    self._samples = 0
+
+    # digests for the minute and hour in progress, the last hour's completed
+    # minutes, the last day's completed hours, and everything
+
+    self._minute = TDigest(compression)
+    self._hour = TDigest(compression)
+    self._minutes = collections.deque(maxlen = 59)
+    self._hours = collections.deque(maxlen = 23)
+    self._total = TDigest(compression)
+
+    # window => (completed periods, merged digest of those periods), these only
+    # change once a minute or hour
+
+    self._cache = {}
+    self._lock = threading.RLock()
+
+  def __copy__(self):
+    # completed minutes and hours are never modified, so they can be shared
+
+    with self._lock:
+      new_copy = PercentileTracker(self._compression)
+      new_copy._samples = self._samples
+      new_copy._minute = TDigest.__copy__(self._minute)
+      new_copy._hour = TDigest.__copy__(self._hour)
+      new_copy._minutes = collections.deque(self._minutes, maxlen = 59)
+      new_copy._hours = collections.deque(self._hours, maxlen = 23)
+      new_copy._total = TDigest.__copy__(self._total)
+      new_copy._cache = dict(self._cache)
+      return new_copy
+
+  def add(self, value):
+    """
+    Includes the next sample.
+
+    :param float value: value for the last second
+    """
+
+    with self._lock:
+      self._samples += 1
+      self._minute.add(value)
+      self._total.add(value)
+
+      if self._samples % 60 == 0:
+        self._minutes.append(self._minute)
+        self._hour.merge(self._minute)
+        self._minute = TDigest(self._compression)
+
+      if self._samples % 3600 == 0:
+        self._hours.append(self._hour)
+        self._hour = TDigest(self._compression)
+
+  def get_percentiles(self, window, percentiles = DEFAULT_PERCENTILES):
+    """
+    Estimates percentiles of the samples within a window.
+
+    :param Window window: period to provide percentiles for
+    :param list percentiles: percentiles to provide, from zero to a hundred
+
+    :returns: **list** with the estimate for each percentile, these are
+      **None** if we don't have any samples
+    """
+
+    with self._lock:
+      if window == Window.TOTAL:
+        digest = self._total
+      else:
+        if window == Window.HOUR:
+          completed, periods, in_progress = self._samples / 60, self._minutes, (self._minute,)
+        else:
+          completed, periods, in_progress = self._samples / 3600, self._hours, (self._hour, self._minute)
+
+        # Merging the completed periods is the bulk of our work, so that's
+        # only redone when there's a new one. The periods in progress are
+        # added to a copy.
+
+        cached_completed, completed_digest = self._cache.get(window, (None, None))
+
+        if cached_completed != completed:
+          completed_digest = TDigest(self._compression)
+          completed_digest.merge(*periods)
+          self._cache[window] = (completed, completed_digest)
+
+        digest = copy.copy(completed_digest)
+        digest.merge(*in_progress)
+
+      return [digest.get_quantile(percentile / 100.0) for percentile in percentiles]
+
+
+def _interpolate(target, start, start_value, end, end_value):
+  if end <= start:
+    return end_value
+
+  return start_value + (end_value - start_value) * (target - start) / (end - start)
@@ -5,6 +5,7 @@ Tracks the system resource usage (cpu and memory) of the tor process.
 import arm.util.tracker
 
 from arm.graphing import graphPanel
+from arm.graphing.percentiles import Window
 from arm.util import torTools
 
 from stem.util import str_tools
@@ -20,28 +21,37 @@ class ResourceStats(graphPanel.GraphStats):
     self.query_pid = torTools.get_conn().controller.get_pid(None)
     self.last_counter = None
 
-  def clone(self, new_copy=None):
-    if not new_copy:
-      new_copy = ResourceStats()
-
-    return graphPanel.GraphStats.clone(self, new_copy)
-
   def get_title(self, width):
     return "System Resources:"
 
   def get_header_label(self, width, is_primary):
     avg = (self.primary_total if is_primary else self.secondary_total) / max(1, self.tick)
     last_amount = self.last_primary if is_primary else self.last_secondary
+    p95 = self.get_percentiles(Window.HOUR, is_primary, (95,))[0]
+
+    stats = [self.get_value_label(last_amount, is_primary), "avg: %s" % self.get_value_label(avg, is_primary)]
+
+    if p95 is not None:
+      stats.append("p95: %s" % self.get_value_label(p95, is_primary))
+
+    # drops the percentile if there's not enough space
+
+    labeling = "%s (%s):" % (self.get_stat_name(is_primary), ", ".join(stats))
 
+    if len(labeling) >= width and len(stats) > 2:
+      labeling = "%s (%s):" % (self.get_stat_name(is_primary), ", ".join(stats[:2]))
+
+    return labeling
+
+  def get_stat_name(self, is_primary):
+    return "CPU" if is_primary else "Memory"
+
+  def get_value_label(self, value, is_primary):
     if is_primary:
-      return "CPU (%0.1f%%, avg: %0.1f%%):" % (last_amount, avg)
+      return "%0.1f%%" % value
     else:
       # memory sizes are converted from MB to B before generating labels
-
-      usage_label = str_tools.get_size_label(last_amount * 1048576, 1)
-      avg_label = str_tools.get_size_label(avg * 1048576, 1)
-
-      return "Memory (%s, avg: %s):" % (usage_label, avg_label)
+      return str_tools.get_size_label(value * 1048576, 1)
 
   def event_tick(self):
     """
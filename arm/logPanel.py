@@ -6,6 +6,7 @@ regular expressions.
 
 import re
 import os
+import collections
 import time
 import curses
 import logging
@@ -14,10 +15,14 @@ import threading
 import stem
 from stem.control import State
 from stem.response import events
-from stem.util import conf, log, system
+from stem.util import conf, log
 
 import arm.arguments
+import arm.controller
 import arm.popups
+import arm.util.archive
+import arm.util.log
+
 from arm import __version__
 from arm.util import panel, torTools, uiTools
 
@@ -44,10 +49,23 @@ def conf_handler(key, value):
     return max(10, value)
   elif key == "cache.log_panel.size":
     return max(1000, value)
+  elif key == "cache.log_panel.intake_size":
+    return max(100, value)
+  elif key in ("features.log_file.queue_size", "features.log_file.flush_rate"):
+    return max(1, value)
+  elif key in ("features.log_file.max_size", "features.log_file.backups"):
+    return max(0, value)
+  elif key == "features.log.archiveDuration":
+    return max(1, value)
 
 
 CONFIG = conf.config_dict("arm", {
   "features.log_file": "",
+  "features.log_file.queue_size": 10000,
+  "features.log_file.flush_rate": 1000,
+  "features.log_file.max_size": 0,
+  "features.log_file.backups": 5,
+  "features.log_file.compress": False,
   "features.log.showDateDividers": True,
   "features.log.showDuplicateEntries": False,
   "features.log.entryDuration": 7,
@@ -56,41 +74,36 @@ CONFIG = conf.config_dict("arm", {
   "features.log.prepopulateReadLimit": 5000,
   "features.log.maxRefreshRate": 300,
   "features.log.regex": [],
+  "features.log.archive": False,
+  "features.log.archiveDuration": 30,
+  "features.log.follow": False,
   "cache.log_panel.size": 1000,
+  "cache.log_panel.intake_size": 5000,
   "msg.misc.event_types": '',
   "tor.chroot": '',
 }, conf_handler)
 
 DUPLICATE_MSG = " [%i duplicate%s hidden]"
-
-# The height of the drawn content is estimated based on the last time we redrew
-# the panel. It's chiefly used for scrolling and the bar indicating its
-# position. Letting the estimate be too inaccurate results in a display bug, so
-# redraws the display if it's off by this threshold.
-
-CONTENT_HEIGHT_REDRAW_THRESHOLD = 3
+SUPPRESSED_MSG = "%s %s event%s suppressed"
 
 # static starting portion of common log entries, fetched from the config when
 # needed if None
 
 COMMON_LOG_MESSAGES = None
 
-# cached values and the arguments that generated it for the get_daybreaks and
-# get_duplicates functions
-
-CACHED_DAYBREAKS_ARGUMENTS = (None, None)  # events, current day
-CACHED_DAYBREAKS_RESULT = None
-CACHED_DUPLICATES_ARGUMENTS = None  # events
-CACHED_DUPLICATES_RESULT = None
-
-# duration we'll wait for the deduplication function before giving up (in ms)
+# number of removed items a LogDisplay keeps before compacting, if fewer than
+# its number of items
 
-DEDUPLICATION_TIMEOUT = 100
+MIN_COMPACTION = 100
 
 # maximum number of regex filters we'll remember
 
 MAX_REGEX_FILTERS = 5
 
+# maximum number of results we'll show when searching the event archive
+
+MAX_ARCHIVE_RESULTS = 1000
+
 
 def days_since(timestamp = None):
   """
@@ -124,6 +137,52 @@ def load_log_messages():
       COMMON_LOG_MESSAGES[event_type] = messages
 
 
+def get_log_file_location():
+  """
+  Checks tor's configuration for the file it logs to, providing a tuple of the
+  form (runlevels, path) such as ('notice', '/var/log/tor/notices.log'). If tor
+  isn't logging to a file then this provides (None, None).
+  """
+
+  for logging_entry in torTools.get_conn().get_option("Log", [], True):
+    # looks for an entry like: notice file /var/log/tor/notices.log
+
+    entry_comp = logging_entry.split()
+
+    if len(entry_comp) >= 3 and entry_comp[1] == "file":
+      # includes the prefix for tor paths
+
+      return (entry_comp[0], CONFIG['tor.chroot'] + entry_comp[2])
+
+  return (None, None)
+
+
+def get_log_file_runlevels(logging_types):
+  """
+  Provides the runlevels tor writes to its log file, given the runlevels of its
+  Log option such as 'notice' (NOTICE and above) or 'info-warn'. This is an
+  empty list if they're unrecognized.
+
+  Arguments:
+    logging_types - runlevel portion of tor's Log option
+  """
+
+  runlevels = list(log.Runlevel)
+  aliases = {"ERR": log.ERR, "WARNING": log.WARN}
+
+  try:
+    if "-" in logging_types:
+      start, end = logging_types.upper().split("-", 1)
+      start_index = runlevels.index(aliases.get(start, start))
+      end_index = runlevels.index(aliases.get(end, end))
+      return runlevels[start_index:end_index + 1]
+    else:
+      start = logging_types.upper()
+      return runlevels[runlevels.index(aliases.get(start, start)):]
+  except ValueError:
+    return []
+
+
 def get_log_file_entries(runlevels, read_limit = None, add_limit = None):
   """
   Parses tor's log file for past events matching the given runlevels, providing
@@ -142,41 +201,18 @@ def get_log_file_entries(runlevels, read_limit = None, add_limit = None):
   if not runlevels:
     return []
 
-  # checks tor's configuration for the log file's location (if any exists)
-
-  logging_types, logging_location = None, None
-
-  for logging_entry in torTools.get_conn().get_option("Log", [], True):
-    # looks for an entry like: notice file /var/log/tor/notices.log
-
-    entry_comp = logging_entry.split()
-
-    if entry_comp[1] == "file":
-      logging_types, logging_location = entry_comp[0], entry_comp[2]
-      break
+  logging_types, logging_location = get_log_file_location()
 
   if not logging_location:
     return []
 
-  # includes the prefix for tor paths
-
-  logging_location = CONFIG['tor.chroot'] + logging_location
-
   # if the runlevels argument is a superset of the log file then we can
   # limit the read contents to the add_limit
 
   runlevels = list(log.Runlevel)
-  logging_types = logging_types.upper()
 
   if add_limit and (not read_limit or read_limit > add_limit):
-    if "-" in logging_types:
-      div_index = logging_types.find("-")
-      start_index = runlevels.index(logging_types[:div_index])
-      end_index = runlevels.index(logging_types[div_index + 1:])
-      log_file_run_levels = runlevels[start_index:end_index + 1]
-    else:
-      start_index = runlevels.index(logging_types)
-      log_file_run_levels = runlevels[start_index:]
+    log_file_run_levels = get_log_file_runlevels(logging_types)
 
     # checks if runlevels we're reporting are a superset of the file's contents
 
@@ -190,92 +226,27 @@ def get_log_file_entries(runlevels, read_limit = None, add_limit = None):
     if is_file_subset:
       read_limit = add_limit
 
-  # tries opening the log file, cropping results to avoid choking on huge logs
+  # reads the log file from its end, stopping once we have enough entries so
+  # huge logs don't make us choke
 
-  lines = []
+  logged_events = []
 
   try:
-    if read_limit:
-      lines = system.call("tail -n %i %s" % (read_limit, logging_location))
+    for timestamp, runlevel, msg in arm.util.log.read_tor_log(logging_location, read_limit):
+      if runlevel in runlevels:
+        logged_events.append(LogEntry(timestamp, runlevel, msg, RUNLEVEL_EVENT_COLOR[runlevel]))
 
-      if not lines:
-        raise IOError()
-    else:
-      log_file = open(logging_location, "r")
-      lines = log_file.readlines()
-      log_file.close()
+        if add_limit and len(logged_events) >= add_limit:
+          break
   except IOError:
     log.warn("Unable to read tor's log file: %s" % logging_location)
 
-  if not lines:
-    return []
-
-  logged_events = []
-  current_unix_time, current_local_time = time.time(), time.localtime()
-
-  for i in range(len(lines) - 1, -1, -1):
-    line = lines[i]
-
-    # entries look like:
-    # Jul 15 18:29:48.806 [notice] Parsing GEOIP file.
-
-    line_comp = line.split()
-
-    # Checks that we have all the components we expect. This could happen if
-    # we're either not parsing a tor log or in weird edge cases (like being
-    # out of disk space)
-
-    if len(line_comp) < 4:
-      continue
-
-    event_type = line_comp[3][1:-1].upper()
-
-    if event_type in runlevels:
-      # converts timestamp to unix time
-
-      timestamp = " ".join(line_comp[:3])
-
-      # strips the decimal seconds
-
-      if "." in timestamp:
-        timestamp = timestamp[:timestamp.find(".")]
-
-      # Ignoring wday and yday since they aren't used.
-      #
-      # Pretend the year is 2012, because 2012 is a leap year, and parsing a
-      # date with strptime fails if Feb 29th is passed without a year that's
-      # actually a leap year. We can't just use the current year, because we
-      # might be parsing old logs which didn't get rotated.
-      #
-      # https://trac.torproject.org/projects/tor/ticket/5265
-
-      timestamp = "2012 " + timestamp
-      event_time_comp = list(time.strptime(timestamp, "%Y %b %d %H:%M:%S"))
-      event_time_comp[8] = current_local_time.tm_isdst
-      event_time = time.mktime(event_time_comp)  # converts local to unix time
-
-      # The above is gonna be wrong if the logs are for the previous year. If
-      # the event's in the future then correct for this.
-
-      if event_time > current_unix_time + 60:
-        event_time_comp[0] -= 1
-        event_time = time.mktime(event_time_comp)
-
-      event_msg = " ".join(line_comp[4:])
-      logged_events.append(LogEntry(event_time, event_type, event_msg, RUNLEVEL_EVENT_COLOR[event_type]))
-
-    if "opening log file" in line:
-      break  # this entry marks the start of this tor instance
-
-  if add_limit:
-    logged_events = logged_events[:add_limit]
-
-  log.info("Read %i entries from tor's log file: %s (read limit: %i, runtime: %0.3f)" % (len(logged_events), logging_location, read_limit, time.time() - start_time))
+  log.info("Read %i entries from tor's log file: %s (read limit: %s, runtime: %0.3f)" % (len(logged_events), logging_location, read_limit, time.time() - start_time))
 
   return logged_events
 
 
-def get_daybreaks(events, ignore_time_for_cache = False):
+def get_daybreaks(events):
   """
   Provides the input events back with special 'DAYBREAK_EVENT' markers inserted
   whenever the date changed between log entries (or since the most recent
@@ -283,141 +254,61 @@ def get_daybreaks(events, ignore_time_for_cache = False):
   entry.
 
   Arguments:
-    events             - chronologically ordered listing of events
-    ignore_time_for_cache - skips taking the day into consideration for providing
-                         cached results if true
+    events - chronologically ordered listing of events
   """
 
-  global CACHED_DAYBREAKS_ARGUMENTS, CACHED_DAYBREAKS_RESULT
-
-  if not events:
-    return []
-
   new_listing = []
-  current_day = days_since()
-  last_day = current_day
-
-  if CACHED_DAYBREAKS_ARGUMENTS[0] == events and \
-    (ignore_time_for_cache or CACHED_DAYBREAKS_ARGUMENTS[1] == current_day):
-    return list(CACHED_DAYBREAKS_RESULT)
+  last_day = days_since()
 
   for entry in events:
     event_day = days_since(entry.timestamp)
 
     if event_day != last_day:
-      marker_timestamp = (event_day * 86400) + TIMEZONE_OFFSET
-      new_listing.append(LogEntry(marker_timestamp, DAYBREAK_EVENT, "", "white"))
+      new_listing.append(get_daybreak_marker(event_day))
 
     new_listing.append(entry)
     last_day = event_day
 
-  CACHED_DAYBREAKS_ARGUMENTS = (list(events), current_day)
-  CACHED_DAYBREAKS_RESULT = list(new_listing)
-
   return new_listing
 
 
-def get_duplicates(events):
+def get_daybreak_marker(day):
   """
-  Deduplicates a list of log entries, providing back a tuple listing with the
-  log entry and count of duplicates following it. Entries in different days are
-  not considered to be duplicates. This times out, returning None if it takes
-  longer than DEDUPLICATION_TIMEOUT.
+  Provides the 'DAYBREAK_EVENT' marker for the start of the given day.
 
   Arguments:
-    events - chronologically ordered listing of events
+    day - days since the epoch, as provided by days_since()
   """
 
-  global CACHED_DUPLICATES_ARGUMENTS, CACHED_DUPLICATES_RESULT
-
-  if CACHED_DUPLICATES_ARGUMENTS == events:
-    return list(CACHED_DUPLICATES_RESULT)
-
-  # loads common log entries from the config if they haven't been
-
-  if COMMON_LOG_MESSAGES is None:
-    load_log_messages()
-
-  start_time = time.time()
-  events_remaining = list(events)
-  return_events = []
-
-  while events_remaining:
-    entry = events_remaining.pop(0)
-    duplicate_indices = is_duplicate(entry, events_remaining, True)
-
-    # checks if the call timeout has been reached
-
-    if (time.time() - start_time) > DEDUPLICATION_TIMEOUT / 1000.0:
-      return None
-
-    # drops duplicate entries
-
-    duplicate_indices.reverse()
-
-    for i in duplicate_indices:
-      del events_remaining[i]
-
-    return_events.append((entry, len(duplicate_indices)))
+  return LogEntry((day * 86400) + TIMEZONE_OFFSET, DAYBREAK_EVENT, "", "white")
 
-  CACHED_DUPLICATES_ARGUMENTS = list(events)
-  CACHED_DUPLICATES_RESULT = list(return_events)
 
-  return return_events
-
-
-def is_duplicate(event, event_set, get_duplicates = False):
+def get_duplicate_key(event):
   """
-  True if the event is a duplicate for something in the event_set, false
-  otherwise. If the get_duplicates flag is set this provides the indices of
-  the duplicates instead.
+  Provides the key that an entry's duplicates share. Entries are duplicates if
+  they're of the same type and either have the same message or both match the
+  same common log message.
 
   Arguments:
-    event         - event to search for duplicates of
-    event_set      - set to look for the event in
-    get_duplicates - instead of providing back a boolean this gives a list of
-                    the duplicate indices in the event_set
+    event - log entry to provide the key for
   """
 
-  duplicate_indices = []
-
-  for i in range(len(event_set)):
-    forward_entry = event_set[i]
-
-    # if showing dates then do duplicate detection for each day, rather
-    # than globally
-
-    if forward_entry.type == DAYBREAK_EVENT:
-      break
-
-    if event.type == forward_entry.type:
-      is_duplicate = False
-
-      if event.msg == forward_entry.msg:
-        is_duplicate = True
-      elif event.type in COMMON_LOG_MESSAGES:
-        for common_msg in COMMON_LOG_MESSAGES[event.type]:
-          # if it starts with an asterisk then check the whole message rather
-          # than just the start
+  # loads common log entries from the config if they haven't been
 
-          if common_msg[0] == "*":
-            is_duplicate = common_msg[1:] in event.msg and common_msg[1:] in forward_entry.msg
-          else:
-            is_duplicate = event.msg.startswith(common_msg) and forward_entry.msg.startswith(common_msg)
+  if COMMON_LOG_MESSAGES is None:
+    load_log_messages()
 
-          if is_duplicate:
-            break
+  for common_msg in COMMON_LOG_MESSAGES.get(event.type, []):
+    # if it starts with an asterisk then check the whole message rather than
+    # just the start
 
-      if is_duplicate:
-        if get_duplicates:
-          duplicate_indices.append(i)
-        else:
-          return True
+    if common_msg[0] == "*":
+      if common_msg[1:] in event.msg:
+        return (event.type, common_msg)
+    elif event.msg.startswith(common_msg):
+      return (event.type, common_msg)
 
-  if get_duplicates:
-    return duplicate_indices
-  else:
-    return False
+  return (event.type, event.msg)
 
 
 class LogEntry():
@@ -436,6 +327,11 @@ class LogEntry():
     self.color = color
     self._display_message = None
 
+    # cached layout from get_layout() and the arguments it was made with
+
+    self._layout = None
+    self._layout_args = None
+
   def get_display_message(self, include_date = False):
     """
     Provides the entry's message for the log.
@@ -456,6 +352,424 @@ class LogEntry():
 
     return self._display_message
 
+  def get_layout(self, width, indent, max_lines, duplicate_count = 0):
+    """
+    Provides how this entry is wrapped when drawn. This is a tuple of the
+    form (line_count, segments) where segments is a list of...
+    (line_offset, x, msg, format)
+
+    This is cached until called with different arguments, so redraws only
+    need to lay out new entries.
+
+    Arguments:
+      width           - width of the panel
+      indent          - horizontal offset for the start of the message
+      max_lines       - maximum number of lines the entry can span
+      duplicate_count - number of hidden duplicates of this entry
+    """
+
+    layout_args = (width, indent, max_lines, duplicate_count)
+
+    if self._layout_args == layout_args:
+      return self._layout
+
+    # entry contents to be displayed, tuples of the form:
+    # (msg, formatting, includeLinebreak)
+
+    display_queue = []
+
+    msg_comp = self.get_display_message().split("\n")
+    font = curses.A_BOLD if "ERR" in self.type else curses.A_NORMAL  # emphasizes ERR messages
+
+    for i in range(len(msg_comp)):
+      display_queue.append((msg_comp[i].strip(), font | uiTools.get_color(self.color), i != len(msg_comp) - 1))
+
+    if duplicate_count:
+      plural_label = "s" if duplicate_count > 1 else ""
+      duplicate_msg = DUPLICATE_MSG % (duplicate_count, plural_label)
+      display_queue.append((duplicate_msg, curses.A_BOLD | uiTools.get_color("green"), False))
+
+    segments = []
+    cursor_location, line_offset = indent, 0
+
+    while display_queue:
+      msg, format, include_break = display_queue.pop(0)
+
+      if line_offset == max_lines:
+        break
+
+      max_msg_size = width - cursor_location - 1
+
+      if len(msg) > max_msg_size:
+        # message is too long - break it up
+        if line_offset == max_lines - 1:
+          msg = uiTools.crop_str(msg, max_msg_size)
+        else:
+          msg, remainder = uiTools.crop_str(msg, max_msg_size, 4, 4, uiTools.Ending.HYPHEN, True)
+          display_queue.insert(0, (remainder.strip(), format, include_break))
+
+        include_break = True
+
+      segments.append((line_offset, cursor_location, msg, format))
+      cursor_location += len(msg)
+
+      if include_break or not display_queue:
+        line_offset += 1
+        cursor_location = indent + ENTRY_INDENT
+
+    self._layout = (line_offset, segments)
+    self._layout_args = layout_args
+
+    return self._layout
+
+
+class DaybreakListing():
+  """
+  Events with date markers, as provided by get_daybreaks(), that's revised as
+  events are added and trimmed rather than being recomputed. Markers only
+  depend on their neighboring entries, so this is just a matter of fixing up
+  the ends of the listing.
+  """
+
+  def __init__(self, events = ()):
+    self.reset(events)
+
+  def reset(self, events):
+    """
+    Replaces our contents with the given events.
+
+    Arguments:
+      events - chronologically ordered listing of events, newest first
+    """
+
+    self._listing = collections.deque(get_daybreaks(events))
+    self._current_day = days_since()
+
+  def add(self, entry):
+    """
+    Adds a new entry to the front of the listing.
+
+    Arguments:
+      entry - newest log entry
+    """
+
+    self._strip_front_marker()
+
+    if self._listing:
+      prior_day = days_since(self._listing[0].timestamp)
+
+      if prior_day != days_since(entry.timestamp):
+        self._listing.appendleft(get_daybreak_marker(prior_day))
+
+    self._listing.appendleft(entry)
+    self._current_day = days_since()
+    self._add_front_marker()
+
+  def trim(self, count):
+    """
+    Removes the oldest entries from the end of the listing.
+
+    Arguments:
+      count - number of entries to remove
+    """
+
+    for _ in range(count):
+      self._strip_back_markers()
+
+      if self._listing:
+        self._listing.pop()
+
+    self._strip_back_markers()
+
+  def get_listing(self):
+    """
+    Provides our events with date markers, newest first.
+    """
+
+    # the newest entry needs a marker once its day is over
+
+    if self._current_day != days_since():
+      self._strip_front_marker()
+      self._current_day = days_since()
+      self._add_front_marker()
+
+    return self._listing
+
+  def _strip_front_marker(self):
+    if self._listing and self._listing[0].type == DAYBREAK_EVENT:
+      self._listing.popleft()
+
+  def _add_front_marker(self):
+    if self._listing:
+      newest_day = days_since(self._listing[0].timestamp)
+
+      if newest_day != self._current_day:
+        self._listing.appendleft(get_daybreak_marker(newest_day))
+
+  def _strip_back_markers(self):
+    while self._listing and self._listing[-1].type == DAYBREAK_EVENT:
+      self._listing.pop()
+
+
+class LogDisplay():
+  """
+  Items we display for a log, with deduplication applied and the number of
+  lines each is drawn with. This follows the log as entries are added and
+  trimmed rather than being rebuilt, so it's only made anew when the display
+  parameters change.
+
+  Items are kept oldest first in a uiTools.HeightIndex so new entries are
+  appended to it. Removed items are left with a height of zero until there's
+  enough of them to be worth compacting.
+  """
+
+  def __init__(self, width, msg_indent, max_lines, is_dates_shown, is_deduplicating, listing = ()):
+    """
+    Arguments:
+      width            - width of the panel
+      msg_indent       - horizontal offset for messages
+      max_lines        - maximum number of lines an entry can span
+      is_dates_shown   - listing includes date markers, in which case entries
+                         are only duplicates of those within the same day
+      is_deduplicating - combines duplicate entries if true
+      listing          - log entries to start with, newest first
+    """
+
+    self.width = width
+    self.msg_indent = msg_indent
+    self.max_lines = max_lines
+    self.is_dates_shown = is_dates_shown
+    self.is_deduplicating = is_deduplicating
+
+    # Items are lists of the form [entry, duplicate_count, position], with
+    # None in place of items that have been removed. Entries that have been
+    # combined with a newer duplicate map to its item.
+
+    self._items = []
+    self._heights = uiTools.HeightIndex()
+    self._entry_items = {}      # id of each entry => item it's displayed by
+    self._duplicate_items = {}  # duplicate key => most recent item with it
+    self._markers = []          # date marker items, oldest first
+    self._start = 0             # position before which all items are removed
+    self._removed_count = 0
+
+    self.sync(listing)
+
+  def sync(self, listing):
+    """
+    Adds the entries from the front of a listing that we don't yet have. Our
+    newest items that it no longer has (date markers that have been replaced)
+    are dropped. Only the front of the listing is checked, so this is cheap if
+    just a few entries have been added.
+
+    Arguments:
+      listing - log entries, newest first
+    """
+
+    new_entries, newest_item = [], None
+
+    for entry in listing:
+      newest_item = self._entry_items.get(id(entry))
+
+      if newest_item:
+        break
+
+      new_entries.append(entry)
+
+    while self._items and self._items[-1] is not newest_item:
+      self._pop()
+
+    for entry in reversed(new_entries):
+      self._add(entry)
+
+    self._compact()
+
+  def trim(self, entries):
+    """
+    Removes entries that have been trimmed from the end of the log, along with
+    date markers that no longer have entries after them.
+
+    Arguments:
+      entries - log entries that have been trimmed
+    """
+
+    for entry in entries:
+      item = self._entry_items.pop(id(entry), None)
+
+      if item is None or item[2] is None:
+        continue  # not an entry we're displaying
+      elif item[0] is entry:
+        self._remove(item)
+      else:
+        item[1] -= 1
+        self._heights.set_height(item[2], self._get_height(item))
+
+    while self._start < len(self._items):
+      item = self._items[self._start]
+
+      if item is None:
+        self._start += 1
+      elif item[0].type == DAYBREAK_EVENT:
+        self._entry_items.pop(id(item[0]), None)
+        self._remove(item)
+      else:
+        break
+
+    self._compact()
+
+  def get_total(self):
+    """
+    Provides the number of lines our items are drawn with.
+    """
+
+    return self._heights.get_total() + (1 if self._markers else 0)
+
+  def get_items(self, line):
+    """
+    Provides our items, newest first, starting with the item drawn on the given
+    line. This is a generator of tuples of the form...
+    (entry, duplicate_count, item_line, is_under_divider)
+
+    ... where item_line is the line the item starts on and is_under_divider is
+    true if the item is beneath our first date divider. The last divider's
+    bottom is an item with a None entry.
+
+    Arguments:
+      line - line to start with
+    """
+
+    item_line = self._heights.get_total()
+
+    if line < item_line:
+      # finds the item with the line, counting from the oldest item
+
+      position, offset = self._heights.find(item_line - line - 1)
+      item_line = line - (self._heights.get_height(position) - offset - 1)
+      first_divider = self._markers[-1][2] if self._markers else None
+
+      for position in xrange(position, -1, -1):
+        item = self._items[position]
+
+        if item is not None:
+          yield (item[0], item[1], item_line, first_divider is not None and position < first_divider)
+          item_line += self._heights.get_height(position)
+
+    if self._markers:
+      yield (None, 0, item_line, True)
+
+  def _add(self, entry):
+    if entry.type == DAYBREAK_EVENT:
+      # dividers are a single line, plus the bottom of the prior divider
+
+      item = [entry, 0, len(self._items)]
+
+      if self._markers:
+        self._heights.set_height(self._markers[-1][2], 2)
+
+      self._markers.append(item)
+      self._items.append(item)
+      self._heights.append(1)
+    else:
+      item = None
+
+      if self.is_deduplicating:
+        duplicate_key = get_duplicate_key(entry)
+
+        if self.is_dates_shown:
+          duplicate_key += (days_since(entry.timestamp),)
+
+        item = self._duplicate_items.get(duplicate_key)
+
+        if item and item[2] is not None:
+          # moves the prior duplicate to be displayed by this entry
+
+          self._remove(item)
+          item[0], item[1] = entry, item[1] + 1
+        else:
+          item = None
+
+      if item is None:
+        item = [entry, 0, None]
+
+        if self.is_deduplicating:
+          self._duplicate_items[duplicate_key] = item
+
+      item[2] = len(self._items)
+      self._items.append(item)
+      self._heights.append(self._get_height(item))
+
+    self._entry_items[id(entry)] = item
+
+  def _pop(self):
+    """
+    Drops our newest item.
+    """
+
+    item = self._items.pop()
+    self._heights.pop()
+    self._entry_items.pop(id(item[0]), None)
+
+    if item[0].type == DAYBREAK_EVENT:
+      self._markers.remove(item)
+
+      if self._markers:
+        self._heights.set_height(self._markers[-1][2], 1)
+
+    item[2] = None
+
+    while self._items and self._items[-1] is None:
+      self._items.pop()
+      self._heights.pop()
+      self._removed_count -= 1
+
+    self._start = min(self._start, len(self._items))
+
+  def _remove(self, item):
+    """
+    Zeros out an item, to be dropped when we next compact.
+    """
+
+    position = item[2]
+    self._heights.set_height(position, 0)
+    self._items[position] = None
+    item[2] = None
+    self._removed_count += 1
+
+    if item[0].type == DAYBREAK_EVENT:
+      is_first_divider = item is self._markers[-1]
+      self._markers.remove(item)
+
+      if is_first_divider and self._markers:
+        self._heights.set_height(self._markers[-1][2], 1)
+
+  def _compact(self):
+    """
+    Drops removed items if they've become a large portion of our listing.
+    """
+
+    if self._removed_count <= max(MIN_COMPACTION, len(self._items) - self._removed_count):
+      return
+
+    items, heights = [], []
+
+    for position, item in enumerate(self._items):
+      if item is not None:
+        item[2] = len(items)
+        items.append(item)
+        heights.append(self._heights.get_height(position))
+
+    self._items = items
+    self._heights = uiTools.HeightIndex(heights)
+    self._start = 0
+    self._removed_count = 0
+
+    for duplicate_key, item in self._duplicate_items.items():
+      if item[2] is None:
+        del self._duplicate_items[duplicate_key]
+
+  def _get_height(self, item):
+    return item[0].get_layout(self.width, self.msg_indent, self.max_lines, item[1])[0]
+
 
 class LogPanel(panel.Panel, threading.Thread, logging.Handler):
   """
@@ -499,38 +813,68 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     self.logged_events = []  # needs to be set before we receive any events
 
-    # restricts the input to the set of events we can listen to, and
-    # configures the controller to liten to them
-
-    self.logged_events = self.set_event_listening(logged_events)
-
     self.set_pause_attr("msg_log")       # tracks the message log when we're paused
+    self.set_pause_attr("filtered_log")
     self.msg_log = []                    # log entries, sorted by the timestamp
     self.regex_filter = None             # filter for presented log events (no filtering if None)
+    self.filtered_log = None             # msg_log entries matching the regex_filter (None if unfiltered)
+    self._daybreaks = DaybreakListing()  # msg_log with date dividers
     self.last_content_height = 0         # height of the rendered content when last drawn
-    self.log_file = None                 # file log messages are saved to (skipped if None)
+    self.log_file = None                 # arm.util.log.LogFileWriter for saving messages (skipped if None)
+    self.archive = None                  # arm.util.archive.EventArchive for past events (skipped if None)
     self.scroll = 0
 
     self._last_update = -1               # time the content was last revised
+
+    # Tor events waiting to be processed by our thread, and counts by type for
+    # those we've dropped because this was full. This way a flood of events
+    # doesn't back up stem's event thread.
+
+    self._intake = collections.deque()
+    self._intake_suppressed = {}
+    self._intake_lock = threading.Lock()
+
+    self._event_rates = arm.util.log.EventRates()  # how frequently each event type is seen
     self._halt = False                   # terminates thread if true
     self._cond = threading.Condition()   # used for pausing/resuming the thread
 
     # restricts concurrent write access to attributes used to draw the display
     # and pausing:
-    # msg_log, logged_events, regex_filter, scroll
+    # msg_log, filtered_log, logged_events, regex_filter, scroll
 
     self.vals_lock = threading.RLock()
 
     # cached parameters (invalidated if arguments for them change)
-    # last set of events we've drawn with
+    # revision of msg_log and filtered_log, and the revision we last drew
+
+    self._log_version = 0
+    self._last_drawn_version = -1
 
-    self._last_logged_events = []
+    # LogDisplay for our log and the parameters it was made with (filter,
+    # flags, and layout), and the same for the log we're showing while paused
+
+    self._display = None
+    self._display_args = None
+    self._paused_display = None
+    self._paused_display_args = None
 
     # _get_title (args: logged_events, regex_filter pattern, width)
 
     self._title_cache = None
     self._title_args = (None, None, None)
 
+    # reads tor's runlevel events from its log file, if we're configured to
+    # (needs to be set up before we pick the events to listen for)
+
+    self._log_follower = None
+    self._followed_runlevels = []  # runlevels tor writes to the followed file
+    self._start_log_follower()
+
+    # restricts the input to the set of events we can listen to, and
+    # configures the controller to liten to them
+
+    self.logged_events = self.set_event_listening(logged_events)
+
     self.reprepopulate_events()
 
     # leaving last_content_height as being too low causes initialization problems
@@ -555,7 +899,16 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
         if not os.path.exists(base_dir):
           os.makedirs(base_dir)
 
-        self.log_file = open(log_path, "a")
+        self.log_file = arm.util.log.LogFileWriter(
+          log_path,
+          queue_size = CONFIG["features.log_file.queue_size"],
+          flush_rate = CONFIG["features.log_file.flush_rate"] / 1000.0,
+          max_size = CONFIG["features.log_file.max_size"] * 1024 * 1024,
+          backup_count = CONFIG["features.log_file.backups"],
+          compress = CONFIG["features.log_file.compress"],
+        )
+
+        self.log_file.start()
         log.notice("arm %s opening log file (%s)" % (__version__, log_path))
       except IOError as exc:
         log.error("Unable to write to log file: %s" % exc.strerror)
@@ -572,6 +925,7 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
       record.levelname = "WARN"
 
     event_color = RUNLEVEL_EVENT_COLOR[record.levelname]
+    self._event_rates.record("ARM_%s" % record.levelname)
     self.register_event(LogEntry(int(record.created), "ARM_%s" % record.levelname, record.msg, event_color))
 
   def reprepopulate_events(self):
@@ -598,9 +952,31 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     # crops events that are either too old, or more numerous than the caching size
 
     self._trim_events(self.msg_log)
+    self._daybreaks.reset(self.msg_log)
+    self._apply_filter()
 
     self.vals_lock.release()
 
+  def start_archive(self, path):
+    """
+    Archives our events from here on out so they can be searched after leaving
+    the panel. This does nothing unless features.log.archive is set.
+
+    Arguments:
+      path - directory events are archived to
+    """
+
+    if not CONFIG["features.log.archive"] or self.archive:
+      return
+
+    try:
+      archive = arm.util.archive.EventArchive(path)
+      archive.prune(CONFIG["features.log.archiveDuration"])
+      archive.start()
+      self.archive = archive
+    except OSError as exc:
+      log.warn("Unable to archive events: %s" % exc)
+
   def set_duplicate_visability(self, is_visible):
     """
     Sets if duplicate log entries are collaped or expanded.
@@ -615,8 +991,99 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
   def register_tor_event(self, event):
     """
-    Translates a stem.response.event.Event instance into a LogEvent, and calls
-    register_event().
+    Queues a stem.response.event.Event instance to be logged by our thread. If
+    we're receiving events faster than we can process them then they're
+    dropped, and later summarized with a count of how many were suppressed.
+    """
+
+    self._event_rates.record(event.type)
+
+    if not event.type in self.logged_events:
+      return
+
+    with self._intake_lock:
+      if len(self._intake) >= CONFIG["cache.log_panel.intake_size"]:
+        self._intake_suppressed[event.type] = self._intake_suppressed.get(event.type, 0) + 1
+        return
+
+      self._intake.append(event)
+      is_first_event = len(self._intake) == 1
+
+    # wakes our thread if it isn't already going to process the queue
+
+    if is_first_event:
+      self._cond.acquire()
+      self._cond.notifyAll()
+      self._cond.release()
+
+  def get_event_rates(self):
+    """
+    Provides the arm.util.log.EventRates with how frequently we're seeing each
+    type of event, including those we've suppressed.
+    """
+
+    return self._event_rates
+
+  def _start_log_follower(self):
+    """
+    Starts following tor's log file if we're configured to, stopping any
+    follower we already had.
+    """
+
+    if self._log_follower:
+      self._log_follower.stop()
+      self._log_follower = None
+
+    if not CONFIG["features.log.follow"]:
+      return
+
+    logging_types, logging_location = get_log_file_location()
+
+    if not logging_location:
+      log.notice("Tor isn't logging to a file, so we'll need to get its events from the control port")
+      return
+
+    self._followed_runlevels = get_log_file_runlevels(logging_types)
+    self._log_follower = arm.util.log.LogFollower(logging_location, self._register_followed_entry)
+    self._log_follower.start()
+
+  def _register_followed_entry(self, timestamp, runlevel, msg):
+    """
+    Logs an entry that tor appended to its log file.
+    """
+
+    self._event_rates.record(runlevel)
+    self.register_event(LogEntry(timestamp, runlevel, msg, RUNLEVEL_EVENT_COLOR[runlevel]))
+
+  def _process_intake(self):
+    """
+    Logs the tor events we've queued, followed by a summary of any that were
+    suppressed.
+    """
+
+    with self._intake_lock:
+      if not self._intake and not self._intake_suppressed:
+        return
+
+      pending_events, suppressed = list(self._intake), self._intake_suppressed
+      self._intake.clear()
+      self._intake_suppressed = {}
+
+    self.vals_lock.acquire()
+
+    try:
+      for event in pending_events:
+        self.register_event(self._get_tor_log_entry(event))
+
+      for event_type, count in sorted(suppressed.items()):
+        msg = SUPPRESSED_MSG % ("{:,}".format(count), event_type, "s" if count > 1 else "")
+        self.register_event(LogEntry(time.time(), event_type, msg, "red"))
+    finally:
+      self.vals_lock.release()
+
+  def _get_tor_log_entry(self, event):
+    """
+    Translates a stem.response.event.Event instance into a LogEntry.
     """
 
     msg, color = ' '.join(str(event).split(' ')[1:]), "white"
@@ -638,7 +1105,7 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     elif not event.type in arm.arguments.TOR_EVENT_TYPES.values():
       color = "red"  # unknown event type
 
-    self.register_event(LogEntry(event.arrived_at, event.type, msg, color))
+    return LogEntry(event.arrived_at, event.type, msg, color)
 
   def register_event(self, event):
     """
@@ -655,23 +1122,54 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     event.msg = uiTools.get_printable(event.msg)
 
-    # note event in the log file if we're saving them
+    # note event in the log file if we're saving them (this is written by a
+    # separate thread, so we don't block on the disk)
 
     if self.log_file:
-      try:
-        self.log_file.write(event.get_display_message(True) + "\n")
-        self.log_file.flush()
-      except IOError as exc:
-        log.error("Unable to write to log file: %s" % exc.strerror)
-        self.log_file = None
+      self.log_file.write(event.get_display_message(True))
+
+    if self.archive:
+      self.archive.add(event.timestamp, event.type, event.msg)
 
     self.vals_lock.acquire()
+    self.unshare_attr("msg_log")
     self.msg_log.insert(0, event)
-    self._trim_events(self.msg_log)
+    trimmed_events = self._trim_events(self.msg_log)
+
+    self._daybreaks.add(event)
+    self._daybreaks.trim(len(trimmed_events))
+
+    is_visible = not self.regex_filter or self.regex_filter.search(event.get_display_message())
+
+    self._log_version += 1
+
+    if self.regex_filter:
+      self.unshare_attr("filtered_log")
+
+      if is_visible:
+        self.filtered_log.insert(0, event)
+
+      # trimming only removes the oldest entries, which are also at the end
+      # of the filtered listing
+
+      if trimmed_events:
+        trimmed_ids = set([id(entry) for entry in trimmed_events])
+
+        while self.filtered_log and id(self.filtered_log[-1]) in trimmed_ids:
+          self.filtered_log.pop()
+
+    # revises our display if it's for the same filter and flags
+
+    if self._display:
+      if self._display_args[:3] == self._get_display_mode():
+        self._display.sync(self._get_display_source())
+        self._display.trim(trimmed_events)
+      else:
+        self._display = None
 
     # notifies the display that it has new content
 
-    if not self.regex_filter or self.regex_filter.search(event.get_display_message()):
+    if is_visible:
       self._cond.acquire()
       self._cond.notifyAll()
       self._cond.release()
@@ -720,6 +1218,7 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     self.vals_lock.acquire()
     self.regex_filter = log_filter
+    self._apply_filter()
     self.redraw(True)
     self.vals_lock.release()
 
@@ -815,6 +1314,109 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
       except IOError as exc:
         arm.popups.show_msg("Unable to save snapshot: %s" % exc.strerror, 2)
 
+  def show_archive_search_prompt(self):
+    """
+    Prompts the user for a search of the event archive, and presents the
+    results.
+    """
+
+    if not self.archive:
+      arm.popups.show_msg("Events aren't being archived (see features.log.archive)", 2)
+      return
+
+    query = arm.popups.input_prompt("Search archive (keywords, type:, since:, until:, from:, to:): ")
+
+    if not query:
+      return
+
+    try:
+      criteria = arm.util.archive.parse_query(query)
+    except ValueError as exc:
+      arm.popups.show_msg("Invalid search: %s" % exc, 2)
+      return
+
+    results = []
+
+    for timestamp, event_type, msg in self.archive.search(limit = MAX_ARCHIVE_RESULTS, **criteria):
+      runlevel = event_type[4:] if event_type.startswith("ARM_") else event_type
+      results.append(LogEntry(timestamp, event_type, msg, RUNLEVEL_EVENT_COLOR.get(runlevel, "white")))
+
+    popup, width, height = arm.popups.init()
+
+    if not popup:
+      return
+
+    try:
+      scroll, key = 0, None
+      page_height = height - 2
+      curses.cbreak()  # wait indefinitely for key presses (no timeout)
+
+      while key is None or uiTools.is_scroll_key(key):
+        if key is not None:
+          scroll = uiTools.get_scroll_position(key, scroll, page_height, len(results))
+
+        popup.win.erase()
+        popup.win.box()
+        popup.addstr(0, 0, "Archive Search (%i results):" % len(results), curses.A_STANDOUT)
+
+        if not results:
+          popup.addstr(1, 2, "No archived events match '%s', press any key..." % query, curses.A_BOLD)
+
+        for i, entry in enumerate(results[scroll:scroll + page_height]):
+          msg = uiTools.crop_str(entry.get_display_message(True).replace("\n", " "), width - 3)
+          popup.addstr(i + 1, 2, msg, uiTools.get_color(entry.color))
+
+        popup.win.refresh()
+        key = arm.controller.get_controller().get_screen().getch()
+    finally:
+      arm.popups.finalize()
+
+  def show_event_rates_popup(self):
+    """
+    Presents the rates at which we're receiving each event type, with a
+    sparkline for the last minute. This is refreshed each second until a key
+    is pressed.
+    """
+
+    popup, width, height = arm.popups.init()
+
+    if not popup:
+      return
+
+    try:
+      control = arm.controller.get_controller()
+      curses.halfdelay(10)  # refreshes every second
+
+      while True:
+        now = time.time()
+        rates = [(event_type, self._event_rates.get_rates(event_type, now)) for event_type in self._event_rates.get_types()]
+        rates.sort(key = lambda entry: (-entry[1][1], -entry[1][2], entry[0]))  # busiest first
+
+        popup.win.erase()
+        popup.win.box()
+        popup.addstr(0, 0, "Event Rates (per second):", curses.A_STANDOUT)
+        popup.addstr(1, 2, "%-16s %9s %9s %9s  %s" % ("Type", "1 sec", "1 min", "15 min", "last minute"), curses.A_BOLD)
+
+        sparkline_width = max(0, width - 51)
+
+        for i, (event_type, (per_second, per_minute, per_fifteen)) in enumerate(rates[:height - 4]):
+          runlevel = event_type[4:] if event_type.startswith("ARM_") else event_type
+          color = uiTools.get_color(RUNLEVEL_EVENT_COLOR.get(runlevel, "white"))
+
+          popup.addstr(i + 2, 2, "%-16s %9.1f %9.1f %9.1f" % (event_type[:16], per_second, per_minute, per_fifteen), color)
+          popup.addstr(i + 2, 49, uiTools.get_sparkline(self._event_rates.get_history(event_type, now), sparkline_width), color)
+
+        if not rates:
+          popup.addstr(2, 2, "No events have been received yet", curses.A_BOLD)
+
+        popup.addstr(height - 2, 2, "Press any key...")
+        popup.win.refresh()
+
+        if control.get_screen().getch() != -1:
+          break
+    finally:
+      arm.popups.finalize()
+
   def clear(self):
     """
     Clears the contents of the event log.
@@ -822,6 +1424,8 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     self.vals_lock.acquire()
     self.msg_log = []
+    self._daybreaks.reset(self.msg_log)
+    self._apply_filter()
     self.redraw(True)
     self.vals_lock.release()
 
@@ -851,11 +1455,8 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     self.vals_lock.acquire()
 
     try:
-      for entry in self.msg_log:
-        is_visible = not self.regex_filter or self.regex_filter.search(entry.get_display_message())
-
-        if is_visible:
-          snapshot_file.write(entry.get_display_message(True) + "\n")
+      for entry in self.filtered_log if self.regex_filter else self.msg_log:
+        snapshot_file.write(entry.get_display_message(True) + "\n")
 
       self.vals_lock.release()
     except Exception as exc:
@@ -918,6 +1519,10 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
       self.show_event_selection_prompt()
     elif key == ord('a') or key == ord('A'):
       self.show_snapshot_prompt()
+    elif key == ord('/'):
+      self.show_archive_search_prompt()
+    elif key == ord('v') or key == ord('V'):
+      self.show_event_rates_popup()
     else:
       is_keystroke_consumed = False
 
@@ -932,6 +1537,8 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     options.append(("f", "log regex filter", "enabled" if self.regex_filter else "disabled"))
     options.append(("u", "duplicate log entries", "visible" if CONFIG["features.log.showDuplicateEntries"] else "hidden"))
     options.append(("c", "clear event log", None))
+    options.append(("/", "search archived events", None))
+    options.append(("v", "event rates", None))
     return options
 
   def draw(self, width, height):
@@ -940,61 +1547,62 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     contain up to two lines. Starts with newest entries.
     """
 
-    current_log = self.get_attr("msg_log")
+    current_log = self.get_attr("filtered_log" if self.regex_filter else "msg_log")
 
     self.vals_lock.acquire()
-    self._last_logged_events, self._last_update = list(current_log), time.time()
+    self._last_drawn_version, self._last_update = self._log_version, time.time()
 
     # draws the top label
 
     if self.is_title_visible():
       self.addstr(0, 0, self._get_title(width), curses.A_STANDOUT)
 
-    # restricts scroll location to valid bounds
+    # Lays out the content, making room for a scroll bar if it's longer than
+    # the height. Guessing based on the last layout avoids doing this twice.
 
-    self.scroll = max(0, min(self.scroll, self.last_content_height - height + 1))
+    is_scroll_bar_visible = self.last_content_height > height - 1
+    msg_indent = 3 if is_scroll_bar_visible else 1
+    display = self._get_display(current_log, width, msg_indent)
 
-    # draws left-hand scroll bar if content's longer than the height
+    if is_scroll_bar_visible != (display.get_total() > height - 1):
+      is_scroll_bar_visible = not is_scroll_bar_visible
+      msg_indent = 3 if is_scroll_bar_visible else 1
+      display = self._get_display(current_log, width, msg_indent)
 
-    msg_indent, divider_indent = 1, 0  # offsets for scroll bar
-    is_scroll_bar_visible = self.last_content_height > height - 1
+    divider_indent = 2 if is_scroll_bar_visible else 0  # offset for scroll bar
 
-    if is_scroll_bar_visible:
-      msg_indent, divider_indent = 3, 2
-      self.add_scroll_bar(self.scroll, self.scroll + height - 1, self.last_content_height, 1)
+    self.last_content_height = display.get_total()
 
-    # draws log entries
+    # restricts scroll location to valid bounds
 
-    line_count = 1 - self.scroll
-    seen_first_date_divider = False
-    divider_attr, duplicate_attr = curses.A_BOLD | uiTools.get_color("yellow"), curses.A_BOLD | uiTools.get_color("green")
+    self.scroll = max(0, min(self.scroll, self.last_content_height - height + 1))
 
-    is_dates_shown = self.regex_filter is None and CONFIG["features.log.showDateDividers"]
-    event_log = get_daybreaks(current_log, self.is_paused()) if is_dates_shown else list(current_log)
+    if is_scroll_bar_visible:
+      self.add_scroll_bar(self.scroll, self.scroll + height - 1, self.last_content_height, 1)
 
-    if not CONFIG["features.log.showDuplicateEntries"]:
-      deduplicated_log = get_duplicates(event_log)
+    # draws log entries, starting with the one at our scroll position
 
-      if deduplicated_log is None:
-        log.warn("Deduplication took too long. Its current implementation has difficulty handling large logs so disabling it to keep the interface responsive.")
-        self.set_duplicate_visability(True)
-        deduplicated_log = [(entry, 0) for entry in event_log]
-    else:
-      deduplicated_log = [(entry, 0) for entry in event_log]
+    divider_attr = curses.A_BOLD | uiTools.get_color("yellow")
+    max_entries_per_line = CONFIG["features.log.max_lines_per_entry"]
 
     # determines if we have the minimum width to show date dividers
 
     show_daybreaks = width - divider_indent >= 3
 
-    while deduplicated_log:
-      entry, duplicate_count = deduplicated_log.pop(0)
+    for entry, duplicate_count, item_line, seen_first_date_divider in display.get_items(self.scroll):
+      line_count = 1 + item_line - self.scroll
 
-      if self.regex_filter and not self.regex_filter.search(entry.get_display_message()):
-        continue  # filter doesn't match log message - skip
+      if line_count >= height:
+        break
 
-      # checks if we should be showing a divider with the date
+      if entry is None:
+        # bottom of the last divider
 
-      if entry.type == DAYBREAK_EVENT:
+        if line_count >= 1 and show_daybreaks:
+          self.addch(line_count, divider_indent, curses.ACS_LLCORNER, divider_attr)
+          self.hline(line_count, divider_indent + 1, width - divider_indent - 2, divider_attr)
+          self.addch(line_count, width - 1, curses.ACS_LRCORNER, divider_attr)
+      elif entry.type == DAYBREAK_EVENT:
         # bottom of the divider
 
         if seen_first_date_divider:
@@ -1016,97 +1624,18 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
           line_length = width - divider_indent - len(time_label) - 3
           self.hline(line_count, divider_indent + len(time_label) + 2, line_length, divider_attr)
           self.addch(line_count, divider_indent + len(time_label) + 2 + line_length, curses.ACS_URCORNER, divider_attr)
-
-        seen_first_date_divider = True
-        line_count += 1
       else:
-        # entry contents to be displayed, tuples of the form:
-        # (msg, formatting, includeLinebreak)
-
-        display_queue = []
-
-        msg_comp = entry.get_display_message().split("\n")
-
-        for i in range(len(msg_comp)):
-          font = curses.A_BOLD if "ERR" in entry.type else curses.A_NORMAL  # emphasizes ERR messages
-          display_queue.append((msg_comp[i].strip(), font | uiTools.get_color(entry.color), i != len(msg_comp) - 1))
+        _, segments = entry.get_layout(width, msg_indent, max_entries_per_line, duplicate_count)
 
-        if duplicate_count:
-          plural_label = "s" if duplicate_count > 1 else ""
-          duplicate_msg = DUPLICATE_MSG % (duplicate_count, plural_label)
-          display_queue.append((duplicate_msg, duplicate_attr, False))
-
-        cursor_location, line_offset = msg_indent, 0
-        max_entries_per_line = CONFIG["features.log.max_lines_per_entry"]
-
-        while display_queue:
-          msg, format, include_break = display_queue.pop(0)
+        for line_offset, x, msg, format in segments:
           draw_line = line_count + line_offset
 
-          if line_offset == max_entries_per_line:
-            break
-
-          max_msg_size = width - cursor_location - 1
-
-          if len(msg) > max_msg_size:
-            # message is too long - break it up
-            if line_offset == max_entries_per_line - 1:
-              msg = uiTools.crop_str(msg, max_msg_size)
-            else:
-              msg, remainder = uiTools.crop_str(msg, max_msg_size, 4, 4, uiTools.Ending.HYPHEN, True)
-              display_queue.insert(0, (remainder.strip(), format, include_break))
-
-            include_break = True
-
           if draw_line < height and draw_line >= 1:
-            if seen_first_date_divider and width - divider_indent >= 3 and show_daybreaks:
+            if seen_first_date_divider and show_daybreaks:
               self.addch(draw_line, divider_indent, curses.ACS_VLINE, divider_attr)
               self.addch(draw_line, width - 1, curses.ACS_VLINE, divider_attr)
 
-            self.addstr(draw_line, cursor_location, msg, format)
-
-          cursor_location += len(msg)
-
-          if include_break or not display_queue:
-            line_offset += 1
-            cursor_location = msg_indent + ENTRY_INDENT
-
-        line_count += line_offset
-
-      # if this is the last line and there's room, then draw the bottom of the divider
-
-      if not deduplicated_log and seen_first_date_divider:
-        if line_count < height and show_daybreaks:
-          self.addch(line_count, divider_indent, curses.ACS_LLCORNER, divider_attr)
-          self.hline(line_count, divider_indent + 1, width - divider_indent - 2, divider_attr)
-          self.addch(line_count, width - 1, curses.ACS_LRCORNER, divider_attr)
-
-        line_count += 1
-
-    # redraw the display if...
-    # - last_content_height was off by too much
-    # - we're off the bottom of the page
-
-    new_content_height = line_count + self.scroll - 1
-    content_height_delta = abs(self.last_content_height - new_content_height)
-    force_redraw, force_redraw_reason = True, ""
-
-    if content_height_delta >= CONTENT_HEIGHT_REDRAW_THRESHOLD:
-      force_redraw_reason = "estimate was off by %i" % content_height_delta
-    elif new_content_height > height and self.scroll + height - 1 > new_content_height:
-      force_redraw_reason = "scrolled off the bottom of the page"
-    elif not is_scroll_bar_visible and new_content_height > height - 1:
-      force_redraw_reason = "scroll bar wasn't previously visible"
-    elif is_scroll_bar_visible and new_content_height <= height - 1:
-      force_redraw_reason = "scroll bar shouldn't be visible"
-    else:
-      force_redraw = False
-
-    self.last_content_height = new_content_height
-
-    if force_redraw:
-      log.debug("redrawing the log panel with the corrected content height (%s)" % force_redraw_reason)
-      self.redraw(True)
+            self.addstr(draw_line, x, msg, format)
 
     self.vals_lock.release()
 
@@ -1124,13 +1653,15 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     last_day = days_since()  # used to determine if the date has changed
 
     while not self._halt:
+      self._process_intake()
+
       current_day = days_since()
       time_since_reset = time.time() - self._last_update
       max_log_update_rate = CONFIG["features.log.maxRefreshRate"] / 1000.0
 
       sleep_time = 0
 
-      if (self.msg_log == self._last_logged_events and last_day == current_day) or self.is_paused():
+      if (self._log_version == self._last_drawn_version and last_day == current_day) or self.is_paused():
         sleep_time = 5
       elif time_since_reset < max_log_update_rate:
         sleep_time = max(0.05, max_log_update_rate - time_since_reset)
@@ -1138,6 +1669,13 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
       if sleep_time:
         self._cond.acquire()
 
+        # if tor events are waiting then gather them for at most our refresh
+        # rate (this is checked while holding the condition so we don't miss
+        # a notification)
+
+        if self._intake:
+          sleep_time = min(sleep_time, max_log_update_rate)
+
         if not self._halt:
           self._cond.wait(sleep_time)
 
@@ -1161,6 +1699,21 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     self._cond.notifyAll()
     self._cond.release()
 
+    if self.log_file:
+      if self.log_file.get_dropped():
+        log.notice("Unable to save %i events to our log file" % self.log_file.get_dropped())
+
+      self.log_file.stop()
+      self.log_file.join()
+
+    if self.archive:
+      self.archive.stop()
+      self.archive.join()
+
+    if self._log_follower:
+      self._log_follower.stop()
+      self._log_follower.join()
+
   def set_event_listening(self, events):
     """
     Configures the events Tor listens for, filtering non-tor events from what we
@@ -1186,6 +1739,15 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
     tor_events = events.intersection(set(arm.arguments.TOR_EVENT_TYPES.values()))
     arm_events = events.intersection(set(["ARM_%s" % runlevel for runlevel in log.Runlevel.keys()]))
 
+    # runlevel events that tor writes to the file we're following come from
+    # there, rather than the control port
+
+    followed_events = set()
+
+    if self._log_follower:
+      followed_events = tor_events.intersection(set(self._followed_runlevels))
+      tor_events.difference_update(followed_events)
+
     # adds events unrecognized by arm if we're listening to the 'UNKNOWN' type
 
     if "UNKNOWN" in events:
@@ -1202,13 +1764,20 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     # provides back the input set minus events we failed to set
 
-    return sorted(tor_events.union(arm_events))
+    return sorted(tor_events.union(arm_events).union(followed_events))
 
   def _reset_listener(self, controller, event_type, _):
     # if we're attaching to a new tor instance then clears the log and
     # prepopulates it with the content belonging to this instance
 
     if event_type == State.INIT:
+      # tor's log file might have changed (or it might have just started
+      # logging to one), so follow what it has now
+
+      if CONFIG["features.log.follow"]:
+        self._start_log_follower()
+        self.set_event_listening(self.logged_events)
+
       self.reprepopulate_events()
       self.redraw(True)
     elif event_type == State.CLOSED:
@@ -1335,19 +1904,105 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
 
     return panel_label
 
+  def _apply_filter(self):
+    """
+    Rebuilds the filtered_log from our msg_log. If we're paused then the
+    listing we're displaying is refiltered too.
+    """
+
+    self.vals_lock.acquire()
+    self._log_version += 1
+    self._display = None
+
+    if self.regex_filter:
+      search = self.regex_filter.search
+      self.filtered_log = [entry for entry in self.msg_log if search(entry.get_display_message())]
+    else:
+      self.filtered_log = None
+
+    if self.is_paused():
+      paused_log = self.pause_buffer["msg_log"]
+
+      if self.regex_filter and paused_log is not None:
+        self.pause_buffer["filtered_log"] = [entry for entry in paused_log if search(entry.get_display_message())]
+      else:
+        self.pause_buffer["filtered_log"] = None
+
+    self.vals_lock.release()
+
+  def _get_display(self, current_log, width, msg_indent):
+    """
+    Provides the LogDisplay for the given log. This follows our log as events
+    are registered, so it's only made anew when its parameters change.
+
+    Arguments:
+      current_log - log entries being displayed, newest first
+      width       - width of the panel
+      msg_indent  - horizontal offset for messages
+    """
+
+    is_dates_shown, is_deduplicating = self._get_display_mode()[1:]
+    display_args = self._get_display_mode() + (width, msg_indent, CONFIG["features.log.max_lines_per_entry"])
+
+    if self.is_paused():
+      # When paused we're showing a snapshot of the log, so our daybreaks are
+      # only calculated when it's taken.
+
+      display_args += (self.get_pause_time(),)
+
+      if display_args != self._paused_display_args:
+        listing = get_daybreaks(current_log) if is_dates_shown else current_log
+        self._paused_display = LogDisplay(width, msg_indent, display_args[5], is_dates_shown, is_deduplicating, listing)
+        self._paused_display_args = display_args
+
+      return self._paused_display
+
+    if self._display is None or display_args != self._display_args:
+      self._display = LogDisplay(width, msg_indent, display_args[5], is_dates_shown, is_deduplicating, self._get_display_source())
+      self._display_args = display_args
+    elif is_dates_shown:
+      self._display.sync(self._get_display_source())  # adds a marker if the day's changed
+
+    return self._display
+
+  def _get_display_mode(self):
+    """
+    Provides a tuple of the form (regex_filter, is_dates_shown,
+    is_deduplicating) for how our log is displayed.
+    """
+
+    is_dates_shown = self.regex_filter is None and CONFIG["features.log.showDateDividers"]
+    return (self.regex_filter, is_dates_shown, not CONFIG["features.log.showDuplicateEntries"])
+
+  def _get_display_source(self):
+    """
+    Provides the listing our LogDisplay is made from, newest first.
+    """
+
+    if self.regex_filter:
+      return self.filtered_log
+    elif CONFIG["features.log.showDateDividers"]:
+      return self._daybreaks.get_listing()
+    else:
+      return self.msg_log
+
   def _trim_events(self, event_listing):
     """
     Crops events that have either:
     - grown beyond the cache limit
     - outlived the configured log duration
 
+    This provides the entries that were removed, oldest last.
+
     Argument:
       event_listing - listing of log entries
     """
 
+    trimmed_events = []
     cache_size = CONFIG["cache.log_panel.size"]
 
     if len(event_listing) > cache_size:
+      trimmed_events = event_listing[cache_size:]
       del event_listing[cache_size:]
 
     log_ttl = CONFIG["features.log.entryDuration"]
@@ -1368,4 +2023,7 @@ class LogPanel(panel.Panel, threading.Thread, logging.Handler):
       # removes entries older than the ttl
 
       if breakpoint is not None:
+        trimmed_events = event_listing[breakpoint:] + trimmed_events
         del event_listing[breakpoint:]
+
+    return trimmed_events
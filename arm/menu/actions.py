@@ -18,6 +18,7 @@ from stem.util import conf, str_tools
 
 CONFIG = conf.config_dict("arm", {
   "features.log.showDuplicateEntries": False,
+  "features.connection.resolveHostnames": True,
 })
 
 
@@ -137,6 +138,8 @@ def make_graph_menu(graph_panel):
     [ ] <Stat 2>
     [ ] <Stat 2>
         Resize...
+        Percentiles...
+        Export...
         Interval (Submenu)
         Bounds (Submenu)
 
@@ -160,6 +163,8 @@ def make_graph_menu(graph_panel):
   # resizing option
 
   graph_menu.add(arm.menu.item.MenuItem("Resize...", graph_panel.resize_graph))
+  graph_menu.add(arm.menu.item.MenuItem("Percentiles...", graph_panel.show_percentiles_popup))
+  graph_menu.add(arm.menu.item.MenuItem("Export...", graph_panel.show_export_prompt))
 
   # interval submenu
 
@@ -191,6 +196,8 @@ def make_log_menu(log_panel):
   Submenu for the log panel, consisting of...
     Events...
     Snapshot...
+    Search Archive...
+    Event Rates...
     Clear
     Show / Hide Duplicates
     Filter (Submenu)
@@ -203,6 +210,8 @@ def make_log_menu(log_panel):
 
   log_menu.add(arm.menu.item.MenuItem("Events...", log_panel.show_event_selection_prompt))
   log_menu.add(arm.menu.item.MenuItem("Snapshot...", log_panel.show_snapshot_prompt))
+  log_menu.add(arm.menu.item.MenuItem("Search Archive...", log_panel.show_archive_search_prompt))
+  log_menu.add(arm.menu.item.MenuItem("Event Rates...", log_panel.show_event_rates_popup))
   log_menu.add(arm.menu.item.MenuItem("Clear", log_panel.clear))
 
   if CONFIG["features.log.showDuplicateEntries"]:
@@ -248,7 +257,9 @@ def make_connections_menu(conn_panel):
   listing_group = arm.menu.item.SelectionGroup(conn_panel.set_listing_type, conn_panel.get_listing_type())
 
   listing_options = list(arm.connections.entries.ListingType)
-  listing_options.remove(arm.connections.entries.ListingType.HOSTNAME)
+
+  if not CONFIG["features.connection.resolveHostnames"]:
+    listing_options.remove(arm.connections.entries.ListingType.HOSTNAME)
 
   for option in listing_options:
     connections_menu.add(arm.menu.item.SelectionMenuItem(option, listing_group, option))
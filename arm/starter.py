@@ -16,6 +16,9 @@ import threading
 import arm
 import arm.arguments
 import arm.controller
+import arm.graphing.export
+import arm.graphing.graphPanel
+import arm.util.hostnames
 import arm.util.panel
 import arm.util.torConfig
 import arm.util.torTools
@@ -65,6 +68,10 @@ def main():
 
   _load_user_armrc(args.config)
 
+  if args.export_path is not None:
+    _export_graph_history(args.export_path)
+    sys.exit()
+
   try:
     controller = init_controller(args)
     authenticate(controller, CONFIG.get('tor.password', None), CONFIG.get('tor.chroot', ''))
@@ -168,6 +175,31 @@ def _load_user_armrc(path):
     notice('config.nothing_loaded', path = path)
 
 
+def _export_graph_history(path):
+  """
+  Writes the graph history saved when we last ran to the given path, without
+  needing a tor connection.
+  """
+
+  data_dir = os.path.expanduser(CONFIG.get('startup.data_directory', '~/.arm'))
+  history_dir = os.path.join(data_dir, 'graph_history')
+
+  if not os.path.isdir(history_dir):
+    print msg('export.no_history', path = history_dir)
+    sys.exit(1)
+
+  intervals = arm.graphing.graphPanel.UPDATE_INTERVALS
+  history_size = arm.graphing.graphPanel.get_history_size()
+
+  try:
+    rows = arm.graphing.export.store_history(history_dir, intervals, history_size)
+    row_count = arm.graphing.export.write_history(path, rows)
+    print msg('export.saved', count = row_count, path = path)
+  except (IOError, OSError) as exc:
+    print msg('export.unable_to_export', path = path, error = exc)
+    sys.exit(1)
+
+
 def _warn_if_root(controller):
   """
   Give a notice if tor or arm are running with root.
@@ -287,6 +319,8 @@ def _shutdown_daemons(controller):
   for thread in halt_threads:
     thread.join()
 
+  arm.util.hostnames.stop_resolver()
+
 
 if __name__ == '__main__':
   main()
@@ -4,7 +4,7 @@ application's status, making cross platform system calls, parsing tor data,
 and safely working with curses (hiding some of the gory details).
 """
 
-__all__ = ["connections", "panel", "sysTools", "textInput", "torConfig", "torTools", "tracker", "uiTools"]
+__all__ = ["archive", "connections", "hostnames", "log", "panel", "sysTools", "textInput", "torConfig", "torTools", "tracker", "uiTools"]
 
 import getpass
 import os
@@ -0,0 +1,511 @@
+"""
+On-disk archive of logged events, letting us search history that has fallen
+out of the log panel.
+
+::
+
+  parse_query - converts a search string into EventArchive.search() arguments
+
+  EventArchive - thread that archives events, segmented by day
+    |- add - queues an event to be archived
+    |- search - provides archived events matching some criteria
+    |- prune - removes days we no longer want to keep
+    +- stop - writes anything that's queued and terminates the thread
+
+Each day is a directory (such as '2014-07-15') with three files...
+
+  * **events** - lines of the form 'timestamp<tab>type<tab>message'
+  * **time_index** - binary (timestamp, offset) record for each block of
+    events, where the timestamp is the newest we had written to the day when
+    the block began
+  * **token_index** - lines of the form 'token<tab>block' for the words of
+    each block
+
+Events are written in the order they arrive, which isn't necessarily the order
+they occurred in (for instance, lines read from tor's log file can trail our
+own events). The time_index is only used to skip blocks that are entirely
+before our start, and searches sort the matches of each day.
+
+Searches use the indices to only read the blocks that can match, so they don't
+need to load an archive's contents into memory.
+"""
+
+import bisect
+import collections
+import heapq
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+
+import stem.util.log
+
+# maximum number of events in an indexed block
+
+BLOCK_SIZE = 64
+
+# time_index record of the newest timestamp written to the day when a block
+# began, and the block's offset in the events. Unlike the timestamps of the
+# events themselves these never decrease, so they can be bisected.
+
+INDEX_RECORD = struct.Struct("!dQ")
+
+DAY_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TOKEN_PATTERN = re.compile(r"\w{2,}")
+
+EVENTS_FILE = "events"
+TIME_INDEX_FILE = "time_index"
+TOKEN_INDEX_FILE = "token_index"
+
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_query(query, now = None):
+  """
+  Parses a search of the form...
+
+  ::
+
+    [keyword...] [type:TYPE[,TYPE...]] [since:N(s|m|h|d)] [until:N(s|m|h|d)]
+      [from:YYYY-MM-DD] [to:YYYY-MM-DD]
+
+  ... into keyword arguments for :func:`EventArchive.search`. For instance,
+  'circuit type:WARN,ERR since:3d' provides warnings and errors from the last
+  three days that mention circuits.
+
+  :param str query: search to be parsed
+  :param float now: unix time relative times are from, the current time if
+    **None**
+
+  :returns: **dict** of search arguments
+
+  :raises: **ValueError** if the query is malformed, or has a keyword without
+    any indexed words (those of two or more letters or digits)
+  """
+
+  if now is None:
+    now = time.time()
+
+  criteria = {}
+
+  for word in query.split():
+    if not ":" in word:
+      tokens = _tokenize(word)
+
+      if not tokens:
+        raise ValueError("'%s' is too short to search for, keywords need at least two letters or digits" % word)
+
+      criteria.setdefault("keywords", []).extend(tokens)
+      continue
+
+    key, value = word.split(":", 1)
+    key = key.lower()
+
+    if key == "type":
+      criteria["event_types"] = [event_type.upper() for event_type in value.split(",") if event_type]
+    elif key in ("since", "until"):
+      if len(value) < 2 or not value[:-1].isdigit() or not value[-1] in TIME_UNITS:
+        raise ValueError("'%s' should be a number followed by s, m, h, or d" % word)
+
+      timestamp = now - int(value[:-1]) * TIME_UNITS[value[-1]]
+      criteria["start" if key == "since" else "end"] = timestamp
+    elif key in ("from", "to"):
+      try:
+        day_start = time.mktime(time.strptime(value, "%Y-%m-%d"))
+      except ValueError:
+        raise ValueError("'%s' should be a date of the form YYYY-MM-DD" % word)
+
+      if key == "from":
+        criteria["start"] = day_start
+      else:
+        criteria["end"] = _next_day(day_start)
+    else:
+      raise ValueError("'%s' isn't a recognized search criteria" % key)
+
+  return criteria
+
+
+class EventArchive(threading.Thread):
+  """
+  Thread that archives events to disk. Like the LogFileWriter, events are
+  queued and written in batches so callers don't block on the disk.
+  """
+
+  def __init__(self, path, queue_size = 10000, flush_rate = 1.0):
+    """
+    Prepares the directory events are archived to.
+
+    :param str path: directory to place the archive in
+    :param int queue_size: maximum number of events to hold before dropping
+      them
+    :param float flush_rate: seconds to batch events before writing them
+
+    :raises: **OSError** if unable to make the directory
+    """
+
+    super(EventArchive, self).__init__()
+    self.setDaemon(True)
+
+    if not os.path.exists(path):
+      os.makedirs(path)
+
+    self._path = path
+    self._queue_size = queue_size
+    self._flush_rate = flush_rate
+
+    self._queue = collections.deque()
+    self._queue_cond = threading.Condition()
+    self._dropped = 0
+    self._halt = False  # terminates thread if true
+
+    # state of the day we're writing to
+
+    self._day = None
+    self._events_file = None
+    self._time_index_file = None
+    self._token_index_file = None
+    self._current_block = -1            # index of the block we're writing
+    self._current_block_size = 0        # number of events in the block
+    self._current_block_tokens = set()  # tokens in the block's token_index
+    self._newest_timestamp = None       # newest timestamp written to the day
+
+  def add(self, timestamp, event_type, msg):
+    """
+    Queues an event to be archived.
+
+    :param float timestamp: unix timestamp for when the event occurred
+    :param str event_type: event type that occurred ("INFO", "BW", etc)
+    :param str msg: message that was logged
+
+    :returns: **bool** that's **False** if the event was dropped
+    """
+
+    with self._queue_cond:
+      if self._halt or len(self._queue) >= self._queue_size:
+        self._dropped += 1
+        return False
+
+      self._queue.append((timestamp, event_type, msg))
+
+      if len(self._queue) >= max(1, self._queue_size / 2):
+        self._queue_cond.notifyAll()
+
+    return True
+
+  def get_dropped(self):
+    """
+    Provides the number of events we discarded, either due to our queue being
+    full or being unable to write them.
+
+    :returns: **int** for the number of events dropped
+    """
+
+    return self._dropped
+
+  def search(self, start = None, end = None, event_types = None, keywords = None, limit = None):
+    """
+    Provides archived events matching the given criteria, newest first.
+
+    :param float start: unix time events must occur at or after
+    :param float end: unix time events must occur before
+    :param list event_types: event types to provide, any type if **None**
+    :param list keywords: words that must all be in the message
+    :param int limit: maximum number of events to provide
+
+    :returns: **generator** for **(timestamp, event_type, msg)** tuples
+    """
+
+    event_types = set(event_types) if event_types else None
+    keywords = set([token for keyword in (keywords or []) for token in _tokenize(keyword)])
+
+    for day in sorted(self._get_days(), reverse = True):
+      day_start = time.mktime(time.strptime(day, "%Y-%m-%d"))
+
+      if (start is not None and _next_day(day_start) <= start) or (end is not None and day_start >= end):
+        continue
+
+      # only the newest matches of the day are needed if we have a limit
+
+      day_events = self._search_day(os.path.join(self._path, day), start, end, event_types, keywords)
+
+      if limit is not None:
+        matches = heapq.nlargest(limit, day_events, key = lambda event: event[0])
+      else:
+        matches = sorted(day_events, key = lambda event: event[0], reverse = True)
+
+      for event in matches:
+        yield event
+
+        if limit is not None:
+          limit -= 1
+
+          if limit <= 0:
+            return
+
+  def prune(self, max_days):
+    """
+    Removes days older than the given number of days.
+
+    :param int max_days: number of days to keep
+    """
+
+    oldest_day = time.strftime("%Y-%m-%d", time.localtime(time.time() - max_days * 86400))
+
+    for day in self._get_days():
+      if day < oldest_day and day != self._day:
+        try:
+          shutil.rmtree(os.path.join(self._path, day))
+        except OSError as exc:
+          stem.util.log.info("Unable to remove archived events from %s: %s" % (day, exc))
+
+  def run(self):
+    while True:
+      # gathers events for a flush_rate unless we're halting or filling up
+
+      with self._queue_cond:
+        if not self._halt and len(self._queue) < max(1, self._queue_size / 2):
+          self._queue_cond.wait(self._flush_rate)
+
+        batch = list(self._queue)
+        self._queue.clear()
+        is_halted = self._halt
+
+      if batch:
+        try:
+          for timestamp, event_type, msg in batch:
+            self._archive(timestamp, event_type, msg)
+
+          for archive_file in (self._events_file, self._time_index_file, self._token_index_file):
+            archive_file.flush()
+        except (IOError, OSError) as exc:
+          stem.util.log.warn("Unable to archive events, %s" % exc)
+          self._dropped += len(batch)
+          self._day = None  # reopen files for the next batch
+
+      if is_halted:
+        break
+
+    self._close_day()
+
+  def stop(self):
+    """
+    Writes anything that's queued, closes our files, and terminates the thread.
+    """
+
+    with self._queue_cond:
+      self._halt = True
+      self._queue_cond.notifyAll()
+
+  def _archive(self, timestamp, event_type, msg):
+    """
+    Writes an event to its day's files, starting a new block if the current
+    one is full.
+    """
+
+    day = time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+    if day != self._day:
+      self._open_day(day)
+
+    self._newest_timestamp = max(self._newest_timestamp, timestamp)
+
+    if self._current_block_size >= BLOCK_SIZE:
+      self._current_block += 1
+      self._current_block_size = 0
+      self._current_block_tokens = set()
+      self._time_index_file.write(INDEX_RECORD.pack(self._newest_timestamp, self._events_file.tell()))
+
+    escaped_msg = msg.replace("\\", "\\\\").replace("\n", "\\n")
+    self._events_file.write("%0.3f\t%s\t%s\n" % (timestamp, event_type, escaped_msg))
+    self._current_block_size += 1
+
+    for token in set(_tokenize(msg)).difference(self._current_block_tokens):
+      self._token_index_file.write("%s\t%i\n" % (token, self._current_block))
+      self._current_block_tokens.add(token)
+
+  def _open_day(self, day):
+    """
+    Opens the files of the given day, starting a new block at the end of
+    anything it already has.
+    """
+
+    self._close_day()
+
+    day_path = os.path.join(self._path, day)
+
+    if not os.path.exists(day_path):
+      os.makedirs(day_path)
+
+    self._events_file = open(os.path.join(day_path, EVENTS_FILE), "ab")
+    self._time_index_file = open(os.path.join(day_path, TIME_INDEX_FILE), "ab")
+    self._token_index_file = open(os.path.join(day_path, TOKEN_INDEX_FILE), "ab")
+
+    self._events_file.seek(0, os.SEEK_END)
+    self._time_index_file.seek(0, os.SEEK_END)
+
+    self._day = day
+    self._current_block = self._time_index_file.tell() / INDEX_RECORD.size - 1
+    self._current_block_size = BLOCK_SIZE  # starts a new block with our next event
+    self._newest_timestamp = self._get_newest_timestamp(day_path)
+
+  def _get_newest_timestamp(self, day_path):
+    """
+    Provides the newest timestamp a day has, which is in either its last
+    time_index record or its last block. This is **None** if it has neither.
+    """
+
+    newest_timestamp, offset = None, 0
+
+    try:
+      with open(os.path.join(day_path, TIME_INDEX_FILE), "rb") as time_index_file:
+        index_content = time_index_file.read()
+
+      if len(index_content) >= INDEX_RECORD.size:
+        record_start = (len(index_content) / INDEX_RECORD.size - 1) * INDEX_RECORD.size
+        newest_timestamp, offset = INDEX_RECORD.unpack_from(index_content, record_start)
+
+      with open(os.path.join(day_path, EVENTS_FILE), "rb") as events_file:
+        events_file.seek(offset)
+
+        for line in events_file:
+          try:
+            newest_timestamp = max(newest_timestamp, float(line.split("\t", 1)[0]))
+          except ValueError:
+            continue
+    except IOError:
+      pass
+
+    return newest_timestamp
+
+  def _close_day(self):
+    for archive_file in (self._events_file, self._time_index_file, self._token_index_file):
+      if archive_file:
+        archive_file.close()
+
+    self._events_file = self._time_index_file = self._token_index_file = None
+
+  def _get_days(self):
+    try:
+      return [day for day in os.listdir(self._path) if DAY_PATTERN.match(day)]
+    except OSError:
+      return []
+
+  def _search_day(self, day_path, start, end, event_types, keywords):
+    """
+    Provides the events of a day matching the given criteria in the order they
+    were archived.
+    """
+
+    try:
+      with open(os.path.join(day_path, TIME_INDEX_FILE), "rb") as time_index_file:
+        index_content = time_index_file.read()
+    except IOError:
+      return
+
+    record_count = len(index_content) / INDEX_RECORD.size
+    block_times, block_offsets = [], []
+
+    for i in range(record_count):
+      timestamp, offset = INDEX_RECORD.unpack_from(index_content, i * INDEX_RECORD.size)
+      block_times.append(timestamp)
+      block_offsets.append(offset)
+
+    blocks = range(record_count)
+
+    # the token index can reference a block we haven't flushed the time_index
+    # record for yet, and if it's unreadable we scan the whole day instead
+
+    if keywords:
+      keyword_blocks = self._get_blocks_with(day_path, keywords)
+
+      if keyword_blocks is not None:
+        blocks = sorted([block for block in keyword_blocks if block < record_count])
+
+    # Each record is at least as new as everything in the prior blocks, so
+    # blocks followed by a record older than our start can be skipped.
+
+    if start is not None:
+      first_block = max(0, bisect.bisect_left(block_times, start) - 1)
+      blocks = [block for block in blocks if block >= first_block]
+
+    try:
+      events_file = open(os.path.join(day_path, EVENTS_FILE), "rb")
+    except IOError:
+      return
+
+    try:
+      for block in blocks:
+        events_file.seek(block_offsets[block])
+        block_end = block_offsets[block + 1] if block + 1 < record_count else None
+
+        while block_end is None or events_file.tell() < block_end:
+          line = events_file.readline()
+
+          if not line.endswith("\n"):
+            break  # end of the file, or a partially written event
+
+          try:
+            timestamp, event_type, msg = line[:-1].split("\t", 2)
+            timestamp = float(timestamp)
+          except ValueError:
+            continue
+
+          if end is not None and timestamp >= end:
+            continue
+          elif start is not None and timestamp < start:
+            continue
+          elif event_types and not event_type in event_types:
+            continue
+
+          msg = msg.replace("\\n", "\n").replace("\\\\", "\\")
+
+          if keywords and not keywords.issubset(_tokenize(msg)):
+            continue
+
+          yield (timestamp, event_type, msg)
+    finally:
+      events_file.close()
+
+  def _get_blocks_with(self, day_path, keywords):
+    """
+    Provides the blocks of a day that contain all of the given tokens, or
+    **None** if the token_index can't be read. Malformed lines (such as a
+    partial one that's being written, or was truncated by a crash) are skipped.
+    """
+
+    token_blocks = dict([(keyword, set()) for keyword in keywords])
+
+    try:
+      with open(os.path.join(day_path, TOKEN_INDEX_FILE), "rb") as token_index_file:
+        for line in token_index_file:
+          if not line.endswith("\n"):
+            continue
+
+          try:
+            token, block = line[:-1].split("\t", 1)
+            block = int(block)
+          except ValueError:
+            continue
+
+          if token in token_blocks:
+            token_blocks[token].add(block)
+    except IOError:
+      return None
+
+    return set.intersection(*token_blocks.values())
+
+
+def _tokenize(msg):
+  return TOKEN_PATTERN.findall(msg.lower())
+
+
+def _next_day(day_start):
+  """
+  Provides the start of the following day (which isn't always 86400 seconds
+  away due to daylight savings).
+  """
+
+  next_day = time.localtime(day_start + 90000)
+  return time.mktime((next_day.tm_year, next_day.tm_mon, next_day.tm_mday, 0, 0, 0, 0, 0, -1))
@@ -0,0 +1,300 @@
+"""
+Background reverse DNS resolution of the addresses we're connected to. Lookups
+are made by a small pool of threads so callers never block on DNS, and results
+are cached (including failures) so busy relays don't flood their resolver.
+
+::
+
+  get_resolver - provides the HostnameResolver arm uses
+  stop_resolver - halts our resolver, persisting its cache
+
+  HostnameResolver - pool of threads that perform reverse DNS lookups
+    |- resolve - provides an address' hostname, queuing a lookup if unknown
+    |- resolved_count - number of lookups that have finished
+    |- save - writes our cache to disk
+    +- stop - halts our threads and persists our cache
+
+Our cache is persisted as lines of the form
+'address<tab>hostname<tab>expiration', with an empty hostname for addresses
+that failed to resolve.
+"""
+
+import collections
+import os
+import Queue
+import socket
+import threading
+import time
+
+from stem.util import conf
+
+CONFIG = conf.config_dict('arm', {
+  'queries.hostnames.threads': 4,
+  'queries.hostnames.rate': 10,
+  'queries.hostnames.ttl': 86400,
+  'queries.hostnames.failure_ttl': 3600,
+  'queries.hostnames.cache_size': 50000,
+  'queries.hostnames.persist': True,
+})
+
+RESOLVER = None
+
+# maximum number of lookups we'll have queued, further requests are dropped
+# until there's room (callers ask again when they next need the hostname)
+
+MAX_QUEUED = 1000
+
+
+def get_resolver():
+  """
+  Singleton for resolving the hostnames of addresses.
+
+  :returns: :class:`~arm.util.hostnames.HostnameResolver` arm is using
+  """
+
+  global RESOLVER
+
+  if RESOLVER is None:
+    # imported here since the controller indirectly imports us
+
+    import arm.controller
+
+    controller, cache_path = arm.controller.get_controller(), None
+
+    if CONFIG['queries.hostnames.persist'] and controller:
+      try:
+        cache_path = os.path.join(controller.get_data_directory(), 'hostnames')
+      except OSError:
+        pass  # unable to make our data directory, so our cache isn't persisted
+
+    RESOLVER = HostnameResolver(
+      thread_count = CONFIG['queries.hostnames.threads'],
+      rate = CONFIG['queries.hostnames.rate'],
+      ttl = CONFIG['queries.hostnames.ttl'],
+      failure_ttl = CONFIG['queries.hostnames.failure_ttl'],
+      cache_size = CONFIG['queries.hostnames.cache_size'],
+      cache_path = cache_path,
+    )
+
+  return RESOLVER
+
+
+def stop_resolver():
+  """
+  Halts our resolver if we've made one, persisting its cache.
+  """
+
+  if RESOLVER is not None:
+    RESOLVER.stop()
+
+
+def reverse_lookup(address):
+  """
+  Resolves an address via the system's resolver. This is our default backend.
+
+  :param str address: IPv4 or IPv6 address to be resolved
+
+  :returns: **str** hostname of the address
+
+  :raises: **socket.error** if the lookup fails
+  """
+
+  return socket.gethostbyaddr(address)[0]
+
+
+class HostnameResolver(object):
+  """
+  Pool of threads performing reverse DNS lookups. Lookups are rate limited, and
+  both hostnames and failures are cached for a while.
+  """
+
+  def __init__(self, thread_count = 4, rate = 10, ttl = 86400, failure_ttl = 3600, cache_size = 50000, cache_path = None, backend = reverse_lookup):
+    """
+    Loads our cache and starts our threads.
+
+    :param int thread_count: number of lookups we can make at once
+    :param float rate: maximum number of lookups per second
+    :param int ttl: seconds we cache hostnames for
+    :param int failure_ttl: seconds we cache failed lookups for
+    :param int cache_size: maximum number of addresses we cache
+    :param str cache_path: file our cache is persisted to, not persisted if
+      **None**
+    :param functor backend: function that takes an address and provides its
+      hostname, raising an exception if unable
+    """
+
+    self._rate = rate
+    self._ttl = ttl
+    self._failure_ttl = failure_ttl
+    self._cache_size = cache_size
+    self._cache_path = cache_path
+    self._backend = backend
+
+    self._cache = collections.OrderedDict()  # address => (hostname, expiration), oldest first
+    self._pending = set()  # addresses that are queued or being resolved
+    self._queue = Queue.Queue(MAX_QUEUED)
+    self._lock = threading.RLock()
+    self._halt_condition = threading.Condition()
+    self._halt = False
+
+    self._next_lookup = 0  # earliest time our rate limit allows another lookup
+    self._resolved_count = 0
+
+    if cache_path:
+      self._load()
+
+    self._threads = []
+
+    for _ in range(thread_count):
+      thread = threading.Thread(target = self._run)
+      thread.setDaemon(True)
+      thread.start()
+      self._threads.append(thread)
+
+  def resolve(self, address, default = None):
+    """
+    Provides the hostname of an address. This never blocks - if the address
+    isn't cached then a lookup is queued and the default is returned. Expired
+    hostnames are still provided while they're looked up anew.
+
+    :param str address: address to provide the hostname of
+    :param object default: response if the hostname isn't known
+
+    :returns: **str** hostname of the address, the default if unknown
+    """
+
+    with self._lock:
+      hostname, expiration = self._cache.get(address, (None, None))
+
+      if (expiration is None or expiration < time.time()) and address not in self._pending and not self._halt:
+        try:
+          self._queue.put_nowait(address)
+          self._pending.add(address)
+        except Queue.Full:
+          pass
+
+    return hostname if hostname else default
+
+  def resolved_count(self):
+    """
+    Provides the number of lookups that have finished, successful or not. This
+    can be used by callers to determine if there's new results since they last
+    checked.
+
+    :returns: **int** for the number of finished lookups
+    """
+
+    return self._resolved_count
+
+  def save(self):
+    """
+    Writes our unexpired cache entries to disk if we have a cache path.
+
+    :raises: **IOError** or **OSError** if unable to write the cache
+    """
+
+    if not self._cache_path:
+      return
+
+    cache_dir = os.path.dirname(self._cache_path)
+
+    if cache_dir and not os.path.exists(cache_dir):
+      os.makedirs(cache_dir)
+
+    now = time.time()
+
+    with self._lock:
+      lines = ['%s\t%s\t%i\n' % (address, hostname or '', expiration) for (address, (hostname, expiration)) in self._cache.items() if expiration >= now]
+
+    # writes to a temporary file first so we never leave a partial cache
+
+    tmp_path = self._cache_path + '.tmp'
+
+    with open(tmp_path, 'w') as cache_file:
+      cache_file.writelines(lines)
+
+    os.rename(tmp_path, self._cache_path)
+
+  def stop(self):
+    """
+    Halts our threads and persists our cache. Lookups in progress are
+    abandoned.
+    """
+
+    with self._halt_condition:
+      self._halt = True
+      self._halt_condition.notifyAll()
+
+    for _ in self._threads:
+      try:
+        self._queue.put_nowait(None)  # wakes threads waiting for work
+      except Queue.Full:
+        break
+
+    try:
+      self.save()
+    except (IOError, OSError):
+      pass
+
+  def _run(self):
+    while not self._halt:
+      address = self._queue.get()
+
+      if address is None or not self._wait_for_rate_limit():
+        break
+
+      try:
+        hostname = self._backend(address)
+      except Exception:
+        hostname = None
+
+      with self._lock:
+        self._cache.pop(address, None)
+        self._cache[address] = (hostname, time.time() + (self._ttl if hostname else self._failure_ttl))
+        self._pending.discard(address)
+        self._resolved_count += 1
+
+        while len(self._cache) > self._cache_size:
+          self._cache.popitem(last = False)
+
+  def _wait_for_rate_limit(self):
+    """
+    Waits until our rate limit allows another lookup.
+
+    :returns: **False** if we were stopped while waiting, **True** otherwise
+    """
+
+    with self._lock:
+      now = time.time()
+      wait_until = max(now, self._next_lookup)
+      self._next_lookup = wait_until + 1.0 / self._rate
+
+    with self._halt_condition:
+      while not self._halt and time.time() < wait_until:
+        self._halt_condition.wait(wait_until - time.time())
+
+    return not self._halt
+
+  def _load(self):
+    """
+    Reads the unexpired entries of our persisted cache. A missing or malformed
+    cache is ignored.
+    """
+
+    if not os.path.exists(self._cache_path):
+      return
+
+    now = time.time()
+
+    try:
+      with open(self._cache_path) as cache_file:
+        for line in cache_file:
+          address, hostname, expiration = line.rstrip('\n').split('\t')
+
+          if float(expiration) >= now:
+            self._cache[address] = (hostname if hostname else None, float(expiration))
+    except (IOError, ValueError):
+      pass
+
+    while len(self._cache) > self._cache_size:
+      self._cache.popitem(last = False)
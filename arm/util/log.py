@@ -0,0 +1,737 @@
+"""
+Helpers for working with tor's log files.
+
+::
+
+  read_tor_log - provides the entries of a tor log file, newest first
+
+  TimestampParser - converts tor log timestamps to unix time
+    +- parse - provides the unix time of a timestamp
+
+  LogFileWriter - thread that appends lines to a log file
+    |- write - queues a line to be written
+    |- get_queued - number of lines waiting to be written
+    |- get_dropped - number of lines discarded due to a full queue
+    |- get_written - number of lines written so far
+    +- stop - writes anything that's queued and closes the file
+
+  LogFollower - thread that provides entries as they're appended to tor's log
+    +- stop - terminates the thread
+
+  EventRates - rates at which event types are being logged
+    |- record - notes that events occurred
+    |- get_types - event types we've seen
+    |- get_rates - rates over the last second, minute, and fifteen minutes
+    +- get_history - per-second counts for the last minute
+"""
+
+import calendar
+import collections
+import ctypes
+import ctypes.util
+import gzip
+import os
+import select
+import shutil
+import threading
+import time
+
+import stem.util.log
+
+# message tor logs when it starts, marking the beginning of that instance
+
+INSTANCE_MARKER = "opening log file"
+
+# number of bytes read at a time when walking backward through a log
+
+READ_BLOCK_SIZE = 65536
+
+# inotify flags for changes to a directory's files (see 'man inotify')
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+
+def read_tor_log(path, read_limit = None):
+  """
+  Provides the entries of a tor log file, ordered newest to oldest. The file
+  is read in blocks from its end, so this uses a constant amount of memory
+  regardless of the log's size and only parses as much as callers consume.
+
+  This stops upon reaching the message tor logs when it's started (providing
+  that entry, then ending), so results are limited to the current tor
+  instance.
+
+  :param str path: log file to be read
+  :param int read_limit: maximum number of lines to read, unlimited if
+    **None**
+
+  :returns: **generator** for **(timestamp, runlevel, message)** tuples
+
+  :raises: **IOError** if unable to read the file
+  """
+
+  lines_read = 0
+  timestamp_parser = TimestampParser()
+
+  with open(path) as log_file:
+    for line in _read_lines_reversed(log_file):
+      if read_limit is not None and lines_read >= read_limit:
+        break
+
+      lines_read += 1
+      entry = _parse_line(line, timestamp_parser)
+
+      if entry:
+        yield entry
+
+      if INSTANCE_MARKER in line:
+        break  # this entry marks the start of this tor instance
+
+
+def _parse_line(line, timestamp_parser):
+  """
+  Parses a line from tor's log.
+
+  :param str line: line to be parsed
+  :param TimestampParser timestamp_parser: parser for the line's timestamp
+
+  :returns: **(timestamp, runlevel, message)** tuple, or **None** if the line
+    isn't a log entry
+  """
+
+  # entries look like:
+  # Jul 15 18:29:48.806 [notice] Parsing GEOIP file.
+
+  line_comp = line.split()
+
+  # Checks that we have all the components we expect. This could happen if
+  # we're either not parsing a tor log or in weird edge cases (like being
+  # out of disk space)
+
+  if len(line_comp) < 4:
+    return None
+
+  runlevel = line_comp[3][1:-1].upper()
+
+  if not runlevel in stem.util.log.Runlevel:
+    return None
+
+  try:
+    timestamp = timestamp_parser.parse(" ".join(line_comp[:3]))
+  except ValueError:
+    return None
+
+  return (timestamp, runlevel, " ".join(line_comp[4:]))
+
+
+def _read_lines_reversed(log_file, block_size = READ_BLOCK_SIZE):
+  """
+  Provides the lines of a file from its end to the start, seeking backward
+  through it a block at a time.
+
+  :param file log_file: file to be read
+  :param int block_size: bytes to read at a time
+
+  :returns: **generator** for the file's lines, without their newlines
+  """
+
+  log_file.seek(0, os.SEEK_END)
+  position = log_file.tell()
+  remainder = ""  # start of a line that's split across blocks
+
+  while position > 0:
+    read_size = min(block_size, position)
+    position -= read_size
+
+    log_file.seek(position)
+    lines = (log_file.read(read_size) + remainder).split("\n")
+
+    # the first line might continue into the prior block, so hold onto it
+
+    remainder = lines.pop(0)
+
+    for line in reversed(lines):
+      if line:
+        yield line
+
+  if remainder:
+    yield remainder
+
+
+class TimestampParser(object):
+  """
+  Converts tor log timestamps (such as 'Jul 15 18:29:48.806') to unix time.
+  Calling strptime and mktime for every line is slow when reading large logs,
+  so this caches the local midnight of each day it encounters and adds the
+  time of day to it arithmetically.
+
+  Tor's logs lack a year so dates are assumed to be within the last year.
+  """
+
+  def __init__(self, now = None):
+    """
+    Creates a parser for timestamps logged prior to the given time.
+
+    :param float now: unix time to infer years relative to, the current time
+      if **None**
+    """
+
+    self._now = now if now is not None else time.time()
+    self._days = {}  # (month, day) => (year, month number, local midnight)
+
+  def parse(self, timestamp):
+    """
+    Provides the unix time for a tor log timestamp. Fractional seconds are
+    discarded.
+
+    :param str timestamp: timestamp to be parsed
+
+    :returns: **float** for the unix timestamp
+
+    :raises: **ValueError** if the timestamp is malformed
+    """
+
+    try:
+      month, day, clock = timestamp.split()
+      hour, minute, second = clock.split(":")
+      hour, minute, second = int(hour), int(minute), int(second.split(".")[0])
+    except ValueError:
+      raise ValueError("'%s' isn't a tor log timestamp" % timestamp)
+
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 62):
+      raise ValueError("'%s' isn't a tor log timestamp" % timestamp)
+
+    day_key = (month, day)
+
+    if not day_key in self._days:
+      self._days[day_key] = self._get_day(month, day)
+
+    year, month_num, midnight = self._days[day_key]
+
+    if midnight is None:
+      # daylight savings starts or ends this day, so it lacks a uniform length
+
+      return time.mktime((year, month_num, int(day), hour, minute, second, 0, 0, -1))
+
+    return midnight + hour * 3600 + minute * 60 + second
+
+  def _get_day(self, month, day):
+    """
+    Determines the year and local midnight for the given date. The midnight
+    is **None** if the day isn't twenty four hours long.
+
+    :returns: **tuple** of the form (year, month number, midnight)
+
+    :raises: **ValueError** if the date is malformed
+    """
+
+    # Pretend the year is 2012, since that's a leap year and strptime rejects
+    # Feb 29th otherwise.
+    #
+    # https://trac.torproject.org/projects/tor/ticket/5265
+
+    date = time.strptime("2012 %s %s" % (month, day), "%Y %b %d")
+    month_num, day_num = date.tm_mon, date.tm_mday
+    year = time.localtime(self._now).tm_year
+
+    # Logs aren't necessarily rotated, so if the date would be in the future
+    # then it's from a prior year.
+
+    if time.mktime((year, month_num, day_num, 0, 0, 0, 0, 0, -1)) > self._now:
+      year -= 1
+
+    if month_num == 2 and day_num == 29:
+      while not calendar.isleap(year):
+        year -= 1
+
+    midnight = time.mktime((year, month_num, day_num, 0, 0, 0, 0, 0, -1))
+    next_midnight = time.mktime((year, month_num, day_num + 1, 0, 0, 0, 0, 0, -1))
+
+    if next_midnight - midnight != 86400:
+      midnight = None
+
+    return (year, month_num, midnight)
+
+
+class LogFileWriter(threading.Thread):
+  """
+  Thread that appends lines to a log file. Writing and flushing for every line
+  ties callers to disk latency, so instead lines are queued and written in
+  batches, flushing at most once per flush_rate.
+
+  If the queue is full then further lines are dropped until the writer
+  catches up. Files that grow beyond max_size are rotated to 'path.1',
+  'path.2', etc (optionally gzipped), keeping up to backup_count of them.
+  """
+
+  def __init__(self, path, queue_size = 10000, flush_rate = 1.0, max_size = 0, backup_count = 5, compress = False):
+    """
+    Opens the log file to be appended to.
+
+    :param str path: location of the log file
+    :param int queue_size: maximum number of lines to hold before dropping
+      them
+    :param float flush_rate: seconds to batch lines before writing them
+    :param int max_size: size in bytes at which to rotate the file, never
+      rotating it if zero
+    :param int backup_count: number of rotated files to keep
+    :param bool compress: gzips rotated files if **True**
+
+    :raises: **IOError** if unable to open the file
+    """
+
+    super(LogFileWriter, self).__init__()
+    self.setDaemon(True)
+
+    self._path = path
+    self._queue_size = queue_size
+    self._flush_rate = flush_rate
+    self._max_size = max_size
+    self._backup_count = backup_count
+    self._compress = compress
+
+    self._log_file = open(path, "a")
+    self._queue = collections.deque()
+    self._queue_cond = threading.Condition()
+
+    self._dropped = 0
+    self._written = 0
+    self._halt = False  # terminates thread if true
+
+  def write(self, line):
+    """
+    Queues a line to be written.
+
+    :param str line: content to be appended to the file, without a newline
+
+    :returns: **bool** that's **False** if the line was dropped
+    """
+
+    with self._queue_cond:
+      if self._halt or len(self._queue) >= self._queue_size:
+        self._dropped += 1
+        return False
+
+      self._queue.append(line)
+
+      # wake early if we're at risk of filling up
+
+      if len(self._queue) >= max(1, self._queue_size / 2):
+        self._queue_cond.notifyAll()
+
+    return True
+
+  def get_queued(self):
+    """
+    Provides the number of lines waiting to be written.
+
+    :returns: **int** for the size of our queue
+    """
+
+    return len(self._queue)
+
+  def get_dropped(self):
+    """
+    Provides the number of lines we discarded, either due to our queue being
+    full or being unable to write to the file.
+
+    :returns: **int** for the number of lines dropped
+    """
+
+    return self._dropped
+
+  def get_written(self):
+    """
+    Provides the number of lines we've written.
+
+    :returns: **int** for the number of lines written
+    """
+
+    return self._written
+
+  def run(self):
+    while True:
+      # gathers lines for a flush_rate unless we're halting or filling up
+
+      with self._queue_cond:
+        if not self._halt and len(self._queue) < max(1, self._queue_size / 2):
+          self._queue_cond.wait(self._flush_rate)
+
+        batch = list(self._queue)
+        self._queue.clear()
+        is_halted = self._halt
+
+      if batch and self._log_file:
+        try:
+          self._log_file.write("\n".join(batch) + "\n")
+          self._log_file.flush()
+          self._written += len(batch)
+
+          if self._max_size and self._log_file.tell() >= self._max_size:
+            self._rotate()
+        except (IOError, OSError) as exc:
+          stem.util.log.error("Unable to write to log file: %s" % exc.strerror)
+          self._close()
+      elif batch:
+        self._dropped += len(batch)
+
+      if is_halted:
+        break
+
+    self._close()
+
+  def stop(self):
+    """
+    Writes anything that's queued, closes our file, and terminates the thread.
+    """
+
+    with self._queue_cond:
+      self._halt = True
+      self._queue_cond.notifyAll()
+
+  def _rotate(self):
+    """
+    Moves our log file to 'path.1' (shifting prior backups along), and opens a
+    new file in its place.
+    """
+
+    self._log_file.close()
+    suffix = ".gz" if self._compress else ""
+
+    def backup_path(index):
+      return "%s.%i%s" % (self._path, index, suffix)
+
+    if self._backup_count > 0:
+      if os.path.exists(backup_path(self._backup_count)):
+        os.remove(backup_path(self._backup_count))
+
+      for i in range(self._backup_count - 1, 0, -1):
+        if os.path.exists(backup_path(i)):
+          os.rename(backup_path(i), backup_path(i + 1))
+
+      if self._compress:
+        with open(self._path, "rb") as original_file:
+          with gzip.open(backup_path(1), "wb") as compressed_file:
+            shutil.copyfileobj(original_file, compressed_file)
+
+        os.remove(self._path)
+      else:
+        os.rename(self._path, backup_path(1))
+    else:
+      os.remove(self._path)
+
+    self._log_file = open(self._path, "a")
+
+  def _close(self):
+    if self._log_file:
+      self._log_file.close()
+      self._log_file = None
+
+
+class LogFollower(threading.Thread):
+  """
+  Thread that reads entries as they're appended to tor's log file, providing
+  them to a callback. On Linux we're notified of changes via inotify, and
+  otherwise we check the file every poll_rate.
+
+  This only reads what's been appended, and starts from the beginning of new
+  files if the log is rotated or truncated.
+  """
+
+  def __init__(self, path, callback, poll_rate = 1.0, from_start = False):
+    """
+    Prepares to follow a log file. It's fine if the file doesn't exist yet.
+
+    :param str path: log file to be followed
+    :param functor callback: called with the **(timestamp, runlevel,
+      message)** of new entries
+    :param float poll_rate: maximum seconds between checking the file
+    :param bool from_start: provides the entries already in the file if
+      **True**, otherwise only entries appended after this is made
+    """
+
+    super(LogFollower, self).__init__()
+    self.setDaemon(True)
+
+    self._path = path
+    self._callback = callback
+    self._poll_rate = poll_rate
+
+    self._log_file = None
+    self._inode = None
+    self._remainder = ""  # partial line at the end of what we've read
+
+    self._halt = False  # terminates thread if true
+    self._cond = threading.Condition()  # used for pausing the thread
+
+    # Opens the file now so we don't miss what's appended before our thread
+    # starts. This is a no-op if the file doesn't exist.
+
+    self._open(from_start)
+
+  def run(self):
+    inotify_fd = _inotify_watch(os.path.dirname(os.path.abspath(self._path)))
+
+    try:
+      while not self._halt:
+        self._check()
+
+        # The notifications just tell us that something changed so we only
+        # need to drain them. The poll_rate timeout still applies in case we
+        # miss anything or are told to stop.
+
+        if inotify_fd is not None:
+          if select.select([inotify_fd], [], [], self._poll_rate)[0]:
+            os.read(inotify_fd, 65536)
+        else:
+          with self._cond:
+            if not self._halt:
+              self._cond.wait(self._poll_rate)
+    finally:
+      if inotify_fd is not None:
+        os.close(inotify_fd)
+
+      if self._log_file:
+        self._log_file.close()
+        self._log_file = None
+
+  def stop(self):
+    """
+    Halts further reading and terminates the thread.
+    """
+
+    with self._cond:
+      self._halt = True
+      self._cond.notifyAll()
+
+  def _open(self, from_start):
+    try:
+      # unbuffered, otherwise seeking might give us stale content after the
+      # file's truncated
+
+      self._log_file = open(self._path, "rb", 0)
+      self._inode = os.fstat(self._log_file.fileno()).st_ino
+      self._remainder = ""
+
+      if not from_start:
+        self._log_file.seek(0, os.SEEK_END)
+    except (IOError, OSError):
+      self._log_file, self._inode = None, None
+
+  def _check(self):
+    """
+    Reads anything that's been appended to the log, reopening it if it's been
+    rotated or truncated.
+    """
+
+    try:
+      file_stat = os.stat(self._path)
+    except OSError:
+      file_stat = None  # log doesn't exist (possibly it's being rotated)
+
+    timestamp_parser = TimestampParser()
+
+    if self._log_file:
+      if file_stat is None or file_stat.st_ino != self._inode:
+        # file was replaced, so finish off what's left of the old one
+
+        self._read(timestamp_parser)
+        self._log_file.close()
+        self._log_file = None
+      elif file_stat.st_size < self._log_file.tell():
+        self._log_file.seek(0)  # truncated
+        self._remainder = ""
+
+    if not self._log_file and file_stat is not None:
+      self._open(True)
+
+    if self._log_file:
+      self._read(timestamp_parser)
+
+  def _read(self, timestamp_parser):
+    try:
+      # seeking clears the file's EOF flag, otherwise further reads may not
+      # provide what's been appended
+
+      self._log_file.seek(0, os.SEEK_CUR)
+      content = self._log_file.read()
+    except IOError:
+      return
+
+    if not content:
+      return
+
+    lines = (self._remainder + content).split("\n")
+    self._remainder = lines.pop()  # incomplete line, or an empty string
+
+    for line in lines:
+      entry = _parse_line(line, timestamp_parser)
+
+      if entry:
+        self._callback(*entry)
+
+
+def _inotify_watch(directory):
+  """
+  Provides an inotify file descriptor that's notified of changes to the files
+  in a directory.
+
+  :param str directory: directory to watch
+
+  :returns: **int** for the file descriptor, or **None** if inotify is
+    unavailable
+  """
+
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+    inotify_fd = libc.inotify_init()
+
+    if inotify_fd < 0:
+      return None
+
+    flags = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    if libc.inotify_add_watch(inotify_fd, directory, flags) < 0:
+      os.close(inotify_fd)
+      return None
+
+    return inotify_fd
+  except (OSError, AttributeError):
+    return None  # not linux, or an old kernel
+
+
+class EventRates(object):
+  """
+  Tracks how frequently each type of event is logged over the last second,
+  minute, and fifteen minutes. Counts are kept in fixed size rings of
+  per-second and per-minute buckets, so this takes constant memory and time
+  per event type regardless of how many events we see.
+  """
+
+  def __init__(self):
+    self._counters = {}  # event type => _RateCounter
+    self._lock = threading.Lock()
+
+  def record(self, event_type, count = 1, now = None):
+    """
+    Notes that events have occurred.
+
+    :param str event_type: type of event that occurred
+    :param int count: number of events
+    :param float now: time the events occurred, the current time if **None**
+    """
+
+    now = int(now if now is not None else time.time())
+
+    with self._lock:
+      if not event_type in self._counters:
+        self._counters[event_type] = _RateCounter(now)
+
+      self._counters[event_type].record(now, count)
+
+  def get_types(self):
+    """
+    Provides the event types we've seen.
+
+    :returns: **list** of event types
+    """
+
+    with self._lock:
+      return list(self._counters.keys())
+
+  def get_rates(self, event_type, now = None):
+    """
+    Provides the rate of events per second over the last second, minute, and
+    fifteen minutes. The last second is the most recent one that's complete.
+
+    :param str event_type: type of event to provide the rate of
+    :param float now: time to provide the rates for, the current time if
+      **None**
+
+    :returns: **tuple** of three floats for the rates
+    """
+
+    now = int(now if now is not None else time.time())
+
+    with self._lock:
+      if not event_type in self._counters:
+        return (0.0, 0.0, 0.0)
+
+      return self._counters[event_type].get_rates(now)
+
+  def get_history(self, event_type, now = None):
+    """
+    Provides the number of events we've seen each second over the last minute,
+    oldest first.
+
+    :param str event_type: type of event to provide the history of
+    :param float now: time to provide the history for, the current time if
+      **None**
+
+    :returns: **list** with sixty event counts
+    """
+
+    now = int(now if now is not None else time.time())
+
+    with self._lock:
+      if not event_type in self._counters:
+        return [0] * 60
+
+      return self._counters[event_type].get_history(now)
+
+
+class _RateCounter(object):
+  """
+  Rings of per-second and per-minute event counts for a single event type.
+  Each has a slot beyond the minute (or fifteen minutes) we provide rates for,
+  since the one in progress is incomplete.
+  """
+
+  def __init__(self, now):
+    self._seconds = [0] * 61
+    self._minutes = [0] * 16
+    self._last_second = now
+    self._last_minute = now / 60
+
+  def record(self, now, count):
+    self._advance(now)
+    self._seconds[now % 61] += count
+    self._minutes[(now / 60) % 16] += count
+
+  def get_rates(self, now):
+    self._advance(now)
+
+    # the current second and minute are incomplete, so they're excluded
+
+    last_second = self._seconds[(now - 1) % 61]
+    last_minute = sum(self._seconds) - self._seconds[now % 61]
+    last_fifteen_minutes = sum(self._minutes) - self._minutes[(now / 60) % 16]
+
+    return (float(last_second), last_minute / 60.0, last_fifteen_minutes / 900.0)
+
+  def get_history(self, now):
+    self._advance(now)
+    return [self._seconds[(now + i) % 61] for i in range(2, 62)]
+
+  def _advance(self, now):
+    """
+    Clears the buckets we've moved past since we were last updated.
+    """
+
+    if now > self._last_second:
+      for second in range(max(self._last_second + 1, now - 60), now + 1):
+        self._seconds[second % 61] = 0
+
+      self._last_second = now
+
+    minute = now / 60
+
+    if minute > self._last_minute:
+      for past_minute in range(max(self._last_minute + 1, minute - 15), minute + 1):
+        self._minutes[past_minute % 16] = 0
+
+      self._last_minute = minute
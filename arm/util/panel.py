@@ -76,8 +76,9 @@ class Panel():
     self.title_visible = True
 
     # Attributes for pausing. The pause_attr contains variables our get_attr
-    # method is tracking, and the pause buffer has copies of the values from
-    # when we were last unpaused (unused unless we're paused).
+    # method is tracking, and the pause buffer has the values from when we
+    # were last unpaused (unused unless we're paused). These are shared with
+    # the panel until it calls unshare_attr to modify them in place.
 
     self.paused = False
     self.pause_attr = []
@@ -173,7 +174,7 @@ class Panel():
     """
 
     self.pause_attr.append(attr)
-    self.pause_buffer[attr] = self.copy_attr(attr)
+    self.pause_buffer[attr] = self.snapshot_attr(attr) if self.paused else None
 
   def get_attr(self, attr):
     """
@@ -192,10 +193,22 @@ class Panel():
     else:
       return self.__dict__.get(attr)
 
+  def snapshot_attr(self, attr):
+    """
+    Provides the value of an attribute to be kept in the pause buffer. By
+    default this is the attribute itself, shared with the panel until
+    unshare_attr is called, so pausing doesn't copy anything.
+
+    Arguments:
+      attr - parameter to be provided back
+    """
+
+    return self.__dict__.get(attr)
+
   def copy_attr(self, attr):
     """
-    Provides a duplicate of the given configuration value, suitable for the
-    pause buffer.
+    Provides a duplicate of the given configuration value, used when the panel
+    needs to modify a value the pause buffer shares.
 
     Arguments:
       attr - parameter to be provided back
@@ -204,6 +217,20 @@ class Panel():
     current_value = self.__dict__.get(attr)
     return copy.copy(current_value)
 
+  def unshare_attr(self, attr):
+    """
+    Called before modifying a tracked attribute in place (for instance,
+    appending to a list). If the pause buffer shares this value then the
+    panel's attribute is replaced with a copy so the snapshot's left intact.
+    Simply assigning a new value doesn't require this.
+
+    Arguments:
+      attr - parameter that's about to be modified
+    """
+
+    if self.paused and self.pause_buffer.get(attr) is self.__dict__.get(attr):
+      self.__dict__[attr] = self.copy_attr(attr)
+
   def set_paused(self, is_pause, suppress_redraw = False):
     """
     Toggles if the panel is paused or not. This causes the panel to be redrawn
@@ -225,11 +252,11 @@ class Panel():
 
       self.paused = is_pause
 
-      if is_pause:
-        # copies tracked attributes so we know what they were before pausing
+      # snapshots tracked attributes so we know what they were before pausing,
+      # and drops them when unpaused so they can be freed
 
-        for attr in self.pause_attr:
-          self.pause_buffer[attr] = self.copy_attr(attr)
+      for attr in self.pause_attr:
+        self.pause_buffer[attr] = self.snapshot_attr(attr) if is_pause else None
 
       if not suppress_redraw:
         self.redraw(True)
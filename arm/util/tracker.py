@@ -33,6 +33,7 @@ Background tasks for gathering information about the tor process.
   :var int memory_bytes: memory usage of the process in bytes
   :var float memory_percent: percentage of our memory used by this process
   :var float timestamp: unix timestamp for when this information was fetched
+  :var float start_time: unix timestamp for when the process started
 """
 
 import collections
@@ -61,6 +62,7 @@ Resources = collections.namedtuple('Resources', [
   'memory_bytes',
   'memory_percent',
   'timestamp',
+  'start_time',
 ])
 
 
@@ -542,7 +544,7 @@ class ResourceTracker(Daemon):
     """
 
     result = self._resources
-    return result if result else Resources(0.0, 0.0, 0.0, 0, 0.0, 0.0)
+    return result if result else Resources(0.0, 0.0, 0.0, 0, 0.0, 0.0, 0.0)
 
   def _task(self, process_pid, process_name):
     try:
@@ -554,13 +556,16 @@ class ResourceTracker(Daemon):
       else:
         cpu_sample = 0.0  # we need a prior datapoint to give a sampling
 
+      now = time.time()
+
       self._resources = Resources(
         cpu_sample = cpu_sample,
         cpu_average = total_cpu_time / uptime,
         cpu_total = total_cpu_time,
         memory_bytes = memory_in_bytes,
         memory_percent = memory_in_percent,
-        timestamp = time.time(),
+        timestamp = now,
+        start_time = now - uptime,
       )
 
       self._failure_count = 0
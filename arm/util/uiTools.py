@@ -35,6 +35,9 @@ COLOR_ATTR = dict([(color, 0) for color in COLOR_LIST])
 Ending = enum.Enum("ELLIPSE", "HYPHEN")
 SCROLL_KEYS = (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_PPAGE, curses.KEY_NPAGE, curses.KEY_HOME, curses.KEY_END)
 
+# characters for sparklines, from the lowest value to highest
+SPARKLINE_CHARS = " .:-=+*#%@"
+
 
 def conf_handler(key, value):
   if key == "features.color_override" and value != "none":
@@ -333,6 +336,42 @@ def pad_str(msg, size, crop_extra = False):
   return ("%%-%is" % size) % msg
 
 
+def get_sparkline(values, width = None):
+  """
+  Provides an ascii sparkline for a series of values, scaled so the largest is
+  drawn with the tallest character. For instance...
+    get_sparkline([0, 1, 2, 9]) => " .:@"
+
+  Arguments:
+    values - numbers to be charted
+    width  - maximum number of characters, using the most recent values if
+             there's more than this
+  """
+
+  if width is not None:
+    values = values[-width:] if width > 0 else []
+
+  max_value = max(values) if values else 0
+
+  if max_value <= 0:
+    return SPARKLINE_CHARS[0] * len(values)
+
+  levels = len(SPARKLINE_CHARS) - 1
+  sparkline = []
+
+  for value in values:
+    # anything non-zero should be visible
+
+    level = int(round(float(max(0, value)) * levels / max_value))
+
+    if value > 0:
+      level = max(1, level)
+
+    sparkline.append(SPARKLINE_CHARS[level])
+
+  return "".join(sparkline)
+
+
 def draw_box(panel, top, left, width, height, attr=curses.A_NORMAL):
   """
   Draws a box in the panel with the given bounds.
@@ -434,6 +473,8 @@ class Scroller:
   """
   Tracks the scrolling position when there might be a visible cursor. This
   expects that there is a single line displayed per an entry in the contents.
+  Contents can be any sequence supporting len(), indexing, membership checks,
+  and index(), so large listings can provide them lazily.
   """
 
   def __init__(self, is_cursor_enabled):
@@ -531,6 +572,127 @@ class Scroller:
       return False
 
 
+class HeightIndex:
+  """
+  Heights of a series of displayed items, kept in a Fenwick tree so we can
+  find the item at a given line and the total content height in logarithmic
+  time rather than walking everything before it.
+  """
+
+  def __init__(self, heights = ()):
+    self._heights = list(heights)
+    self._tree = [0] + self._heights
+
+    # builds the tree in linear time by pushing each node's sum to its parent
+
+    for i in range(1, len(self._tree)):
+      parent = i + (i & -i)
+
+      if parent < len(self._tree):
+        self._tree[parent] += self._tree[i]
+
+  def __len__(self):
+    return len(self._heights)
+
+  def get_height(self, index):
+    """
+    Provides the height of the given item.
+
+    Arguments:
+      index - item to provide the height of
+    """
+
+    return self._heights[index]
+
+  def set_height(self, index, height):
+    """
+    Changes the height of an item.
+
+    Arguments:
+      index  - item to be revised
+      height - new height of the item
+    """
+
+    delta = height - self._heights[index]
+    self._heights[index] = height
+    i = index + 1
+
+    while i < len(self._tree):
+      self._tree[i] += delta
+      i += i & -i
+
+  def append(self, height):
+    """
+    Adds an item to the end of our index.
+
+    Arguments:
+      height - height of the new item
+    """
+
+    # a node covers the items between it and the prior node with a lower bit
+
+    i = len(self._tree)
+    self._heights.append(height)
+    self._tree.append(height + self.get_offset(i - 1) - self.get_offset(i - (i & -i)))
+
+  def pop(self):
+    """
+    Removes the last item from our index, providing its height. No other node
+    includes the last item, so this is just a matter of dropping it.
+    """
+
+    self._tree.pop()
+    return self._heights.pop()
+
+  def get_offset(self, index):
+    """
+    Provides the line an item starts on (ie, the combined height of the items
+    that precede it).
+
+    Arguments:
+      index - item to provide the offset of
+    """
+
+    offset, i = 0, index
+
+    while i > 0:
+      offset += self._tree[i]
+      i -= i & -i
+
+    return offset
+
+  def get_total(self):
+    """
+    Provides the combined height of all items.
+    """
+
+    return self.get_offset(len(self._heights))
+
+  def find(self, line):
+    """
+    Provides a tuple of the form (index, line_offset) for the item that
+    occupies the given line and how far into that item the line is. If the
+    line is past our content then the index is the number of items.
+
+    Arguments:
+      line - line to look up
+    """
+
+    index, step = 0, 1
+
+    while step * 2 < len(self._tree):
+      step *= 2
+
+    while step:
+      if index + step < len(self._tree) and self._tree[index + step] <= line:
+        index += step
+        line -= self._tree[index]
+
+      step /= 2
+
+    return (index, line)
+
+
 def is_wide_characters_supported():
   """
   Checks if our version of curses has wide character support. This is required
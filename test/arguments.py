@@ -28,6 +28,9 @@ class TestArgumentParsing(unittest.TestCase):
     args = parse(['--debug', '/tmp/dump'])
     self.assertEqual('/tmp/dump', args.debug_path)
 
+    args = parse(['--export', '/tmp/history.json'])
+    self.assertEqual('/tmp/history.json', args.export_path)
+
     args = parse(['--log', 'D1'])
     self.assertEqual('D1', args.logged_events)
 
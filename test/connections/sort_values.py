@@ -0,0 +1,92 @@
+import unittest
+
+from mock import Mock, patch
+
+from arm.connections.connEntry import Category, ConnectionEntry
+from arm.connections.entries import HOSTNAME_SORT_KEYS, RELAY_SORT_ATTR, ConnectionPanelEntry, ListingType, SortAttr
+
+
+class Entry(ConnectionPanelEntry):
+  def __init__(self):
+    ConnectionPanelEntry.__init__(self)
+    self.lookups = []
+
+  def get_sort_value(self, attr, listing_type):
+    self.lookups.append(attr)
+    return '%s %s' % (attr, listing_type)
+
+
+class TestSortValues(unittest.TestCase):
+  def test_values_are_cached(self):
+    entry = Entry()
+    sort_attrs = [SortAttr.CATEGORY, SortAttr.FINGERPRINT]
+
+    for _ in range(3):
+      values = entry.get_sort_values(sort_attrs, ListingType.IP_ADDRESS)
+
+    self.assertEqual(['Category IP Address', 'Fingerprint IP Address'], values)
+    self.assertEqual(sort_attrs, entry.lookups)
+
+  def test_listing_depends_on_listing_type(self):
+    entry = Entry()
+
+    self.assertEqual(['Listing IP Address'], entry.get_sort_values([SortAttr.LISTING], ListingType.IP_ADDRESS))
+    self.assertEqual(['Listing Nickname'], entry.get_sort_values([SortAttr.LISTING], ListingType.NICKNAME))
+    self.assertEqual(['Listing IP Address'], entry.get_sort_values([SortAttr.LISTING], ListingType.IP_ADDRESS))
+    self.assertEqual([SortAttr.LISTING, SortAttr.LISTING], entry.lookups)
+
+  def test_invalidate_sort_values(self):
+    entry = Entry()
+    sort_attrs = [SortAttr.CATEGORY, SortAttr.NICKNAME, SortAttr.LISTING]
+
+    entry.get_sort_values(sort_attrs, ListingType.IP_ADDRESS)
+    entry.lookups = []
+
+    entry.invalidate_sort_values(RELAY_SORT_ATTR)
+    entry.get_sort_values(sort_attrs, ListingType.IP_ADDRESS)
+    self.assertEqual([SortAttr.NICKNAME, SortAttr.LISTING], entry.lookups)
+    entry.lookups = []
+
+    entry.invalidate_sort_values()
+    entry.get_sort_values(sort_attrs, ListingType.IP_ADDRESS)
+    self.assertEqual(sort_attrs, entry.lookups)
+
+  def test_invalidate_hostname_sort_values(self):
+    entry = Entry()
+    sort_attrs = [SortAttr.HOSTNAME, SortAttr.LISTING]
+
+    entry.get_sort_values(sort_attrs, ListingType.NICKNAME)
+    entry.get_sort_values(sort_attrs, ListingType.HOSTNAME)
+    entry.lookups = []
+
+    # only listings by hostname depend on our lookups
+
+    entry.invalidate_sort_values(HOSTNAME_SORT_KEYS)
+    entry.get_sort_values(sort_attrs, ListingType.NICKNAME)
+    self.assertEqual([SortAttr.HOSTNAME], entry.lookups)
+
+    entry.get_sort_values(sort_attrs, ListingType.HOSTNAME)
+    self.assertEqual([SortAttr.HOSTNAME, SortAttr.LISTING], entry.lookups)
+
+  @patch('arm.util.torTools.get_conn')
+  def test_connection_sort_values(self, get_conn_mock):
+    get_conn_mock().get_option.side_effect = lambda option, default: default
+    get_conn_mock().get_hidden_service_ports.return_value = []
+
+    entry = ConnectionEntry('127.0.0.1', '3531', '74.125.28.106', '80')
+    line = entry.lines[0]
+    line.get_type = Mock(return_value = Category.OUTBOUND)
+    line.is_private = Mock(return_value = False)
+
+    entry.check_sort_values()
+    self.assertEqual([Category.index_of(Category.OUTBOUND)], entry.get_sort_values([SortAttr.CATEGORY], ListingType.IP_ADDRESS))
+    lookup_count = line.get_type.call_count + line.is_private.call_count
+
+    # sorting only uses our cached values, they're revised when checked
+
+    line.get_type.return_value = Category.EXIT
+    self.assertEqual([Category.index_of(Category.OUTBOUND)], entry.get_sort_values([SortAttr.CATEGORY], ListingType.IP_ADDRESS))
+    self.assertEqual(lookup_count, line.get_type.call_count + line.is_private.call_count)
+
+    entry.check_sort_values()
+    self.assertEqual([Category.index_of(Category.EXIT)], entry.get_sort_values([SortAttr.CATEGORY], ListingType.IP_ADDRESS))
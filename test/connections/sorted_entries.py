@@ -0,0 +1,145 @@
+import random
+import unittest
+
+from arm.connections.entries import EntryLines, SortedEntries
+
+
+class Entry:
+  def __init__(self, value):
+    self.value = value
+
+  def __repr__(self):
+    return 'Entry(%s)' % self.value
+
+
+def by_value(entry):
+  return [entry.value]
+
+
+class TestSortedEntries(unittest.TestCase):
+  def test_add_and_remove(self):
+    listing = SortedEntries(by_value)
+    entries = [Entry(value) for value in (5, 1, 3, 3, 9)]
+
+    for entry in entries:
+      listing.add(entry)
+
+    self.assertEqual([1, 3, 3, 5, 9], [entry.value for entry in listing])
+    self.assertEqual(5, len(listing))
+
+    # entries with the same values are in the order they were added
+
+    self.assertTrue(listing[1] is entries[2])
+    self.assertTrue(listing[2] is entries[3])
+    self.assertEqual(2, listing.index(entries[3]))
+
+    listing.remove(entries[2])
+    listing.remove(entries[4])
+
+    self.assertEqual([1, 3, 5], [entry.value for entry in listing])
+    self.assertFalse(entries[2] in listing)
+    self.assertTrue(entries[3] in listing)
+    self.assertRaises(ValueError, listing.index, entries[2])
+
+  def test_update(self):
+    listing = SortedEntries(by_value)
+    entries = [Entry(value) for value in range(10)]
+
+    for entry in entries:
+      listing.add(entry)
+
+    self.assertEqual(0, listing.update())
+
+    # removing an entry relies on the sort key it had, not its current values
+
+    entries[2].value = 20
+    entries[7].value = -1
+    self.assertEqual(2, listing.update())
+    self.assertEqual([-1, 0, 1, 3, 4, 5, 6, 8, 9, 20], [entry.value for entry in listing])
+
+    listing.remove(entries[2])
+    self.assertEqual([-1, 0, 1, 3, 4, 5, 6, 8, 9], [entry.value for entry in listing])
+
+  def test_update_matches_sorting(self):
+    listing = SortedEntries(by_value)
+    entries = [Entry(random.randint(0, 50)) for _ in range(200)]
+
+    for entry in entries:
+      listing.add(entry)
+
+    for changes in (5, 150):
+      for entry in random.sample(entries, changes):
+        entry.value = random.randint(0, 50)
+
+      listing.update()
+      self.assertEqual(sorted(entry.value for entry in entries), [entry.value for entry in listing])
+
+  def test_set_key_function(self):
+    listing = SortedEntries(by_value)
+
+    for value in (2, 7, 4):
+      listing.add(Entry(value))
+
+    listing.set_key_function(lambda entry: [-entry.value])
+    self.assertEqual([7, 4, 2], [entry.value for entry in listing])
+
+    listing.add(Entry(5))
+    self.assertEqual([7, 5, 4, 2], [entry.value for entry in listing])
+
+
+class MultilineEntry(Entry):
+  def __init__(self, value, line_count):
+    Entry.__init__(self, value)
+    self.lines = ['%s-%i' % (value, i) for i in range(line_count)]
+
+  def getLines(self):
+    return self.lines
+
+
+class TestEntryLines(unittest.TestCase):
+  def setUp(self):
+    self.listing = SortedEntries(by_value)
+    self.lines = EntryLines(self.listing)
+
+    for value, line_count in ((3, 1), (1, 2), (2, 3)):
+      self.listing.add(MultilineEntry(value, line_count))
+
+  def test_lines(self):
+    expected = ['1-0', '1-1', '2-0', '2-1', '2-2', '3-0']
+
+    self.assertEqual(6, len(self.lines))
+    self.assertEqual(expected, list(self.lines))
+    self.assertEqual(expected, [self.lines[i] for i in range(6)])
+    self.assertEqual('3-0', self.lines[-1])
+    self.assertEqual(expected[1:4], self.lines[1:4])
+    self.assertRaises(IndexError, self.lines.__getitem__, 6)
+
+    for i, line in enumerate(expected):
+      self.assertEqual(i, self.lines.index(line))
+      self.assertTrue(line in self.lines)
+
+    self.assertFalse('4-0' in self.lines)
+    self.assertRaises(ValueError, self.lines.index, '4-0')
+
+  def test_get_window(self):
+    self.assertEqual(['1-1', '2-0', '2-1'], self.lines.get_window(1, 3))
+    self.assertEqual(['2-2', '3-0'], self.lines.get_window(4, 10))
+    self.assertEqual([], self.lines.get_window(6, 3))
+
+  def test_follows_listing_changes(self):
+    self.assertEqual(6, len(self.lines))
+
+    entry = MultilineEntry(0, 2)
+    self.listing.add(entry)
+
+    self.assertEqual(8, len(self.lines))
+    self.assertEqual('0-1', self.lines[1])
+    self.assertEqual(3, self.lines.index('1-1'))
+
+    # lines changing in place are picked up when the listing is updated
+
+    entry.lines = ['0-0']
+    self.listing.update()
+
+    self.assertEqual(7, len(self.lines))
+    self.assertEqual('1-0', self.lines[1])
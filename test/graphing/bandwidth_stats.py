@@ -0,0 +1,199 @@
+import calendar
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+import arm.controller  # imported first since graphPanel is part of a circular import
+
+from arm.graphing.bandwidthStats import AccountingForecast, BandwidthStats, StateHistoryStats, consolidate, get_accounting_time_label, get_state_entries, get_state_history, read_state_history
+
+STATE_FILE = """\
+# Tor state file last generated on 2014-07-20 15:05:12 local time
+# Other times below are in UTC
+# You *do not* need to edit this file.
+
+EntryGuard Unnamed 0123456789ABCDEF0123456789ABCDEF01234567 DirCache
+BWHistoryReadEnds 2014-07-20 15:00:00
+BWHistoryReadInterval 900
+BWHistoryReadValues 921600,1843200,2764800,100
+BWHistoryWriteEnds 2014-07-20 15:00:00
+BWHistoryWriteInterval 900
+BWHistoryWriteValues 460800,460800,460800,100
+BWHistoryDirReadEnds 2014-07-20 15:00:00
+BWHistoryDirReadInterval 900
+BWHistoryDirReadValues abc,def
+LastWritten 2014-07-20 15:05:12
+"""
+
+IPV6_HISTORY = """\
+BWHistoryIPv6ReadEnds 2014-07-20 15:00:00
+BWHistoryIPv6ReadInterval 900
+BWHistoryIPv6ReadValues 92160,92160,184320,100
+BWHistoryIPv6WriteEnds 2014-07-20 15:00:00
+BWHistoryIPv6WriteInterval 900
+BWHistoryIPv6WriteValues 46080,46080,46080,100
+"""
+
+ENDS = calendar.timegm((2014, 7, 20, 15, 0, 0))
+
+
+class TestStateHistory(unittest.TestCase):
+  def test_read_state_history(self):
+    state = read_state_history(STATE_FILE.splitlines())
+
+    self.assertEqual('900', state['BWHistoryReadInterval'])
+    self.assertEqual('921600,1843200,2764800,100', state['BWHistoryReadValues'])
+    self.assertFalse('LastWritten' in state)
+    self.assertFalse('EntryGuard' in state)
+
+  def test_get_state_history(self):
+    state = read_state_history(STATE_FILE.splitlines())
+
+    self.assertEqual((900, ENDS - 900, [1.0, 2.0, 3.0]), get_state_history(state, 'BWHistoryRead', ENDS - 1))
+    self.assertEqual((900, ENDS - 900, [0.5, 0.5, 0.5]), get_state_history(state, 'BWHistoryWrite', ENDS - 900))
+
+  def test_get_state_history_pads_missing_values(self):
+    state = read_state_history(STATE_FILE.splitlines())
+    self.assertEqual([1.0, 2.0, 3.0, 3.0, 3.0], get_state_history(state, 'BWHistoryRead', ENDS + 900)[2])
+
+  def test_get_state_history_when_unavailable(self):
+    state = read_state_history(STATE_FILE.splitlines())
+
+    self.assertEqual(None, get_state_history(state, 'BWHistoryDirRead', ENDS))
+    self.assertEqual(None, get_state_history(state, 'BWHistoryIPv6Read', ENDS))
+
+  def test_get_state_entries(self):
+    state = read_state_history(STATE_FILE.splitlines())
+
+    self.assertEqual((900, ENDS - 900, [2.0, 3.0], [0.5, 0.5]), get_state_entries(state, 'BWHistory', ENDS - 1, ENDS - 1900))
+    self.assertEqual((900, ENDS - 900, [], []), get_state_entries(state, 'BWHistory', ENDS - 1, ENDS - 100))
+    self.assertEqual(None, get_state_entries(state, 'BWHistoryDir', ENDS - 1, ENDS - 1900))
+
+  def test_consolidate(self):
+    self.assertEqual([1, 2, 3], consolidate([1, 2, 3], 1))
+    self.assertEqual([2.5, 4.5], consolidate([1, 2, 3, 4, 5], 2))
+    self.assertEqual([4.0], consolidate([1, 2, 3, 4, 5], 3))
+    self.assertEqual([], consolidate([1, 2], 4))
+
+
+class TestAccountingForecast(unittest.TestCase):
+  def test_unknown_usage(self):
+    forecast = AccountingForecast()
+    self.assertEqual(None, forecast.get_rate())
+    self.assertEqual(None, forecast.get_time_left())
+
+    forecast.add(100)
+    self.assertEqual(None, forecast.get_time_left())
+
+  def test_time_left(self):
+    forecast = AccountingForecast(60)
+
+    for _ in range(10):
+      forecast.add(100)
+
+    # our rate isn't biased toward zero while we're first starting
+
+    self.assertAlmostEqual(100, forecast.get_rate())
+
+    forecast.set_usage(1000, 11000)
+    self.assertAlmostEqual(100, forecast.get_time_left())
+
+    # usage since tor last told us is included
+
+    forecast.add(100)
+    self.assertAlmostEqual(99, forecast.get_time_left())
+
+    forecast.set_usage(11000, 11000)
+    self.assertEqual(0, forecast.get_time_left())
+
+  def test_favors_recent_rate(self):
+    forecast = AccountingForecast(60)
+
+    for _ in range(600):
+      forecast.add(1000)
+
+    for _ in range(600):
+      forecast.add(10)
+
+    self.assertTrue(10 <= forecast.get_rate() < 11)
+
+    # once idle our projection recedes
+
+    forecast.set_usage(0, 5000)
+    self.assertTrue(400 < forecast.get_time_left() < 500)
+
+    for _ in range(600):
+      forecast.add(0)
+
+    self.assertTrue(forecast.get_time_left() > 100000)
+
+  def test_get_accounting_time_label(self):
+    self.assertEqual('0:00:00:05', get_accounting_time_label(5))
+    self.assertEqual('1:02:03:04', get_accounting_time_label(93784))
+
+
+class TestBandwidthStats(unittest.TestCase):
+  @patch('arm.util.torTools.get_conn')
+  def test_clone_forecasts(self, get_conn_mock):
+    get_conn_mock().is_alive.return_value = False
+    get_conn_mock().get_info.return_value = None
+
+    stats = BandwidthStats()
+    stats.is_accounting = True
+    stats.bandwidth_event(Mock(read = 1000, written = 500))
+
+    snapshot = stats.clone()
+
+    for _ in range(10):
+      stats.bandwidth_event(Mock(read = 0, written = 0))
+
+    self.assertAlmostEqual(1000, snapshot.read_forecast.get_rate())
+    self.assertAlmostEqual(500, snapshot.write_forecast.get_rate())
+    self.assertTrue(stats.read_forecast.get_rate() < 1000)
+
+
+class TestStateHistoryStats(unittest.TestCase):
+  @patch('arm.util.torTools.get_conn', Mock())
+  def test_fills_history(self):
+    stats = StateHistoryStats('IPv6 Bandwidth', 900, ENDS - 900, [0.1, 0.1, 0.2, 0.2], [0.05, 0.05, 0.05, 0.05])
+
+    self.assertEqual([0.2, 0.2, 0.1, 0.1], stats.primary_counts[4].values(4))
+    self.assertEqual([0.2, 0.1], stats.primary_counts[5].values(2))
+    self.assertAlmostEqual(0.15, stats.primary_counts[6][0])
+    self.assertEqual(0, stats.primary_counts[0].get_count())
+    self.assertAlmostEqual(0.15, stats.primary_avg)
+
+    self.assertTrue(stats.get_title(80).startswith("IPv6 Bandwidth (from tor's state file, as of "))
+    self.assertEqual('IPv6 Bandwidth:', stats.get_title(20))
+
+  @patch('arm.util.tracker.get_resource_tracker')
+  @patch('arm.util.torTools.get_conn')
+  def test_prepopulate_loads_optional_histories(self, get_conn_mock, tracker_mock):
+    data_dir = tempfile.mkdtemp()
+
+    try:
+      with open(os.path.join(data_dir, 'state'), 'w') as state_file:
+        state_file.write(STATE_FILE + IPV6_HISTORY)
+
+      options = {'ORPort': '9001', 'DataDirectory': data_dir}
+      get_conn_mock().is_alive.return_value = False
+      get_conn_mock().get_info.return_value = None
+      get_conn_mock().get_option.side_effect = lambda option, default = None: options.get(option, default)
+      tracker_mock().get_resource_usage().start_time = ENDS - 86400
+
+      stats = BandwidthStats()
+
+      with patch('time.time', Mock(return_value = ENDS - 1)):
+        self.assertTrue(stats.prepopulate_from_state())
+
+      # directory history is malformed in our state file, so only IPv6 is
+      # available
+
+      self.assertEqual(['IPv6 Bandwidth'], stats.state_stats.keys())
+      self.assertEqual([0.2, 0.1, 0.1], stats.state_stats['IPv6 Bandwidth'].primary_counts[4].values(3))
+      self.assertEqual([3.0, 2.0, 1.0], stats.primary_counts[4].values(3))
+    finally:
+      shutil.rmtree(data_dir)
@@ -0,0 +1,141 @@
+import unittest
+
+from mock import Mock, patch
+
+import arm.controller  # imported first since graphPanel is part of a circular import
+
+from arm.graphing.circStats import MAX_IN_FLIGHT, CircStats, get_percentile
+
+from stem import CircStatus
+from stem.control import EventType
+
+
+def circ_event(circ_id, status, arrived_at):
+  return Mock(type = EventType.CIRC, id = circ_id, status = status, arrived_at = arrived_at)
+
+
+class TestCircStats(unittest.TestCase):
+  def setUp(self):
+    with patch('arm.util.torTools.get_conn', Mock()):
+      self.stats = CircStats()
+
+  def test_get_percentile(self):
+    values = range(1, 11)
+
+    self.assertEqual(0, get_percentile([], 50))
+    self.assertEqual(5, get_percentile(values, 50))
+    self.assertEqual(9, get_percentile(values, 90))
+    self.assertEqual(10, get_percentile(values, 100))
+    self.assertEqual(1, get_percentile(values, 0))
+
+  def test_build_times(self):
+    for circ_id in range(10):
+      self.stats.circ_event(circ_event(str(circ_id), CircStatus.LAUNCHED, 100.0))
+      self.stats.circ_event(circ_event(str(circ_id), CircStatus.BUILT, 100.0 + (circ_id + 1) / 10.0))
+
+    # circuits that we didn't see launched are ignored
+
+    self.stats.circ_event(circ_event('50', CircStatus.BUILT, 200.0))
+
+    self.stats.event_tick()
+    self.assertAlmostEqual(500, self.stats.primary_counts[0][0], delta = 100)
+    self.assertAlmostEqual(900, self.stats.secondary_counts[0][0], delta = 100)
+    self.assertAlmostEqual(1000, self.stats.primary_maxima[0][0])
+    self.assertAlmostEqual(100, self.stats.primary_minima[0][0])
+    self.assertEqual(0, len(self.stats.in_flight))
+
+    # seconds without builds are graphed as nothing
+
+    self.stats.event_tick()
+    self.assertEqual(0, self.stats.primary_counts[0][0])
+    self.assertEqual(0, self.stats.secondary_counts[0][0])
+
+    self.stats.circ_event(circ_event('60', CircStatus.LAUNCHED, 300.0))
+    self.stats.circ_event(circ_event('60', CircStatus.BUILT, 302.0))
+
+    self.stats.event_tick()
+    self.assertAlmostEqual(2000, self.stats.primary_counts[0][0])
+    self.assertAlmostEqual(2000, self.stats.secondary_counts[0][0])
+    self.assertEqual(3, self.stats.tick)
+
+  def test_interval_percentiles(self):
+    # a single slow build within an otherwise idle five second interval is
+    # graphed as is rather than being averaged with the idle seconds
+
+    self.stats.circ_event(circ_event('1', CircStatus.LAUNCHED, 100.0))
+    self.stats.circ_event(circ_event('1', CircStatus.BUILT, 102.0))
+
+    for _ in range(5):
+      self.stats.event_tick()
+
+    self.assertEqual(1, self.stats.primary_counts[1].get_count())
+    self.assertAlmostEqual(2000, self.stats.primary_counts[1][0])
+    self.assertAlmostEqual(2000, self.stats.secondary_counts[1][0])
+
+    # percentiles are of all the builds within the interval
+
+    for circ_id in range(10):
+      self.stats.circ_event(circ_event(str(circ_id), CircStatus.LAUNCHED, 200.0))
+      self.stats.circ_event(circ_event(str(circ_id), CircStatus.BUILT, 200.0 + (circ_id + 1) / 10.0))
+      self.stats.event_tick()
+
+    self.assertEqual(3, self.stats.primary_counts[1].get_count())
+    self.assertAlmostEqual(800, self.stats.primary_counts[1][0], delta = 100)
+    self.assertAlmostEqual(1000, self.stats.secondary_counts[1][0], delta = 100)
+    self.assertAlmostEqual(300, self.stats.primary_counts[1][1], delta = 100)
+    self.assertAlmostEqual(500, self.stats.secondary_counts[1][1], delta = 100)
+
+    # intervals without any builds are graphed as zero
+
+    for _ in range(5):
+      self.stats.event_tick()
+
+    self.assertEqual(0, self.stats.primary_counts[1][0])
+    self.assertEqual(0, self.stats.secondary_counts[1][0])
+
+  def test_failed_and_closed(self):
+    self.stats.circ_event(circ_event('1', CircStatus.LAUNCHED, 100.0))
+    self.stats.circ_event(circ_event('2', CircStatus.LAUNCHED, 100.0))
+    self.assertEqual(2, len(self.stats.in_flight))
+
+    self.stats.circ_event(circ_event('1', CircStatus.FAILED, 101.0))
+    self.stats.circ_event(circ_event('1', CircStatus.CLOSED, 101.0))
+    self.stats.circ_event(circ_event('2', CircStatus.CLOSED, 101.0))
+
+    self.assertEqual(1, self.stats.failed_count)
+    self.assertEqual(2, self.stats.closed_count)
+    self.assertEqual(0, len(self.stats.in_flight))
+    self.assertEqual(0, len(self.stats.build_times))
+
+  def test_in_flight_is_bounded(self):
+    for circ_id in range(MAX_IN_FLIGHT + 5):
+      self.stats.circ_event(circ_event(str(circ_id), CircStatus.LAUNCHED, 100.0))
+
+    self.assertEqual(MAX_IN_FLIGHT, len(self.stats.in_flight))
+    self.assertFalse('0' in self.stats.in_flight)
+    self.assertTrue(str(MAX_IN_FLIGHT + 4) in self.stats.in_flight)
+
+  def test_build_timeout(self):
+    self.assertEqual('Circuit Build Time (0 building):', self.stats.get_title(80))
+
+    self.stats.circ_event(Mock(type = EventType.BUILDTIMEOUT_SET, timeout = 1500))
+    self.assertEqual('Circuit Build Time (timeout: 1.5 s, 0 building):', self.stats.get_title(80))
+    self.assertEqual('Circuit Build Time:', self.stats.get_title(20))
+
+  def test_header_label(self):
+    self.stats.circ_event(circ_event('1', CircStatus.LAUNCHED, 100.0))
+    self.stats.circ_event(circ_event('1', CircStatus.BUILT, 100.25))
+    self.stats.event_tick()
+
+    self.stats.circ_event(circ_event('2', CircStatus.LAUNCHED, 101.0))
+    self.stats.circ_event(circ_event('2', CircStatus.BUILT, 103.5))
+    self.stats.event_tick()
+
+    # idle seconds are left out of both the last value and average
+
+    self.stats.event_tick()
+    self.stats.event_tick()
+
+    self.assertEqual('Median (2.5 s, avg: 1.4 s, failed: 0):', self.stats.get_header_label(80, True))
+    self.assertEqual('90th Percentile (2.5 s, avg: 1.4 s, closed: 0):', self.stats.get_header_label(80, False))
+    self.assertEqual('Median (2.5 s, avg: 1.4 s):', self.stats.get_header_label(30, True))
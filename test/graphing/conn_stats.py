@@ -0,0 +1,158 @@
+import unittest
+
+from mock import Mock, patch
+
+import arm.controller  # imported first since graphPanel is part of a circular import
+
+from arm.connections.connEntry import Category
+from arm.graphing.connStats import ConnStats
+
+from stem.util import connection
+
+INBOUND = connection.Connection('127.0.0.1', 9001, '75.119.206.243', 22, 'tcp')
+CONTROL = connection.Connection('127.0.0.1', 9051, '127.0.0.1', 1766, 'tcp')
+SOCKS = connection.Connection('127.0.0.1', 9050, '127.0.0.1', 1059, 'tcp')
+EXIT = connection.Connection('127.0.0.1', 3531, '74.125.28.106', 80, 'tcp')
+GUARD = connection.Connection('127.0.0.1', 3532, '86.59.30.40', 443, 'tcp')
+DIRECTORY = connection.Connection('127.0.0.1', 3533, '38.229.72.16', 443, 'tcp')
+
+FINGERPRINTS = {
+  '86.59.30.40': '847B1F850344D7876491A54892F904934E4EB85D',
+  '38.229.72.16': 'BD6A829255CB08E66FBE7D3748363586E46B3810',
+}
+
+CIRCUITS = [
+  ('1', 'BUILT', 'GENERAL', ('847B1F850344D7876491A54892F904934E4EB85D', '9695DFC35FFEB861329B9F1AB04C46397020CE31')),
+  ('2', 'BUILT', 'GENERAL', ('BD6A829255CB08E66FBE7D3748363586E46B3810',)),
+]
+
+
+class TestConnStats(unittest.TestCase):
+  def setUp(self):
+    self.conn = Mock()
+    self.conn.get_relay_fingerprint.side_effect = lambda address, port: FINGERPRINTS.get(address)
+    self.conn.is_exiting_allowed.return_value = True
+    self.conn.get_circuits.return_value = CIRCUITS
+    self.conn.get_hidden_service_ports.return_value = []
+
+    controller = self.conn.get_controller()
+    controller.get_conf.side_effect = lambda option, default: {'ORPort': '9001', 'ControlPort': '9051', 'SocksPort': '9050'}.get(option, default)
+
+    self.tracker = Mock()
+    self.tracker.run_counter.return_value = 1
+
+    self.patches = [
+      patch('arm.util.torTools.get_conn', Mock(return_value = self.conn)),
+      patch('arm.util.tracker.get_connection_tracker', Mock(return_value = self.tracker)),
+    ]
+
+    for patcher in self.patches:
+      patcher.start()
+
+    self.stats = ConnStats()
+
+  def tearDown(self):
+    for patcher in self.patches:
+      patcher.stop()
+
+  def test_categories(self):
+    self.tracker.get_connections.return_value = [INBOUND, CONTROL, SOCKS, EXIT, GUARD, DIRECTORY]
+    self.stats.event_tick()
+
+    self.assertEqual(1, self.stats.last_primary)
+    self.assertEqual(4, self.stats.last_secondary)
+
+    for category in (Category.INBOUND, Category.CONTROL, Category.SOCKS, Category.EXIT, Category.CIRCUIT, Category.DIRECTORY):
+      self.assertEqual(1, self.stats.category_counts[category])
+
+    self.assertEqual(0, self.stats.category_counts[Category.OUTBOUND])
+    self.assertEqual([1], list(self.stats.category_history[Category.EXIT]))
+
+  def test_only_recounts_for_new_results(self):
+    self.tracker.get_connections.return_value = [INBOUND, EXIT, GUARD]
+
+    for _ in range(3):
+      self.stats.event_tick()
+
+    self.assertEqual(1, self.tracker.get_connections.call_count)
+    self.assertEqual(1, self.conn.get_circuits.call_count)
+    self.assertEqual(3, self.stats.tick)
+
+    # outbound connections are categorized anew with the new results
+
+    self.tracker.run_counter.return_value = 2
+    self.tracker.get_connections.return_value = [EXIT, DIRECTORY]
+    self.stats.event_tick()
+
+    self.assertEqual(2, self.tracker.get_connections.call_count)
+    self.assertEqual(2, self.conn.get_circuits.call_count)
+    self.assertEqual(4, self.conn.get_relay_fingerprint.call_count)
+    self.assertEqual(0, self.stats.last_primary)
+    self.assertEqual(2, self.stats.last_secondary)
+    self.assertEqual(0, self.stats.category_counts[Category.CIRCUIT])
+    self.assertEqual(1, self.stats.category_counts[Category.DIRECTORY])
+    self.assertEqual([0, 0, 0, 1], list(self.stats.category_history[Category.DIRECTORY]))
+
+  def test_outbound_categories_follow_circuits(self):
+    # a guard that we're connected to before our circuits are built
+
+    self.conn.get_circuits.return_value = []
+    self.tracker.get_connections.return_value = [INBOUND, GUARD]
+    self.stats.event_tick()
+
+    self.assertEqual(1, self.stats.category_counts[Category.OUTBOUND])
+    self.assertEqual(0, self.stats.category_counts[Category.CIRCUIT])
+
+    self.conn.get_circuits.return_value = CIRCUITS
+    self.tracker.run_counter.return_value = 2
+    self.stats.event_tick()
+
+    self.assertEqual(0, self.stats.category_counts[Category.OUTBOUND])
+    self.assertEqual(1, self.stats.category_counts[Category.CIRCUIT])
+    self.assertEqual(1, self.stats.category_counts[Category.INBOUND])
+
+    # and once those circuits close
+
+    self.conn.get_circuits.return_value = []
+    self.tracker.run_counter.return_value = 3
+    self.stats.event_tick()
+
+    self.assertEqual(1, self.stats.category_counts[Category.OUTBOUND])
+    self.assertEqual(0, self.stats.category_counts[Category.CIRCUIT])
+    self.assertEqual(1, self.stats.last_secondary)
+
+  def test_history_follows_graph_interval(self):
+    self.stats._graph_panel = Mock()
+    self.stats._graph_panel.update_interval = 1  # five seconds
+
+    self.tracker.get_connections.return_value = [EXIT]
+
+    for _ in range(4):
+      self.stats.event_tick()
+
+    self.tracker.run_counter.return_value = 2
+    self.tracker.get_connections.return_value = []
+
+    for _ in range(6):
+      self.stats.event_tick()
+
+    self.assertEqual([0.8, 0.0], list(self.stats.category_history[Category.EXIT]))
+
+    # changing the interval starts our history anew
+
+    self.stats._graph_panel.update_interval = 0
+    self.stats.event_tick()
+    self.assertEqual([0.0], list(self.stats.category_history[Category.EXIT]))
+
+  def test_clone(self):
+    self.tracker.get_connections.return_value = [EXIT]
+    self.stats.event_tick()
+    snapshot = self.stats.clone()
+
+    self.tracker.run_counter.return_value = 2
+    self.tracker.get_connections.return_value = []
+    self.stats.event_tick()
+
+    self.assertEqual(1, snapshot.category_counts[Category.EXIT])
+    self.assertEqual([1], list(snapshot.category_history[Category.EXIT]))
+    self.assertEqual([1, 0], list(self.stats.category_history[Category.EXIT]))
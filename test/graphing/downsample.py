@@ -0,0 +1,36 @@
+import unittest
+
+from arm.graphing.history import downsample
+
+
+class TestDownsample(unittest.TestCase):
+  def test_fits_width(self):
+    averages = [1, 2, 3, 4]
+    columns = [(1, 1, 1), (2, 2, 2), (3, 3, 3), (4, 4, 4)]
+
+    self.assertEqual((1, columns), downsample(averages, averages, averages, 4))
+    self.assertEqual((1, columns), downsample(averages, averages, averages, 10))
+
+  def test_envelope(self):
+    averages = [1.0, 3.0, 2.0, 2.0, 5.0]
+    maxima = [2.0, 9.0, 2.0, 4.0, 5.0]
+    minima = [0.0, 1.0, 2.0, 1.0, 5.0]
+
+    factor, columns = downsample(averages, maxima, minima, 3)
+
+    self.assertEqual(2, factor)
+    self.assertEqual([(2.0, 9.0, 0.0), (2.0, 4.0, 1.0), (5.0, 5.0, 5.0)], columns)
+
+  def test_peaks_are_kept(self):
+    averages = [0.0] * 100
+    maxima = [0.0] * 100
+    maxima[37] = 50.0
+
+    factor, columns = downsample(averages, maxima, averages, 7)
+
+    self.assertEqual(15, factor)
+    self.assertEqual(7, len(columns))
+    self.assertEqual([0.0, 0.0, 50.0, 0.0, 0.0, 0.0, 0.0], [maximum for (_, maximum, _) in columns])
+
+  def test_empty(self):
+    self.assertEqual((1, []), downsample([], [], [], 5))
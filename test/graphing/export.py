@@ -0,0 +1,118 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+import arm.controller  # imported first since graphPanel is part of a circular import
+
+from arm.graphing.export import Format, get_format, stats_history, store_history, write_history
+from arm.graphing.graphPanel import GraphStats
+from arm.graphing.history import HistoryStore
+
+INTERVALS = [("each second", 1), ("5 seconds", 5)]
+NOW = 1405000000.0
+
+
+class TestExport(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def test_get_format(self):
+    self.assertEqual(Format.JSON, get_format('/tmp/history.json'))
+    self.assertEqual(Format.JSON, get_format('/tmp/HISTORY.JSON'))
+    self.assertEqual(Format.CSV, get_format('/tmp/history.csv'))
+    self.assertEqual(Format.CSV, get_format('/tmp/history'))
+
+  def test_stats_history(self):
+    with patch('arm.util.torTools.get_conn', Mock()):
+      stats = GraphStats()
+
+    for i in range(7):
+      stats._process_event(i, i * 2)
+
+    rows = list(stats_history({'Bandwidth': stats}, INTERVALS, NOW))
+
+    # only the values we've collected are provided, oldest first
+
+    self.assertEqual(8, len(rows))
+    self.assertEqual(('bandwidth', 'each second', NOW - 6, 0.0, 0.0), rows[0])
+    self.assertEqual(('bandwidth', 'each second', NOW, 6.0, 12.0), rows[6])
+    self.assertEqual(('bandwidth', '5 seconds', NOW - 2, 2.0, 4.0), rows[7])
+
+  def test_stats_history_of_snapshot(self):
+    with patch('arm.util.torTools.get_conn', Mock()):
+      stats = GraphStats()
+
+    for i in range(7):
+      stats._process_event(i, i * 2)
+
+    rows = stats_history({'Bandwidth': stats.clone()}, INTERVALS, NOW)
+    first_rows = [rows.next() for _ in range(3)]
+
+    # appending to the graph mid-export doesn't shift the rows we provide
+
+    for i in range(3):
+      stats._process_event(100, 100)
+
+    rows = first_rows + list(rows)
+
+    self.assertEqual(8, len(rows))
+    self.assertEqual([float(i) for i in range(7)], [row[3] for row in rows[:7]])
+
+  def test_store_history(self):
+    history_dir = os.path.join(self.tmp_dir, 'graph_history')
+    store = HistoryStore(os.path.join(history_dir, 'system_resources'), [1, 5], 3)
+    store.record(0, 1, 2, NOW)
+    store.record(0, 3, 4, NOW)
+    store.record(1, 5, 6, NOW)
+    store.close()
+
+    expected = [
+      ('system resources', 'each second', NOW - 1, 1.0, 2.0),
+      ('system resources', 'each second', NOW, 3.0, 4.0),
+      ('system resources', '5 seconds', NOW, 5.0, 6.0),
+    ]
+
+    self.assertEqual(expected, list(store_history(history_dir, INTERVALS, 3, NOW)))
+
+    # reading the history shouldn't modify it, even when it's for a different
+    # layout
+
+    self.assertRaises(IOError, list, store_history(history_dir, INTERVALS, 4, NOW))
+    self.assertEqual(expected, list(store_history(history_dir, INTERVALS, 3, NOW)))
+
+  def test_write_history(self):
+    rows = [('bandwidth', 'each second', NOW, 1.5, 2.0), ('bandwidth', 'each second', NOW + 1, 3.0, 4.0)]
+    csv_path = os.path.join(self.tmp_dir, 'history.csv')
+    json_path = os.path.join(self.tmp_dir, 'history.json')
+
+    self.assertEqual(2, write_history(csv_path, iter(rows)))
+    self.assertEqual(2, write_history(json_path, iter(rows)))
+
+    with open(csv_path) as csv_file:
+      csv_rows = list(csv.reader(csv_file))
+
+    self.assertEqual(['graph', 'interval', 'timestamp', 'primary', 'secondary'], csv_rows[0])
+    self.assertEqual(['bandwidth', 'each second', repr(NOW), '1.5', '2.0'], csv_rows[1])
+    self.assertEqual(3, len(csv_rows))
+
+    with open(json_path) as json_file:
+      json_rows = json.load(json_file)
+
+    self.assertEqual(2, len(json_rows))
+    self.assertEqual({'graph': 'bandwidth', 'interval': 'each second', 'timestamp': NOW + 1, 'primary': 3.0, 'secondary': 4.0}, json_rows[1])
+
+  def test_write_empty_history(self):
+    json_path = os.path.join(self.tmp_dir, 'history.json')
+
+    self.assertEqual(0, write_history(json_path, iter([])))
+
+    with open(json_path) as json_file:
+      self.assertEqual([], json.load(json_file))
@@ -0,0 +1,117 @@
+import unittest
+
+from mock import Mock, patch
+
+import arm.controller  # imported first since graphPanel is part of a circular import
+
+from arm.graphing.graphPanel import GraphStats
+from arm.graphing.percentiles import Window
+
+
+class TestGraphStats(unittest.TestCase):
+  def setUp(self):
+    with patch('arm.util.torTools.get_conn', Mock()):
+      self.stats = GraphStats()
+
+  def test_process_event(self):
+    for i in range(10):
+      self.stats._process_event(i, i * 2)
+
+    self.assertEqual(10, self.stats.tick)
+    self.assertEqual([9.0, 8.0, 7.0], self.stats.primary_counts[0].values(3))
+    self.assertEqual([18.0, 16.0, 14.0], self.stats.secondary_counts[0].values(3))
+    self.assertEqual([7.0, 2.0, 0.0], self.stats.primary_counts[1].values(3))
+    self.assertEqual(7, self.stats.max_primary[1])
+    self.assertEqual(45, self.stats.primary_total)
+
+  def test_clone_shares_history(self):
+    self.stats._process_event(5, 6)
+    snapshot = self.stats.clone()
+
+    self.assertTrue(snapshot.is_pause_buffer)
+    self.assertTrue(snapshot.primary_counts[0] is self.stats.primary_counts[0])
+
+    self.stats._process_event(7, 8)
+
+    self.assertEqual([5.0, 0.0], snapshot.primary_counts[0].values(2))
+    self.assertEqual([7.0, 5.0], self.stats.primary_counts[0].values(2))
+    self.assertEqual(1, snapshot.tick)
+    self.assertEqual(5, snapshot.last_primary)
+
+    # intervals that haven't been appended to are still shared
+
+    self.assertTrue(snapshot.primary_counts[1] is self.stats.primary_counts[1])
+
+  def test_history_store(self):
+    store = Mock()
+    store.load.return_value = [[(1.0, 2.0), (3.0, 4.0)]] + [[]] * 7
+
+    self.assertTrue(self.stats.set_history_store(store))
+    self.assertEqual([3.0, 1.0, 0.0], self.stats.primary_counts[0].values(3))
+    self.assertEqual(4.0, self.stats.max_secondary[0])
+
+    self.stats._process_event(5, 6)
+    store.record.assert_called_once_with(0, 5, 6)
+
+    self.stats.set_history_store(None)
+    store.close.assert_called_once_with()
+
+  def test_extrema(self):
+    for value in (3, 9, 1, 4, 3):
+      self.stats._process_event(value, value * 2)
+
+    self.assertEqual(4.0, self.stats.primary_counts[1][0])
+    self.assertEqual(9.0, self.stats.primary_maxima[1][0])
+    self.assertEqual(1.0, self.stats.primary_minima[1][0])
+    self.assertEqual(18.0, self.stats.secondary_maxima[1][0])
+
+    # each second's value is its own bounds
+
+    self.assertEqual(3.0, self.stats.primary_maxima[0][0])
+    self.assertEqual(3.0, self.stats.primary_minima[0][0])
+
+  def test_get_columns(self):
+    for value in range(10):
+      self.stats._process_event(value, 0)
+
+    self.assertEqual((1, [(9.0, 9.0, 9.0), (8.0, 8.0, 8.0)]), self.stats.get_columns(0, 2, True))
+
+    with patch.dict('arm.graphing.graphPanel.CONFIG', {'features.graph.downsample': True}):
+      factor, columns = self.stats.get_columns(0, 4, True)
+
+      self.assertEqual(3, factor)
+      self.assertEqual([8.0, 5.0, 2.0, 0.0], [average for (average, _, _) in columns])
+
+      # slots that haven't been filled aren't averaged in
+
+      self.assertEqual((1, [(7.0, 9.0, 5.0), (2.0, 4.0, 0.0)]), self.stats.get_columns(1, 100, True))
+
+  def test_history_is_longer_than_width(self):
+    with patch.dict('arm.graphing.graphPanel.CONFIG', {'features.graph.max_width': 10, 'features.graph.history': 40, 'features.graph.downsample': True}):
+      with patch('arm.util.torTools.get_conn', Mock()):
+        stats = GraphStats()
+
+      for value in range(30):
+        stats._process_event(value, 0)
+
+      self.assertEqual(10, stats.max_column)
+      self.assertEqual(40, stats.history_size)
+
+      # downsampling covers all of our history, not just the graph's width
+
+      factor, columns = stats.get_columns(0, 10, True)
+
+      self.assertEqual(3, factor)
+      self.assertEqual(10, len(columns))
+      self.assertEqual((29.0, 0.0), (columns[0][1], columns[-1][2]))
+
+  def test_percentiles(self):
+    for value in range(1, 101):
+      self.stats._process_event(value, 0)
+
+    snapshot = self.stats.clone()
+    self.stats._process_event(1000, 0)
+
+    self.assertTrue(abs(snapshot.get_percentiles(Window.TOTAL, True, (95,))[0] - 95) < 2)
+    self.assertEqual(1000, self.stats.get_percentiles(Window.TOTAL, True, (100,))[0])
+    self.assertEqual([0, 0], self.stats.get_percentiles(Window.HOUR, False, (50, 99)))
@@ -0,0 +1,87 @@
+import copy
+import random
+import threading
+import unittest
+
+from arm.graphing.history import HistoryBuffer
+
+
+class TestHistoryBuffer(unittest.TestCase):
+  def test_starts_with_zeros(self):
+    history = HistoryBuffer(5)
+
+    self.assertEqual(5, len(history))
+    self.assertEqual([0.0] * 5, list(history))
+    self.assertEqual(0.0, history.get_max())
+    self.assertEqual(0.0, history.get_min())
+
+  def test_newest_first(self):
+    history = HistoryBuffer(3)
+
+    for value in (1, 2, 3, 4):
+      history.append(value)
+
+    self.assertEqual([4.0, 3.0, 2.0], list(history))
+    self.assertEqual(4.0, history[0])
+    self.assertEqual(2.0, history[-1])
+    self.assertEqual([4.0, 3.0], history[:2])
+    self.assertEqual([4.0, 3.0], history.values(2))
+    self.assertRaises(IndexError, history.__getitem__, 3)
+
+  def test_bounds(self):
+    history = HistoryBuffer(50)
+    values = [0] * 50
+
+    for window in (50, 10, 1, 10, 37):
+      for _ in range(120):
+        value = random.randint(-100, 100)
+        history.append(value)
+        values.insert(0, value)
+
+        self.assertEqual(max(values[:window]), history.get_max(window))
+        self.assertEqual(min(values[:window]), history.get_min(window))
+
+  def test_window_is_clamped(self):
+    history = HistoryBuffer(3)
+    history.append(5)
+
+    self.assertEqual(5.0, history.get_max(10))
+    self.assertEqual(0.0, history.get_min(10))
+    self.assertEqual(5.0, history.get_min(0))
+
+  def test_copy(self):
+    history = HistoryBuffer(3)
+    history.append(5)
+    history.get_max()
+
+    history_copy = copy.copy(history)
+    history.append(8)
+
+    self.assertEqual([5.0, 0.0, 0.0], list(history_copy))
+    self.assertEqual(5.0, history_copy.get_max())
+    self.assertEqual(8.0, history.get_max())
+
+  def test_concurrent_use(self):
+    history = HistoryBuffer(50)
+
+    def append_values():
+      for i in range(20000):
+        history.append(i)
+
+    appender = threading.Thread(target = append_values)
+    appender.start()
+
+    # changing the window rebuilds the deques while values are being appended
+
+    window = 1
+
+    while appender.isAlive():
+      history.get_max(window)
+      copy.copy(history)
+      window = window % 50 + 1
+
+    appender.join()
+
+    self.assertEqual(20000, history.get_count())
+    self.assertEqual(19999.0, history.get_max(10))
+    self.assertEqual(19990.0, history.get_min(10))
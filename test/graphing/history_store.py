@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from arm.graphing.history import HistoryStore
+
+INTERVALS = [1, 60]
+NOW = 1405000000.0
+
+
+class TestHistoryStore(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.store_path = os.path.join(self.tmp_dir, 'graph_history', 'bandwidth')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def test_empty(self):
+    store = HistoryStore(self.store_path, INTERVALS, 5)
+
+    self.assertEqual([[], []], store.load(NOW))
+    store.close()
+
+  def test_restores_values(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3)
+
+    for i in range(5):
+      store.record(0, i, i * 2, NOW)
+
+    store.record(1, 7, 8, NOW)
+    store.close()
+
+    store = HistoryStore(self.store_path, INTERVALS, 3)
+    self.assertEqual([[(2, 4), (3, 6), (4, 8)], [(7, 8)]], store.load(NOW))
+
+    # continues appending where we left off
+
+    store.record(0, 5, 10, NOW)
+    self.assertEqual([(3, 6), (4, 8), (5, 10)], store.load(NOW)[0])
+    store.close()
+
+  def test_records_are_buffered(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3, flush_rate = 60)
+    store.record(0, 1, 2, NOW)
+
+    self.assertEqual([[], []], self._saved_values())
+    self.assertEqual([[(1, 2)], []], store.load(NOW))
+    self.assertEqual([[(1, 2)], []], self._saved_values())
+
+    store.record(1, 3, 4, NOW)
+    store.close()
+    self.assertEqual([[(1, 2)], [(3, 4)]], self._saved_values())
+
+  def test_flushes_in_background(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3, flush_rate = 0.01)
+    store.record(0, 1, 2, NOW)
+    start = time.time()
+
+    while self._saved_values() == [[], []] and time.time() - start < 5:
+      time.sleep(0.01)
+
+    self.assertEqual([[(1, 2)], []], self._saved_values())
+    store.close()
+
+  def test_pads_missing_time(self):
+    store = HistoryStore(self.store_path, INTERVALS, 4)
+    store.record(0, 1, 1, NOW)
+    store.record(0, 2, 2, NOW)
+    store.record(1, 3, 3, NOW)
+
+    self.assertEqual([(1, 1), (2, 2), (0, 0), (0, 0)], store.load(NOW + 2)[0])
+    self.assertEqual([(3, 3)], store.load(NOW + 2)[1])
+    self.assertEqual([[], [(3, 3), (0, 0)]], store.load(NOW + 60))
+    store.close()
+
+  def test_size_is_fixed(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3)
+    initial_size = os.path.getsize(self.store_path)
+
+    for i in range(10):
+      store.record(0, i, i, NOW)
+
+    store.close()
+    self.assertEqual(initial_size, os.path.getsize(self.store_path))
+
+  def test_replaces_different_layouts(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3)
+    store.record(0, 1, 1, NOW)
+    store.close()
+
+    store = HistoryStore(self.store_path, INTERVALS, 4)
+    self.assertEqual([[], []], store.load(NOW))
+    store.close()
+
+    with open(self.store_path, 'wb') as store_file:
+      store_file.write('garbage')
+
+    store = HistoryStore(self.store_path, INTERVALS, 4)
+    self.assertEqual([[], []], store.load(NOW))
+    store.close()
+
+  def _saved_values(self):
+    store = HistoryStore(self.store_path, INTERVALS, 3, read_only = True)
+
+    try:
+      return store.load(NOW)
+    finally:
+      store.close()
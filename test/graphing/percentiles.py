@@ -0,0 +1,149 @@
+import copy
+import random
+import threading
+import unittest
+
+from mock import patch
+
+from arm.graphing.percentiles import PercentileTracker, TDigest, Window
+
+
+class TestTDigest(unittest.TestCase):
+  def test_empty(self):
+    digest = TDigest()
+
+    self.assertEqual(0, digest.get_count())
+    self.assertEqual(None, digest.get_quantile(0.5))
+
+  def test_single_value(self):
+    digest = TDigest()
+    digest.add(5)
+
+    self.assertEqual(5, digest.get_quantile(0.0))
+    self.assertEqual(5, digest.get_quantile(0.99))
+
+  def test_accuracy(self):
+    values = range(10000)
+    random.shuffle(values)
+
+    digest = TDigest()
+
+    for value in values:
+      digest.add(value)
+
+    self.assertEqual(10000, digest.get_count())
+    self.assertEqual(0, digest.get_quantile(0.0))
+    self.assertEqual(9999, digest.get_quantile(1.0))
+
+    for quantile in (0.01, 0.25, 0.5, 0.95, 0.99):
+      self.assertTrue(abs(digest.get_quantile(quantile) - quantile * 10000) < 50)
+
+  def test_bounded_size(self):
+    digest = TDigest(50)
+
+    for _ in range(20000):
+      digest.add(random.random())
+
+    digest.get_quantile(0.5)
+    self.assertTrue(len(digest._centroids) < 200)
+
+  def test_merge(self):
+    low, high = TDigest(), TDigest()
+
+    for value in range(1000):
+      low.add(value)
+      high.add(value + 1000)
+
+    merged = TDigest()
+    merged.merge(low, high)
+
+    self.assertEqual(2000, merged.get_count())
+    self.assertTrue(abs(merged.get_quantile(0.5) - 1000) < 20)
+    self.assertTrue(abs(merged.get_quantile(0.95) - 1900) < 20)
+
+
+class TestPercentileTracker(unittest.TestCase):
+  def test_empty(self):
+    tracker = PercentileTracker()
+    self.assertEqual([None, None, None], tracker.get_percentiles(Window.HOUR))
+
+  def test_windows(self):
+    tracker = PercentileTracker()
+
+    # an hour of large values followed by an hour of small ones
+
+    for _ in range(3600):
+      tracker.add(1000)
+
+    for _ in range(3600):
+      tracker.add(random.randint(0, 100))
+
+    hour_p50, hour_p95 = tracker.get_percentiles(Window.HOUR, (50, 95))
+    self.assertTrue(40 < hour_p50 < 60)
+    self.assertTrue(90 < hour_p95 <= 100)
+
+    self.assertEqual([1000, 1000], tracker.get_percentiles(Window.DAY, (95, 99)))
+    self.assertEqual([1000, 1000], tracker.get_percentiles(Window.TOTAL, (95, 99)))
+
+  def test_hour_is_rolling(self):
+    tracker = PercentileTracker()
+
+    for _ in range(3600):
+      tracker.add(1000)
+
+    for _ in range(120):
+      tracker.add(0)
+
+    self.assertEqual([1000], tracker.get_percentiles(Window.HOUR, (50,)))
+
+  def test_copy(self):
+    tracker = PercentileTracker()
+
+    for _ in range(90):
+      tracker.add(10)
+
+    tracker_copy = copy.copy(tracker)
+
+    for _ in range(90):
+      tracker.add(20)
+
+    self.assertEqual([10], tracker_copy.get_percentiles(Window.TOTAL, (99,)))
+    self.assertEqual([10], tracker_copy.get_percentiles(Window.HOUR, (99,)))
+    self.assertEqual([20], tracker.get_percentiles(Window.HOUR, (99,)))
+
+  def test_completed_periods_are_cached(self):
+    tracker = PercentileTracker()
+
+    for _ in range(600):
+      tracker.add(10)
+
+    tracker.get_percentiles(Window.HOUR)
+
+    with patch.object(TDigest, 'merge', autospec = True, side_effect = TDigest.merge) as merge_mock:
+      for _ in range(30):
+        tracker.add(20)
+        tracker.get_percentiles(Window.HOUR)
+
+      # only the minute in progress is merged while it's being filled
+
+      self.assertEqual(30, merge_mock.call_count)
+      self.assertTrue(all([len(call[0]) == 2 for call in merge_mock.call_args_list]))
+
+  def test_concurrent_use(self):
+    tracker = PercentileTracker()
+
+    def add_samples():
+      for i in range(20000):
+        tracker.add(i % 100)
+
+    adder = threading.Thread(target = add_samples)
+    adder.start()
+
+    while adder.isAlive():
+      tracker.get_percentiles(Window.HOUR)
+      tracker.get_percentiles(Window.DAY)
+
+    adder.join()
+
+    self.assertEqual(20000, tracker._total.get_count())
+    self.assertEqual(20000, sum([digest.get_count() for digest in tracker._hours]) + tracker._hour.get_count() + tracker._minute.get_count())
@@ -0,0 +1,142 @@
+import random
+import time
+import unittest
+
+from mock import patch
+
+from arm.logPanel import DAYBREAK_EVENT, DaybreakListing, LogDisplay, LogEntry, get_daybreaks, get_log_file_runlevels
+
+NOW = time.mktime((2014, 7, 20, 15, 0, 0, 0, 0, -1))
+
+
+def _entry(hours_ago):
+  return LogEntry(NOW - hours_ago * 3600, 'NOTICE', 'event from %i hours ago' % hours_ago, 'green')
+
+
+def _display(display, line = 0):
+  return [(entry.msg if entry else None, duplicate_count, item_line, is_under_divider) for (entry, duplicate_count, item_line, is_under_divider) in display.get_items(line)]
+
+
+def _describe(listing):
+  return [(entry.type, entry.timestamp) for entry in listing]
+
+
+class TestLogFileRunlevels(unittest.TestCase):
+  def test_get_log_file_runlevels(self):
+    self.assertEqual(['NOTICE', 'WARN', 'ERROR'], get_log_file_runlevels('notice'))
+    self.assertEqual(['INFO', 'NOTICE', 'WARN', 'ERROR'], get_log_file_runlevels('info-err'))
+    self.assertEqual(['DEBUG', 'INFO'], get_log_file_runlevels('debug-info'))
+    self.assertEqual(['WARN', 'ERROR'], get_log_file_runlevels('WARN'))
+    self.assertEqual([], get_log_file_runlevels('[circ]info'))
+
+
+@patch('time.time', lambda: NOW)
+class TestDaybreakListing(unittest.TestCase):
+  def test_matches_get_daybreaks(self):
+    events = [_entry(hours_ago) for hours_ago in (1, 2, 20, 40, 41, 80)]
+    listing = DaybreakListing(events)
+
+    self.assertEqual(_describe(get_daybreaks(events)), _describe(listing.get_listing()))
+    self.assertEqual(3, len([entry for entry in listing.get_listing() if entry.type == DAYBREAK_EVENT]))
+
+  def test_adding_and_trimming(self):
+    random.seed(5)
+    events, listing = [], DaybreakListing()
+    hours_ago = 200
+
+    for _ in range(100):
+      hours_ago = max(0, hours_ago - random.randint(0, 12))
+      event = _entry(hours_ago)
+
+      events.insert(0, event)
+      listing.add(event)
+
+      if len(events) > 30:
+        trim_count = random.randint(1, 5)
+        del events[-trim_count:]
+        listing.trim(trim_count)
+
+      self.assertEqual(_describe(get_daybreaks(events)), _describe(listing.get_listing()))
+
+    listing.trim(len(events))
+    self.assertEqual([], list(listing.get_listing()))
+
+  def test_day_rollover(self):
+    events = [_entry(hours_ago) for hours_ago in (1, 2, 30)]
+    listing = DaybreakListing(events)
+
+    with patch('time.time', lambda: NOW + 86400):
+      self.assertEqual(_describe(get_daybreaks(events)), _describe(listing.get_listing()))
+      self.assertEqual(DAYBREAK_EVENT, listing.get_listing()[0].type)
+
+
+@patch('time.time', lambda: NOW)
+class TestLogDisplay(unittest.TestCase):
+  def test_layout(self):
+    events = [_entry(hours_ago) for hours_ago in (1, 30, 31)]
+    display = LogDisplay(80, 1, 6, True, False, get_daybreaks(events))
+
+    expected = [
+      ('event from 1 hours ago', 0, 0, False),
+      ('', 0, 1, False),
+      ('event from 30 hours ago', 0, 2, True),
+      ('event from 31 hours ago', 0, 3, True),
+      (None, 0, 4, True),
+    ]
+
+    self.assertEqual(expected, _display(display))
+    self.assertEqual(5, display.get_total())
+    self.assertEqual(expected[2:], _display(display, 2))
+    self.assertEqual(expected[4:], _display(display, 4))
+
+  def test_deduplication(self):
+    events = [LogEntry(NOW - i, 'NOTICE', 'repeated message', 'green') for i in range(5)]
+    events.insert(2, LogEntry(NOW - 2.5, 'NOTICE', 'other message', 'green'))
+    display = LogDisplay(80, 1, 6, False, True, events)
+
+    self.assertEqual([('repeated message', 4, 0, False), ('other message', 0, 1, False)], _display(display))
+
+    display.trim([events.pop(), events.pop()])
+    self.assertEqual([('repeated message', 2, 0, False), ('other message', 0, 1, False)], _display(display))
+
+  def test_matches_new_display(self):
+    # following a log should provide the same results as making a display
+    # from scratch
+
+    random.seed(5)
+    messages = ['first message', 'second message', 'third message ' * 10]
+
+    for is_deduplicating in (False, True):
+      events, listing = [], DaybreakListing()
+      display = LogDisplay(60, 1, 6, True, is_deduplicating)
+      hours_ago = 200
+
+      for _ in range(300):
+        hours_ago = max(0, hours_ago - random.choice([0, 0, 0, 1, 12]))
+        event = LogEntry(NOW - hours_ago * 3600, 'NOTICE', random.choice(messages), 'green')
+
+        events.insert(0, event)
+        listing.add(event)
+        display.sync(listing.get_listing())
+
+        if len(events) > 50:
+          trimmed = events[-random.randint(1, 5):]
+          del events[-len(trimmed):]
+          listing.trim(len(trimmed))
+          display.trim(trimmed)
+
+        expected = LogDisplay(60, 1, 6, True, is_deduplicating, get_daybreaks(events))
+        self.assertEqual(_display(expected), _display(display))
+        self.assertEqual(expected.get_total(), display.get_total())
+
+  def test_day_rollover(self):
+    events = [_entry(hours_ago) for hours_ago in (1, 2, 30)]
+    listing = DaybreakListing(events)
+    display = LogDisplay(80, 1, 6, True, True, listing.get_listing())
+
+    with patch('time.time', lambda: NOW + 86400):
+      display.sync(listing.get_listing())
+      expected = LogDisplay(80, 1, 6, True, True, get_daybreaks(events))
+
+      self.assertEqual(_display(expected), _display(display))
+      self.assertEqual('', _display(display)[0][0])
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from arm.util.archive import BLOCK_SIZE, EventArchive
+
+# noon on a couple days, local time
+
+DAY_1 = time.mktime((2014, 7, 14, 12, 0, 0, 0, 0, -1))
+DAY_2 = time.mktime((2014, 7, 15, 12, 0, 0, 0, 0, -1))
+
+
+class TestEventArchive(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.archive_path = os.path.join(self.tmp_dir, 'event_archive')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def _make_archive(self, events):
+    archive = EventArchive(self.archive_path)
+
+    for event in events:
+      archive.add(*event)
+
+    archive.start()
+    archive.stop()
+    archive.join()
+
+    return archive
+
+  def test_search(self):
+    archive = self._make_archive([
+      (DAY_1, 'NOTICE', 'Bootstrapped 100%: Done.'),
+      (DAY_1 + 5, 'WARN', 'Problem bootstrapping.\nStuck at 5%'),
+      (DAY_2, 'NOTICE', 'Heartbeat: Tor\'s uptime is 1 day'),
+      (DAY_2 + 5, 'ARM_NOTICE', 'arm opening log file'),
+    ])
+
+    self.assertEqual(['2014-07-14', '2014-07-15'], sorted(os.listdir(self.archive_path)))
+
+    results = list(archive.search())
+    self.assertEqual(4, len(results))
+    self.assertEqual((DAY_2 + 5, 'ARM_NOTICE', 'arm opening log file'), results[0])
+    self.assertEqual((DAY_1 + 5, 'WARN', 'Problem bootstrapping.\nStuck at 5%'), results[2])
+
+    self.assertEqual([DAY_2, DAY_1], [r[0] for r in archive.search(event_types = ['NOTICE'])])
+    self.assertEqual([DAY_1 + 5, DAY_1], [r[0] for r in archive.search(end = DAY_2)])
+    self.assertEqual([DAY_1], [r[0] for r in archive.search(keywords = ['bootstrapped'])])
+    self.assertEqual([DAY_1 + 5], [r[0] for r in archive.search(keywords = ['stuck', 'PROBLEM'])])
+    self.assertEqual([], list(archive.search(keywords = ['stuck', 'heartbeat'])))
+    self.assertEqual([DAY_2 + 5, DAY_2], [r[0] for r in archive.search(start = DAY_2)])
+    self.assertEqual([DAY_2, DAY_1 + 5], [r[0] for r in archive.search(start = DAY_1 + 1, end = DAY_2 + 1)])
+    self.assertEqual([DAY_2 + 5, DAY_2], [r[0] for r in archive.search(limit = 2)])
+
+  def test_blocks(self):
+    events = [(DAY_1 + i, 'INFO', 'event number%i' % i) for i in range(BLOCK_SIZE * 3)]
+    archive = self._make_archive(events)
+
+    day_path = os.path.join(self.archive_path, '2014-07-14')
+    self.assertEqual(3 * 16, os.path.getsize(os.path.join(day_path, 'time_index')))
+
+    self.assertEqual([(DAY_1 + 150, 'INFO', 'event number150')], list(archive.search(keywords = ['number150'])))
+    self.assertEqual(BLOCK_SIZE * 3 - 100, len(list(archive.search(start = DAY_1 + 100))))
+
+  def test_malformed_token_index(self):
+    events = [(DAY_1 + i, 'INFO', 'event number%i' % i) for i in range(BLOCK_SIZE * 2)]
+    archive = self._make_archive(events)
+
+    token_index_path = os.path.join(self.archive_path, '2014-07-14', 'token_index')
+
+    # bad lines, and a partial one at the end, are skipped
+
+    with open(token_index_path, 'a') as token_index_file:
+      token_index_file.write('garbage\nnumber100\tx\nevent\t5')
+
+    self.assertEqual([DAY_1 + 100], [r[0] for r in archive.search(keywords = ['number100'])])
+
+    # without a token index the day is scanned instead
+
+    os.remove(token_index_path)
+    self.assertEqual([DAY_1 + 100], [r[0] for r in archive.search(keywords = ['number100'])])
+
+  def test_out_of_order_events(self):
+    # events that arrive late, like lines read from tor's log file
+
+    events = [(DAY_1 + 1000 + i, 'INFO', 'recent event%i' % i) for i in range(BLOCK_SIZE * 2)]
+    events += [(DAY_1 + i, 'NOTICE', 'late event%i' % i) for i in range(BLOCK_SIZE * 2)]
+    archive = self._make_archive(events)
+
+    results = [r[0] for r in archive.search()]
+    self.assertEqual(sorted(results, reverse = True), results)
+    self.assertEqual(BLOCK_SIZE * 4, len(results))
+
+    self.assertEqual(BLOCK_SIZE * 2 - 10, len(list(archive.search(start = DAY_1 + 10, end = DAY_1 + 1000))))
+    self.assertEqual([DAY_1 + 1000 + BLOCK_SIZE * 2 - 1, DAY_1 + 1000 + BLOCK_SIZE * 2 - 2], [r[0] for r in archive.search(limit = 2)])
+    self.assertEqual([DAY_1 + 5], [r[0] for r in archive.search(start = DAY_1 + 5, end = DAY_1 + 6)])
+
+  def test_reopening(self):
+    self._make_archive([(DAY_1, 'NOTICE', 'first run')])
+    archive = self._make_archive([(DAY_1 + 5, 'NOTICE', 'second run')])
+
+    self.assertEqual(['second run', 'first run'], [r[2] for r in archive.search()])
+    self.assertEqual(['second run'], [r[2] for r in archive.search(keywords = ['second'])])
+
+    # blocks started after reopening account for the newest event we had
+
+    archive = self._make_archive([(DAY_1 + 100, 'NOTICE', 'third run')] + [(DAY_1 + 1, 'NOTICE', 'late') for _ in range(BLOCK_SIZE)])
+    self.assertEqual(['third run'], [r[2] for r in archive.search(start = DAY_1 + 50)])
+
+  def test_prune(self):
+    now = time.time()
+    archive = self._make_archive([(now - 10 * 86400, 'NOTICE', 'old'), (now, 'NOTICE', 'new')])
+    self.assertEqual(2, len(os.listdir(self.archive_path)))
+
+    archive.prune(5)
+    self.assertEqual(['new'], [r[2] for r in archive.search()])
@@ -0,0 +1,30 @@
+import time
+import unittest
+
+from arm.util.archive import parse_query
+
+NOW = 1405440000.0
+
+
+class TestParseQuery(unittest.TestCase):
+  def test_keywords(self):
+    self.assertEqual({}, parse_query(''))
+    self.assertEqual({'keywords': ['circuit', 'failed']}, parse_query('Circuit FAILED', NOW))
+
+  def test_criteria(self):
+    criteria = parse_query('circuit type:warn,err since:3d until:2h', NOW)
+
+    self.assertEqual(['circuit'], criteria['keywords'])
+    self.assertEqual(['WARN', 'ERR'], criteria['event_types'])
+    self.assertEqual(NOW - 3 * 86400, criteria['start'])
+    self.assertEqual(NOW - 2 * 3600, criteria['end'])
+
+  def test_dates(self):
+    criteria = parse_query('from:2014-07-01 to:2014-07-02')
+
+    self.assertEqual(time.mktime((2014, 7, 1, 0, 0, 0, 0, 0, -1)), criteria['start'])
+    self.assertEqual(time.mktime((2014, 7, 3, 0, 0, 0, 0, 0, -1)), criteria['end'])
+
+  def test_malformed(self):
+    for query in ('since:3', 'since:xd', 'until:5y', 'from:yesterday', 'to:2014-13-01', 'level:warn', 'x', 'circuit -'):
+      self.assertRaises(ValueError, parse_query, query)
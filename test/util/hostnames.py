@@ -0,0 +1,135 @@
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+
+from arm.util.hostnames import HostnameResolver
+
+HOSTNAMES = {
+  '74.125.28.106': 'pc-in-f106.1e100.net',
+  '86.59.30.40': 'ghowen.torproject.org',
+}
+
+
+class Backend(object):
+  """
+  Stand-in for DNS that resolves addresses from a dictionary.
+  """
+
+  def __init__(self):
+    self.lookups = []
+
+  def __call__(self, address):
+    self.lookups.append((address, time.time()))
+
+    if address in HOSTNAMES:
+      return HOSTNAMES[address]
+
+    raise socket.herror(1, 'Unknown host')
+
+
+def wait_for(resolver, count):
+  start = time.time()
+
+  while resolver.resolved_count() < count and time.time() - start < 5:
+    time.sleep(0.01)
+
+
+class TestHostnameResolver(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.backend = Backend()
+    self.resolvers = []
+
+  def tearDown(self):
+    for resolver in self.resolvers:
+      resolver.stop()
+
+    shutil.rmtree(self.tmp_dir)
+
+  def resolver(self, **kwargs):
+    kwargs.setdefault('rate', 1000)
+    resolver = HostnameResolver(backend = self.backend, **kwargs)
+    self.resolvers.append(resolver)
+    return resolver
+
+  def test_resolve(self):
+    resolver = self.resolver()
+
+    # lookups happen in the background, so we get the default until then
+
+    self.assertEqual('74.125.28.106', resolver.resolve('74.125.28.106', '74.125.28.106'))
+    wait_for(resolver, 1)
+    self.assertEqual('pc-in-f106.1e100.net', resolver.resolve('74.125.28.106'))
+
+    resolver.resolve('74.125.28.106')
+    self.assertEqual(1, len(self.backend.lookups))
+
+  def test_failures_are_cached(self):
+    resolver = self.resolver()
+
+    self.assertEqual(None, resolver.resolve('10.0.0.1'))
+    wait_for(resolver, 1)
+
+    for _ in range(3):
+      self.assertEqual('', resolver.resolve('10.0.0.1', ''))
+
+    self.assertEqual(1, len(self.backend.lookups))
+
+  def test_expired_entries_are_resolved_again(self):
+    resolver = self.resolver(ttl = -1)
+
+    resolver.resolve('86.59.30.40')
+    wait_for(resolver, 1)
+
+    # we still provide the expired hostname while it's looked up anew
+
+    self.assertEqual('ghowen.torproject.org', resolver.resolve('86.59.30.40'))
+    wait_for(resolver, 2)
+    self.assertEqual(2, len(self.backend.lookups))
+
+  def test_rate_limit(self):
+    resolver = self.resolver(rate = 20)
+
+    for i in range(5):
+      resolver.resolve('10.0.0.%i' % i)
+
+    wait_for(resolver, 5)
+    lookup_times = sorted([timestamp for (_, timestamp) in self.backend.lookups])
+
+    self.assertEqual(5, len(lookup_times))
+    self.assertTrue(lookup_times[-1] - lookup_times[0] >= 0.19)
+
+  def test_cache_size(self):
+    resolver = self.resolver(thread_count = 1, cache_size = 2)
+
+    for i, address in enumerate(('10.0.0.1', '74.125.28.106', '86.59.30.40')):
+      resolver.resolve(address)
+      wait_for(resolver, i + 1)
+
+    self.assertEqual(['74.125.28.106', '86.59.30.40'], list(resolver._cache.keys()))
+
+  def test_persistence(self):
+    cache_path = os.path.join(self.tmp_dir, 'hostnames')
+    resolver = self.resolver(cache_path = cache_path)
+
+    resolver.resolve('74.125.28.106')
+    resolver.resolve('10.0.0.1')
+    wait_for(resolver, 2)
+    resolver.stop()
+
+    resolver = self.resolver(cache_path = cache_path)
+    self.assertEqual('pc-in-f106.1e100.net', resolver.resolve('74.125.28.106'))
+    self.assertEqual('unknown', resolver.resolve('10.0.0.1', 'unknown'))
+    self.assertEqual(2, len(self.backend.lookups))
+
+  def test_malformed_cache(self):
+    cache_path = os.path.join(self.tmp_dir, 'hostnames')
+
+    with open(cache_path, 'w') as cache_file:
+      cache_file.write('not a cache entry\n')
+
+    resolver = self.resolver(cache_path = cache_path)
+    self.assertEqual(None, resolver.resolve('74.125.28.106'))
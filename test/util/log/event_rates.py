@@ -0,0 +1,53 @@
+import unittest
+
+from arm.util.log import EventRates
+
+NOW = 1405440000  # start of a minute
+
+
+class TestEventRates(unittest.TestCase):
+  def test_unknown_type(self):
+    rates = EventRates()
+
+    self.assertEqual([], rates.get_types())
+    self.assertEqual((0.0, 0.0, 0.0), rates.get_rates('CIRC', NOW))
+    self.assertEqual([0] * 60, rates.get_history('CIRC', NOW))
+
+  def test_rates(self):
+    rates = EventRates()
+
+    # ten events a second for two minutes, then a burst of five hundred
+
+    for second in range(120):
+      rates.record('CIRC', 10, NOW + second)
+
+    rates.record('CIRC', 500, NOW + 120)
+    rates.record('BW', now = NOW + 120)
+
+    self.assertEqual(['BW', 'CIRC'], sorted(rates.get_types()))
+
+    per_second, per_minute, per_fifteen = rates.get_rates('CIRC', NOW + 121)
+    self.assertEqual(500.0, per_second)
+    self.assertAlmostEqual((59 * 10 + 500) / 60.0, per_minute)
+    self.assertAlmostEqual(1200 / 900.0, per_fifteen)  # burst is in the current minute
+
+    history = rates.get_history('CIRC', NOW + 121)
+    self.assertEqual(60, len(history))
+    self.assertEqual([10] * 58 + [500, 0], history)
+
+  def test_old_counts_expire(self):
+    rates = EventRates()
+    rates.record('CIRC', 10, NOW)
+
+    # the current minute isn't complete, so it isn't in the fifteen minute rate
+
+    self.assertEqual((10.0, 10 / 60.0, 0.0), rates.get_rates('CIRC', NOW + 1))
+    self.assertEqual((0.0, 10 / 60.0, 10 / 900.0), rates.get_rates('CIRC', NOW + 60))
+    self.assertEqual((0.0, 0.0, 10 / 900.0), rates.get_rates('CIRC', NOW + 61))
+
+    # the fifteen minute rate covers the full fifteen minutes
+
+    self.assertEqual((0.0, 0.0, 10 / 900.0), rates.get_rates('CIRC', NOW + 15 * 60))
+    self.assertEqual((0.0, 0.0, 0.0), rates.get_rates('CIRC', NOW + 16 * 60))
+    self.assertEqual((0.0, 0.0, 0.0), rates.get_rates('CIRC', NOW + 3600))
+    self.assertEqual([0] * 60, rates.get_history('CIRC', NOW + 3600))
@@ -0,0 +1,119 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from arm.util.log import LogFileWriter
+
+
+def wait_for(writer, count):
+  start = time.time()
+
+  while writer.get_written() < count and time.time() - start < 5:
+    time.sleep(0.01)
+
+
+class TestLogFileWriter(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.log_path = os.path.join(self.tmp_dir, 'arm.log')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def test_writing(self):
+    writer = LogFileWriter(self.log_path, flush_rate = 10)
+    writer.start()
+
+    for i in range(5):
+      self.assertTrue(writer.write('entry %i' % i))
+
+    writer.stop()
+    writer.join()
+
+    with open(self.log_path) as log_file:
+      self.assertEqual(['entry %i\n' % i for i in range(5)], log_file.readlines())
+
+    self.assertEqual(5, writer.get_written())
+    self.assertEqual(0, writer.get_queued())
+    self.assertEqual(0, writer.get_dropped())
+    self.assertFalse(writer.write('entry after stopping'))
+
+  def test_appends(self):
+    with open(self.log_path, 'w') as log_file:
+      log_file.write('existing entry\n')
+
+    writer = LogFileWriter(self.log_path)
+    writer.start()
+    writer.write('new entry')
+    writer.stop()
+    writer.join()
+
+    with open(self.log_path) as log_file:
+      self.assertEqual('existing entry\nnew entry\n', log_file.read())
+
+  def test_full_queue(self):
+    writer = LogFileWriter(self.log_path, queue_size = 3)
+
+    for i in range(5):
+      writer.write('entry %i' % i)
+
+    self.assertEqual(3, writer.get_queued())
+    self.assertEqual(2, writer.get_dropped())
+
+    writer.start()
+    writer.stop()
+    writer.join()
+
+    with open(self.log_path) as log_file:
+      self.assertEqual(['entry 0\n', 'entry 1\n', 'entry 2\n'], log_file.readlines())
+
+  def test_rotation(self):
+    writer = LogFileWriter(self.log_path, queue_size = 2, max_size = 5, backup_count = 2)
+    writer.start()
+
+    # filling half the queue wakes the writer, so each of these are rotated
+
+    for i in range(4):
+      writer.write('entry %i' % i)
+
+      wait_for(writer, i + 1)
+
+    writer.stop()
+    writer.join()
+
+    self.assertEqual(['arm.log', 'arm.log.1', 'arm.log.2'], sorted(os.listdir(self.tmp_dir)))
+
+    for filename, expected in (('arm.log', ''), ('arm.log.1', 'entry 3\n'), ('arm.log.2', 'entry 2\n')):
+      with open(os.path.join(self.tmp_dir, filename)) as log_file:
+        self.assertEqual(expected, log_file.read())
+
+  def test_single_entry_queue(self):
+    # half of this queue rounds down to nothing, but we still write each entry
+
+    writer = LogFileWriter(self.log_path, queue_size = 1, flush_rate = 60)
+    writer.start()
+
+    for i in range(3):
+      writer.write('entry %i' % i)
+      wait_for(writer, i + 1)
+
+    self.assertEqual(3, writer.get_written())
+
+    writer.stop()
+    writer.join()
+
+  def test_compressed_rotation(self):
+    writer = LogFileWriter(self.log_path, max_size = 10, compress = True)
+    writer.start()
+    writer.write('an entry that will be rotated')
+    writer.stop()
+    writer.join()
+
+    self.assertEqual(['arm.log', 'arm.log.1.gz'], sorted(os.listdir(self.tmp_dir)))
+
+    compressed_file = gzip.open(os.path.join(self.tmp_dir, 'arm.log.1.gz'))
+    self.assertEqual('an entry that will be rotated\n', compressed_file.read())
+    compressed_file.close()
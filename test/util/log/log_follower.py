@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import Mock, patch
+
+from arm.util.log import LogFollower
+
+ENTRY = "Jul 15 18:29:%02i.000 [notice] message %i\n"
+
+
+class TestLogFollower(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.log_path = os.path.join(self.tmp_dir, 'notices.log')
+    self.entries = []
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def _append(self, *indices, **kwargs):
+    with open(self.log_path, kwargs.get('mode', 'a')) as log_file:
+      for i in indices:
+        log_file.write(ENTRY % (i, i))
+
+  def _follow(self, **kwargs):
+    follower = LogFollower(self.log_path, lambda *entry: self.entries.append(entry), poll_rate = 0.05, **kwargs)
+    follower.start()
+    self.addCleanup(follower.join)
+    self.addCleanup(follower.stop)
+    return follower
+
+  def _assert_messages(self, expected):
+    for _ in range(100):
+      if len(self.entries) >= len(expected):
+        break
+
+      time.sleep(0.02)
+
+    self.assertEqual(expected, [message for (_, _, message) in self.entries])
+
+  def test_appended_entries(self):
+    self._append(1, 2)
+    self._follow()
+    self._append(3)
+
+    with open(self.log_path, 'a') as log_file:
+      log_file.write("Jul 15 18:29:04.000 [notice] partially ")
+      log_file.flush()
+      time.sleep(0.1)
+      log_file.write("written message\nnot a log entry\n")
+
+    self._assert_messages(['message 3', 'partially written message'])
+    self.assertEqual('NOTICE', self.entries[0][1])
+
+  def test_from_start(self):
+    self._append(1, 2)
+    self._follow(from_start = True)
+    self._assert_messages(['message 1', 'message 2'])
+
+  def test_missing_file(self):
+    self._follow()
+    time.sleep(0.1)
+    self._append(1)
+    self._assert_messages(['message 1'])
+
+  def test_rotation(self):
+    self._append(1)
+    self._follow()
+    self._append(2)
+    self._assert_messages(['message 2'])
+
+    os.rename(self.log_path, self.log_path + '.1')
+    self._append(3)
+    self._assert_messages(['message 2', 'message 3'])
+
+  def test_truncation(self):
+    self._append(1, 2, 3)
+    self._follow()
+    self._append(4, mode = 'w')
+    self._assert_messages(['message 4'])
+
+  @patch('arm.util.log._inotify_watch', Mock(return_value = None))
+  def test_polling(self):
+    self._follow()
+    self._append(1)
+    self._assert_messages(['message 1'])
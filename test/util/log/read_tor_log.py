@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from arm.util.log import read_tor_log, _read_lines_reversed
+
+TOR_LOG = """\
+Apr 06 11:03:39.000 [notice] Tor 0.2.4.21 opening new log file.
+Apr 06 11:03:39.832 [notice] Tor v0.2.4.21 (git-505962724c05445f) running on Linux with Libevent 2.0.16-stable and OpenSSL 1.0.1.
+Apr 06 11:03:39.000 [notice] Tor 0.2.4.21 opening log file.
+Apr 06 11:03:40.000 [warn] Please upgrade! This version of Tor (0.2.4.21) is obsolete.
+Apr 06 11:03:41.000 [notice] Bootstrapped 5%: Connecting to directory server.
+
+Apr 06 11:03:42.000 [info] circuit_build_times_get_bw_scale(): Bandwidth-weights scale 10000.
+Apr 06 11:03:43.000 [notice] Bootstrapped 100%: Done.
+"""
+
+
+class TestReadTorLog(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.log_path = os.path.join(self.tmp_dir, 'notices.log')
+
+    with open(self.log_path, 'w') as log_file:
+      log_file.write(TOR_LOG)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def test_reading_entries(self):
+    entries = list(read_tor_log(self.log_path))
+    runlevels = [runlevel for (_, runlevel, _) in entries]
+    messages = [msg for (_, _, msg) in entries]
+
+    # stops at the start of this tor instance
+
+    self.assertEqual(['NOTICE', 'INFO', 'NOTICE', 'WARN', 'NOTICE'], runlevels)
+    self.assertEqual('Bootstrapped 100%: Done.', messages[0])
+    self.assertEqual('Tor 0.2.4.21 opening log file.', messages[-1])
+
+    # newest entries come first
+
+    timestamps = [timestamp for (timestamp, _, _) in entries]
+    self.assertEqual(sorted(timestamps, reverse = True), timestamps)
+
+  def test_read_limit(self):
+    entries = list(read_tor_log(self.log_path, 2))
+    self.assertEqual(['NOTICE', 'INFO'], [runlevel for (_, runlevel, _) in entries])
+
+  def test_lazy_reading(self):
+    entries = read_tor_log(self.log_path)
+    self.assertEqual('Bootstrapped 100%: Done.', next(entries)[2])
+
+  def test_missing_file(self):
+    self.assertRaises(IOError, list, read_tor_log(os.path.join(self.tmp_dir, 'nonexistant')))
+
+  def test_lines_spanning_blocks(self):
+    with open(self.log_path) as log_file:
+      lines = list(_read_lines_reversed(log_file, block_size = 7))
+
+    expected = [line for line in TOR_LOG.splitlines() if line]
+    expected.reverse()
+
+    self.assertEqual(expected, lines)
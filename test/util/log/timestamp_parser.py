@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from mock import Mock, patch
+
+from arm.util.log import TimestampParser
+
+# local time of Jul 20 2014, 15:00:00
+
+NOW = time.mktime((2014, 7, 20, 15, 0, 0, 0, 0, -1))
+
+
+class TestTimestampParser(unittest.TestCase):
+  def test_parse(self):
+    parser = TimestampParser(NOW)
+
+    for timestamp, expected in (
+      ('Jul 15 18:29:48.806', (2014, 7, 15, 18, 29, 48)),
+      ('Jul 15 00:00:00.000', (2014, 7, 15, 0, 0, 0)),
+      ('Jul 15 23:59:59.999', (2014, 7, 15, 23, 59, 59)),
+      ('Jan 01 08:10:12', (2014, 1, 1, 8, 10, 12)),
+      ('Mar 09 02:30:00.000', (2014, 3, 9, 2, 30, 0)),
+      ('Nov 02 01:30:00.000', (2013, 11, 2, 1, 30, 0)),
+    ):
+      expected_time = time.mktime(expected + (0, 0, -1))
+      self.assertEqual(expected_time, parser.parse(timestamp))
+
+  def test_future_dates_are_from_last_year(self):
+    parser = TimestampParser(NOW)
+
+    self.assertEqual(time.mktime((2013, 12, 31, 23, 0, 0, 0, 0, -1)), parser.parse('Dec 31 23:00:00.000'))
+    self.assertEqual(time.mktime((2012, 2, 29, 12, 0, 0, 0, 0, -1)), parser.parse('Feb 29 12:00:00.000'))
+
+  def test_day_is_cached(self):
+    parser = TimestampParser(NOW)
+    parser.parse('Jul 15 18:29:48.806')
+    expected = time.mktime((2014, 7, 15, 18, 30, 0, 0, 0, -1))
+
+    # if we hit mktime again then this would provide a different value
+
+    with patch('time.mktime', Mock(return_value = 0)):
+      self.assertEqual(expected, parser.parse('Jul 15 18:30:00.000'))
+
+  def test_malformed(self):
+    parser = TimestampParser(NOW)
+
+    for timestamp in ('', 'Jul 15', 'Jul 15 18:29', 'Jul 15 25:00:00', 'Jul 15 ab:cd:ef', 'Foo 15 18:29:48', 'Jul 45 18:29:48'):
+      self.assertRaises(ValueError, parser.parse, timestamp)
@@ -0,0 +1,50 @@
+import unittest
+
+from arm.util.panel import Panel
+
+
+class TestPauseBuffer(unittest.TestCase):
+  def setUp(self):
+    self.panel = Panel(None, "test", 0)
+    self.panel.entries = [1, 2, 3]
+    self.panel.set_pause_attr("entries")
+
+  def test_unpaused(self):
+    self.assertEqual([1, 2, 3], self.panel.get_attr("entries"))
+    self.assertEqual(None, self.panel.get_attr("untracked"))
+
+  def test_pausing_shares_values(self):
+    entries = self.panel.entries
+    self.panel.set_paused(True, True)
+
+    self.assertTrue(self.panel.get_attr("entries") is entries)
+
+  def test_copy_on_write(self):
+    self.panel.set_paused(True, True)
+
+    self.panel.unshare_attr("entries")
+    self.panel.entries.append(4)
+
+    self.assertEqual([1, 2, 3], self.panel.get_attr("entries"))
+    self.assertEqual([1, 2, 3, 4], self.panel.entries)
+
+    # only copies the first time
+
+    entries = self.panel.entries
+    self.panel.unshare_attr("entries")
+    self.assertTrue(self.panel.entries is entries)
+
+    self.panel.set_paused(False, True)
+    self.assertEqual([1, 2, 3, 4], self.panel.get_attr("entries"))
+
+  def test_unshare_when_unpaused(self):
+    entries = self.panel.entries
+    self.panel.unshare_attr("entries")
+
+    self.assertTrue(self.panel.entries is entries)
+
+  def test_reassigned_values(self):
+    self.panel.set_paused(True, True)
+    self.panel.entries = [5]
+
+    self.assertEqual([1, 2, 3], self.panel.get_attr("entries"))
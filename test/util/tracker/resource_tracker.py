@@ -32,6 +32,7 @@ class TestResourceTracker(unittest.TestCase):
       self.assertEqual(8072, resources.memory_bytes)
       self.assertEqual(0.3, resources.memory_percent)
       self.assertTrue((time.time() - resources.timestamp) < 0.5)
+      self.assertAlmostEqual(resources.timestamp - 2.4, resources.start_time)
 
       resources_via_proc_mock.return_value = (800.3, 3.2, 6020, 0.26)
       time.sleep(0.05)
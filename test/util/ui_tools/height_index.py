@@ -0,0 +1,74 @@
+import unittest
+
+from arm.util.uiTools import HeightIndex
+
+
+class TestHeightIndex(unittest.TestCase):
+  def test_empty(self):
+    index = HeightIndex()
+
+    self.assertEqual(0, len(index))
+    self.assertEqual(0, index.get_total())
+    self.assertEqual((0, 5), index.find(5))
+
+  def test_offsets(self):
+    heights = [1, 3, 2, 0, 1, 4, 2]
+    index = HeightIndex(heights)
+
+    self.assertEqual(len(heights), len(index))
+    self.assertEqual(sum(heights), index.get_total())
+
+    for i in range(len(heights) + 1):
+      self.assertEqual(sum(heights[:i]), index.get_offset(i))
+
+  def test_find(self):
+    index = HeightIndex([1, 3, 2, 0, 1, 4, 2])
+
+    self.assertEqual((0, 0), index.find(0))
+    self.assertEqual((1, 0), index.find(1))
+    self.assertEqual((1, 2), index.find(3))
+    self.assertEqual((2, 1), index.find(5))
+    self.assertEqual((4, 0), index.find(6))  # skips the empty item
+    self.assertEqual((5, 3), index.find(10))
+    self.assertEqual((6, 1), index.find(12))
+    self.assertEqual((7, 0), index.find(13))
+    self.assertEqual((7, 7), index.find(20))
+
+  def test_set_height(self):
+    heights = [2, 2, 2, 2, 2]
+    index = HeightIndex(heights)
+
+    index.set_height(1, 5)
+    index.set_height(4, 0)
+    heights[1], heights[4] = 5, 0
+
+    self.assertEqual(5, index.get_height(1))
+    self.assertEqual(sum(heights), index.get_total())
+
+    for i in range(len(heights) + 1):
+      self.assertEqual(sum(heights[:i]), index.get_offset(i))
+
+    self.assertEqual((1, 4), index.find(6))
+    self.assertEqual((3, 1), index.find(10))
+
+  def test_append_and_pop(self):
+    heights = [3, 1, 4, 1, 5, 9, 2, 6, 5]
+    index = HeightIndex()
+
+    for i, height in enumerate(heights):
+      index.append(height)
+
+      for j in range(i + 2):
+        self.assertEqual(sum(heights[:j]), index.get_offset(j))
+
+    self.assertEqual(5, index.pop())
+    self.assertEqual(6, index.pop())
+    index.append(7)
+    heights[-2:] = [7]
+
+    self.assertEqual(len(heights), len(index))
+
+    for i in range(len(heights) + 1):
+      self.assertEqual(sum(heights[:i]), index.get_offset(i))
+
+    self.assertEqual((7, 3), index.find(sum(heights[:7]) + 3))
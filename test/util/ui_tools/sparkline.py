@@ -0,0 +1,20 @@
+import unittest
+
+from arm.util.uiTools import get_sparkline
+
+
+class TestSparkline(unittest.TestCase):
+  def test_sparkline(self):
+    self.assertEqual('', get_sparkline([]))
+    self.assertEqual('   ', get_sparkline([0, 0, 0]))
+    self.assertEqual(' .:@', get_sparkline([0, 1, 2, 9]))
+    self.assertEqual('@@', get_sparkline([5, 5]))
+
+    # small values are still visible next to large ones
+
+    self.assertEqual('.@', get_sparkline([1, 1000]))
+
+  def test_width(self):
+    self.assertEqual('*#%@', get_sparkline(range(10), 4))
+    self.assertEqual('', get_sparkline(range(10), 0))
+    self.assertEqual(' .@', get_sparkline([0, 1, 9], 10))